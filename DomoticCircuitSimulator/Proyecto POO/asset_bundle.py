@@ -0,0 +1,151 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+
+BUNDLE_FILE = "assets.bundle"
+ASSET_EXTENSIONS = (".png", ".jpg", ".jpeg", ".wav")
+
+# Layout of a bundle:
+#   header:  magic, format version, length of the index
+#   index:   JSON {"files": {name: [offset, size]}}, offsets counted from the data start
+#   data:    the bytes of every file as they are on disk, each aligned to ALIGNMENT
+MAGIC = b"ELEHOUSE"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+ALIGNMENT = 16
+
+
+def _padding(position):
+    return -position % ALIGNMENT
+
+
+# Packs every asset of asset_dir into one bundle file. Returns {name: size}.
+def build_bundle(asset_dir, output_path, extensions=ASSET_EXTENSIONS):
+    names = sorted(
+        entry.name for entry in os.scandir(asset_dir)
+        if entry.is_file() and entry.name.lower().endswith(extensions)
+    )
+    sizes = {name: os.path.getsize(os.path.join(asset_dir, name)) for name in names}
+
+    files = {}
+    offset = 0
+    for name in names:
+        files[name] = [offset, sizes[name]]
+        offset += sizes[name] + _padding(sizes[name])
+    index = json.dumps({"files": files}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    temp_path = output_path + ".tmp"
+    with open(temp_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, len(index)))
+        out.write(index)
+        out.write(b"\0" * _padding(HEADER.size + len(index)))
+        for name in names:
+            with open(os.path.join(asset_dir, name), "rb") as f:
+                data = f.read()
+            if len(data) != sizes[name]:
+                raise OSError(f"{name} changed while the bundle was being built")
+            out.write(data)
+            out.write(b"\0" * _padding(len(data)))
+    os.replace(temp_path, output_path)
+    return sizes
+
+
+# SRP: this class only serves the files packed by build_bundle. The bundle is opened
+# once and memory-mapped: one file handle for every image and sound, and data() hands
+# out read-only memoryviews over the mapping, so decoders (QPixmap.loadFromData,
+# QImage.fromData, the audio layer) read the bytes in place, without a copy. The pages
+# of a file are only read from disk the first time they are touched.
+class AssetBundle:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        try:
+            magic, version, index_size = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not an asset bundle of version {VERSION}")
+            index = json.loads(bytes(self._view[HEADER.size:HEADER.size + index_size]).decode("utf-8"))
+            data_start = HEADER.size + index_size
+            data_start += _padding(data_start)
+            self._files = {
+                name: (data_start + offset, size) for name, (offset, size) in index["files"].items()
+            }
+            if any(start + size > len(self._map) for start, size in self._files.values()):
+                raise ValueError(f"{path} is truncated")
+        except (struct.error, ValueError, KeyError, TypeError):
+            self.close()
+            raise ValueError(f"{path} is not a valid asset bundle")
+
+    # The bundle at path, or None when there is none (or it is not a valid bundle)
+    @classmethod
+    def open(cls, path):
+        if not path or not os.path.isfile(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError):
+            return None
+
+    def names(self):
+        return list(self._files)
+
+    def __contains__(self, name):
+        return name in self._files
+
+    # Read-only view of a packed file, or None when the bundle does not have it
+    def data(self, name):
+        entry = self._files.get(name)
+        if entry is None or self._map is None:
+            return None
+        start, size = entry
+        return self._view[start:start + size]
+
+    # Assets are packed by file name: any path to an asset resolves to its bundled bytes
+    def data_for(self, path):
+        if not path:
+            return None
+        return self.data(os.path.basename(path))
+
+    def close(self):
+        if self._map is None:
+            return
+        try:
+            self._view.release()
+            self._map.close()
+        except BufferError:
+            # Views still in use (a decode in flight) keep the mapping alive
+            pass
+        self._map = None
+
+
+def main(argv=None):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Packs the Elechouse images and sounds into one bundle.")
+    parser.add_argument("--assets", default=base_dir, help="directory with the image and sound files")
+    parser.add_argument("--output", help=f"bundle to write (default: {BUNDLE_FILE} in the assets directory)")
+    parser.add_argument("--list", metavar="BUNDLE", help="print the content of a bundle instead of building one")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        try:
+            bundle = AssetBundle(args.list)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        for name in bundle.names():
+            print(f"{len(bundle.data(name)):>10}  {name}")
+        bundle.close()
+        return 0
+
+    output = args.output or os.path.join(args.assets, BUNDLE_FILE)
+    sizes = build_bundle(args.assets, output)
+    print(f"{output}: {len(sizes)} files, {sum(sizes.values()) / (1024 * 1024):.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import os
+
+
+STATE_SUFFIXES = {True: " ON", False: " OFF"}
+
+
+# SRP: this class only knows which image file shows each component type in each state.
+# It is built once at startup from the component table (type -> image of the device
+# when it is off): every (type, on) pair is resolved to a file that exists, looking for
+# "<name> ON" / "<name> OFF", then the plain image ("<name_with_underscores>" first,
+# then "<name>"), then the image of the other state. Each asset directory is listed
+# once; after that switching a device or drawing it is a dictionary lookup and never
+# touches the filesystem. The resolved path is the handle: the same string object for
+# every device of a type and state. Files packed in an AssetBundle count as present
+# even when they are not next to the program.
+class AssetManifest:
+    def __init__(self, component_files, extra_files=(), bundle=None):
+        self.bundle = bundle
+        self._listings = {}       # directory -> names of the files in it, read once
+        self._sprites = {}        # (type, on) -> resolved path ("" when there is no image)
+        self._valid = set()       # every path known to exist
+        self.substituted = {}     # type -> (declared path, path used instead)
+        self.missing = []         # (type, on) without any image
+
+        for tipo, path in component_files.items():
+            self._add_component(tipo, path)
+        for path in extra_files:
+            if self._exists(path):
+                self._valid.add(path)
+
+    def _add_component(self, tipo, path):
+        directory, name = os.path.split(path)
+        stem, ext = os.path.splitext(name)
+        root = stem
+        for suffix in STATE_SUFFIXES.values():
+            if stem.endswith(suffix):
+                root = stem[:-len(suffix)]
+                break
+
+        def first_existing(*stems):
+            for candidate in stems:
+                candidate_path = os.path.join(directory, candidate + ext)
+                if self._exists(candidate_path):
+                    return candidate_path
+            return ""
+
+        # "Desk_Lamp.png" is the lamp sprite; "Desk Lamp.png" is a full-size drawing
+        off_path = first_existing(root + STATE_SUFFIXES[False], root.replace(" ", "_"), root)
+        on_path = first_existing(root + STATE_SUFFIXES[True]) or off_path
+        off_path = off_path or on_path
+        if off_path and off_path != path:
+            self.substituted[tipo] = (path, off_path)
+
+        for on, resolved in ((False, off_path), (True, on_path)):
+            self._sprites[(tipo, on)] = resolved
+            if resolved:
+                self._valid.add(resolved)
+            else:
+                self.missing.append((tipo, on))
+
+    def _exists(self, path):
+        directory, name = os.path.split(path)
+        if self.bundle is not None and name in self.bundle:
+            return True
+        names = self._listings.get(directory)
+        if names is None:
+            names = set()
+            try:
+                with os.scandir(directory or ".") as entries:
+                    names = {entry.name for entry in entries if entry.is_file()}
+            except OSError:
+                pass
+            self._listings[directory] = names
+        return name in names
+
+    # Image of a device of that type in that state: None for a type the manifest does not
+    # know, "" for a known type without any image
+    def sprite(self, tipo, on):
+        return self._sprites.get((tipo, bool(on)))
+
+    def is_valid(self, path):
+        return path in self._valid
@@ -0,0 +1,194 @@
+import io
+import os
+import wave
+from collections import OrderedDict, namedtuple
+
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject
+from PyQt5.QtMultimedia import QAudio, QAudioDeviceInfo, QAudioFormat, QAudioOutput
+
+
+# A sound decoded once: the raw PCM frames, ready to be handed to the output as they are
+Clip = namedtuple("Clip", ["name", "pcm", "channels", "sample_rate", "sample_width", "duration"])
+
+SUPPORTED_SAMPLE_WIDTHS = (1, 2)
+
+
+# Decodes a PCM WAV file (bytes or a memoryview over them) into a Clip. ValueError when
+# it is not a WAV file this engine can play.
+def decode_wav(name, data):
+    try:
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            channels = wav.getnchannels()
+            sample_width = wav.getsampwidth()
+            sample_rate = wav.getframerate()
+            frames = wav.getnframes()
+            pcm = wav.readframes(frames)
+    except (wave.Error, EOFError) as e:
+        detail = f" ({e})" if str(e) else ""
+        raise ValueError(f"{name} is not a PCM WAV file{detail}")
+    if sample_width not in SUPPORTED_SAMPLE_WIDTHS:
+        raise ValueError(f"{name} uses {8 * sample_width}-bit samples (only 8 and 16 are supported)")
+    if channels < 1 or sample_rate <= 0 or not pcm:
+        raise ValueError(f"{name} has no audio")
+    frame_size = channels * sample_width
+    pcm = pcm[:len(pcm) - len(pcm) % frame_size]
+    duration = len(pcm) / (frame_size * sample_rate)
+    return Clip(name, QByteArray(pcm), channels, sample_rate, sample_width, duration)
+
+
+def audio_format(clip):
+    fmt = QAudioFormat()
+    fmt.setCodec("audio/pcm")
+    fmt.setChannelCount(clip.channels)
+    fmt.setSampleRate(clip.sample_rate)
+    fmt.setSampleSize(8 * clip.sample_width)
+    fmt.setByteOrder(QAudioFormat.LittleEndian)
+    # WAV stores 8-bit samples unsigned and wider ones signed
+    fmt.setSampleType(QAudioFormat.UnSignedInt if clip.sample_width == 1 else QAudioFormat.SignedInt)
+    return fmt
+
+
+def _format_key(clip):
+    return (clip.channels, clip.sample_rate, clip.sample_width)
+
+
+# One audio output stream and the buffer it reads from. It is kept open between sounds
+# of the same format, so starting a sound does not set up a new stream.
+class _Voice:
+    def __init__(self, engine, clip, device):
+        self.format_key = _format_key(clip)
+        self.output = QAudioOutput(device, audio_format(clip), engine)
+        frame_size = clip.channels * clip.sample_width
+        latency_bytes = clip.sample_rate * engine.latency_ms // 1000 * frame_size
+        self.output.setBufferSize(latency_bytes)
+        self.output.setVolume(engine.volume)
+        self.buffer = QBuffer(engine)
+        self.key = None
+        self.output.stateChanged.connect(lambda state: engine._on_voice_state(self, state))
+
+    def start(self, key, clip):
+        self.key = key
+        self.output.stop()
+        self.buffer.close()
+        # The QByteArray is shared with the clip, not copied
+        self.buffer.setData(clip.pcm)
+        self.buffer.open(QIODevice.ReadOnly)
+        self.output.start(self.buffer)
+
+    def stop(self):
+        self.key = None
+        self.output.stop()
+        self.buffer.close()
+
+
+# SRP: this class only plays the sounds of the house. Every WAV is read once (from the
+# asset bundle when there is one) and decoded to PCM in memory at startup; files that
+# are missing or that the output cannot play are reported then (problems) and their
+# sound stays silent. Each sound plays on a voice named by the caller (a device id, or
+# "alarm"): starting a voice again restarts it, stopping it leaves the others playing,
+# so two TVs are two voices. At most max_voices play at the same time; a new voice
+# beyond that takes over the one that started first. Reserved voices (the alarms) are
+# outside that limit and are never taken over. Finished voices go back to a pool per
+# audio format and are reused.
+class AudioEngine(QObject):
+    def __init__(self, max_voices=8, reserved=(), latency_ms=50, volume=1.0, parent=None):
+        super().__init__(parent)
+        self.max_voices = max_voices
+        self.reserved = frozenset(reserved)
+        self.latency_ms = latency_ms
+        self.volume = volume
+        self.problems = []        # messages about sounds that will not play
+
+        self.device = QAudioDeviceInfo.defaultOutputDevice()
+        self.available = not self.device.isNull()
+        if not self.available:
+            self.problems.append("No audio output device: sounds are disabled")
+
+        self.clips = {}           # sound name -> Clip
+        self._active = OrderedDict()   # voice key -> _Voice, oldest start first
+        self._idle = {}           # format key -> [_Voice]
+        self.plays = 0
+        self.steals = 0
+
+    # Decodes the WAV at path as sound `name`. Returns False (and records why) when it
+    # cannot be played.
+    def load(self, name, path, bundle=None):
+        file_name = os.path.basename(path)
+        data = bundle.data_for(path) if bundle is not None else None
+        try:
+            if data is None:
+                with open(path, "rb") as f:
+                    data = f.read()
+            clip = decode_wav(file_name, data)
+        except FileNotFoundError:
+            self.problems.append(f"Sound {file_name} not found: {name} will be silent")
+            return False
+        except (OSError, ValueError) as e:
+            self.problems.append(f"Sound {file_name} cannot be played: {e}")
+            return False
+
+        if self.available and not self.device.isFormatSupported(audio_format(clip)):
+            self.problems.append(
+                f"Sound {file_name} ({clip.channels} ch, {clip.sample_rate} Hz, "
+                f"{8 * clip.sample_width}-bit) is not supported by the audio output"
+            )
+            return False
+        self.clips[name] = clip
+        return True
+
+    def has(self, name):
+        return name in self.clips
+
+    # Plays sound `name` on voice `key`, from the start
+    def play(self, key, name):
+        clip = self.clips.get(name)
+        if clip is None or not self.available:
+            return
+        voice = self._active.pop(key, None)
+        if voice is not None and voice.format_key != _format_key(clip):
+            self._release(voice)
+            voice = None
+        if voice is None:
+            if key not in self.reserved and self.active_voices() >= self.max_voices:
+                oldest = next(k for k in self._active if k not in self.reserved)
+                self._release(self._active.pop(oldest))
+                self.steals += 1
+            voice = self._acquire(clip)
+        self._active[key] = voice
+        voice.start(key, clip)
+        self.plays += 1
+
+    def stop(self, key):
+        voice = self._active.pop(key, None)
+        if voice is not None:
+            self._release(voice)
+
+    def stop_all(self):
+        while self._active:
+            _, voice = self._active.popitem(last=False)
+            self._release(voice)
+
+    def is_playing(self, key):
+        return key in self._active
+
+    # Voices playing within the max_voices limit (reserved ones are not counted)
+    def active_voices(self):
+        return sum(1 for key in self._active if key not in self.reserved)
+
+    def _acquire(self, clip):
+        idle = self._idle.get(_format_key(clip))
+        if idle:
+            return idle.pop()
+        return _Voice(self, clip, self.device)
+
+    def _release(self, voice):
+        voice.stop()
+        self._idle.setdefault(voice.format_key, []).append(voice)
+
+    # The output drained the buffer: the sound is over and the voice is free again
+    def _on_voice_state(self, voice, state):
+        if state != QAudio.IdleState or voice.key is None:
+            return
+        if self._active.get(voice.key) is voice:
+            del self._active[voice.key]
+            self._release(voice)
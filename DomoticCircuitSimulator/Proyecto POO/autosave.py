@@ -0,0 +1,118 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+
+class _SaveSignals(QObject):
+    finished = pyqtSignal(bool, str)
+
+
+class _WriteTask(QRunnable):
+    def __init__(self, saver, data, path):
+        super().__init__()
+        self.saver = saver
+        self.data = data
+        self.path = path
+
+    def run(self):
+        try:
+            self.saver.write_callback(self.data, self.path)
+        except Exception as e:
+            self.saver.signals.finished.emit(False, str(e))
+        else:
+            self.saver.signals.finished.emit(True, "")
+
+
+# SRP: this class only decides WHEN and WHERE the house is written to disk.
+# Callers mark the state dirty after every change; the write happens once the changes
+# stop for idle_ms (a burst of edits or a drag gives one write). The snapshot is taken
+# on the GUI thread (plain dicts, cheap) and serialized and written on a single worker,
+# so the window never waits for the disk. A change that arrives while a write is in
+# flight is written right after it; flush() writes everything before the app closes.
+class WriteBehindSaver(QObject):
+    saved = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def __init__(self, snapshot_callback, write_callback, idle_ms=500, parent=None):
+        super().__init__(parent)
+        self.snapshot_callback = snapshot_callback     # GUI thread: returns plain data
+        self.write_callback = write_callback           # worker thread: (data, path) -> None
+        self.idle_ms = idle_ms
+
+        self.path = None
+        self.dirty = False
+        self.requests = 0
+        self.coalesced = 0          # requests merged into a write that another request triggered
+        self.writes = 0
+        self.failures = 0
+        self.last_error = None
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.signals = _SaveSignals()
+        self.signals.finished.connect(self._on_finished)
+        self._in_flight = False
+        self._pending = None
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._snapshot)
+
+    def request(self, path):
+        self.requests += 1
+        if self.dirty:
+            self.coalesced += 1
+        self.path = path
+        self.dirty = True
+        self._timer.start(self.idle_ms)
+
+    def _snapshot(self):
+        if not self.dirty:
+            return
+        self.dirty = False
+        job = (self.snapshot_callback(), self.path)
+        if self._in_flight:
+            if self._pending is not None:
+                self.coalesced += 1      # the older pending snapshot is never written
+            self._pending = job
+        else:
+            self._submit(job)
+
+    def _submit(self, job):
+        self._in_flight = True
+        self.pool.start(_WriteTask(self, *job))
+
+    def _on_finished(self, ok, error):
+        self._in_flight = False
+        if ok:
+            self.writes += 1
+            self.saved.emit()
+        else:
+            self.failures += 1
+            self.last_error = error
+            self.failed.emit(error)
+
+        if self._pending is not None:
+            job, self._pending = self._pending, None
+            self._submit(job)
+
+    # Writes the latest state now and waits for the disk (closing the app, reloading)
+    def flush(self):
+        self._timer.stop()
+        self.pool.waitForDone()
+        job, self._pending = self._pending, None
+        if self.dirty:
+            if job is not None:
+                self.coalesced += 1
+            self.dirty = False
+            job = (self.snapshot_callback(), self.path)
+        if job is None:
+            return True
+
+        self._in_flight = False
+        try:
+            self.write_callback(*job)
+        except Exception as e:
+            self._on_finished(False, str(e))
+            return False
+        self._on_finished(True, "")
+        return True
@@ -23,6 +23,8 @@ class Bulb(Lights):
     def broken(self):
         if self.voltage > 5: 
             print(f"{self.name} broke!. To much voltage")
+            return True
+        return False
 
 
 
@@ -51,6 +53,8 @@ class Lamp(Lights):
     def broken(self):
         if self.voltage > 5: 
             print(f"{self.name} broke!. To much voltage")
+            return True
+        return False
 
 
 
@@ -68,5 +72,7 @@ class DeskLamp(Lights):
     def broken(self):
         if self.voltage > 5: 
             print(f"{self.name} broke!. To much voltage")
+            return True
+        return False
 
 
@@ -0,0 +1,268 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# The window is never shown on screen: Qt renders into memory
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5 import sip
+from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR, QPoint, QRect
+from PyQt5.QtGui import QPixmapCache
+from PyQt5.QtWidgets import QApplication
+
+from asset_bundle import BUNDLE_FILE, build_bundle
+from layout_generator import LayoutGenerator
+
+
+SIZES = (10, 100, 1000, 10000)
+ROOM = "Kitchen"
+
+
+# Calls function until min_time has elapsed (at least min_runs, at most max_runs times)
+def measure(function, min_time=0.2, min_runs=3, max_runs=50, per_call=1):
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() - started < min_time):
+        t0 = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - t0) * 1000 / per_call)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "min_ms": samples[0],
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "runs": len(samples),
+    }
+
+
+# SRP: this class only times the hot paths of the simulator on synthetic houses.
+# Every benchmark works on a MainWindow rendered offscreen, inside a temporary
+# directory so the real posiciones_dispositivos.json is never read or written.
+class BenchmarkSuite:
+    def __init__(self, seed=0, min_time=0.2):
+        self.seed = seed
+        self.min_time = min_time
+        self.app = QApplication.instance() or QApplication(sys.argv)
+        self.workdir = tempfile.mkdtemp(prefix="elechouse-bench-")
+
+        # The hot paths run on the memory caches only: no disk cache warming up behind them
+        previous = os.getcwd()
+        os.chdir(self.workdir)
+        try:
+            with self.environment(ELECHOUSE_SPRITE_CACHE=""):
+                from main import MainWindow
+                self.window = MainWindow()
+        finally:
+            os.chdir(previous)
+
+        self.window.positions_file = os.path.join(self.workdir, "posiciones_dispositivos.json")
+        self.window.resize(1200, 800)
+        self.window.show()
+        self.app.processEvents()
+
+    # The devices print every switch: that output still happens (it is part of the cost)
+    # but goes to devnull, so the table is readable and the console speed does not matter
+    def run(self, sizes=SIZES):
+        results = {}
+        out = sys.stdout
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for name, stats in self.run_startup():
+                results[name] = stats
+                self.print_row(name, "", stats, out)
+            for size in sizes:
+                for name, stats in self.run_size(size):
+                    results[f"{name}@{size}"] = stats
+                    self.print_row(name, size, stats, out)
+        return results
+
+    @staticmethod
+    def print_row(name, size, stats, out):
+        print(f"{name:<40} {size:>6}  median {stats['median_ms']:10.4f} ms  "
+              f"p95 {stats['p95_ms']:10.4f} ms  ({stats['runs']} runs)", file=out, flush=True)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def environment(**variables):
+        previous = {name: os.environ.get(name) for name in variables}
+        os.environ.update(variables)
+        try:
+            yield
+        finally:
+            for name, value in previous.items():
+                if value is None:
+                    del os.environ[name]
+                else:
+                    os.environ[name] = value
+
+    # A new window up to the first frame of every room: images read from the loose files,
+    # from a bundle built for the run, or from the bundle plus a disk cache of scaled
+    # images warmed beforehand. QPixmapCache is emptied first, so images loaded by file
+    # name are decoded again, as in a new process.
+    def run_startup(self):
+        bundle_path = os.path.join(self.workdir, BUNDLE_FILE)
+        build_bundle(self.window.base_dir, bundle_path)
+        cache_dir = os.path.join(self.workdir, "sprite_cache")
+        self.start_window(bundle_path, cache_dir, warm=True)
+
+        modes = (("files", "", ""), ("bundle", bundle_path, ""), ("disk_cache", bundle_path, cache_dir))
+        for mode, path, cache in modes:
+            yield f"arranque[{mode}]", measure(lambda: self.start_window(path, cache), self.min_time, max_runs=10)
+
+    def start_window(self, bundle_path, cache_dir, warm=False):
+        from main import MainWindow
+
+        QPixmapCache.clear()
+        previous_dir = os.getcwd()
+        os.chdir(self.workdir)
+        try:
+            with self.environment(ELECHOUSE_ASSET_BUNDLE=bundle_path, ELECHOUSE_SPRITE_CACHE=cache_dir):
+                window = MainWindow()
+                window.resize(1200, 800)
+                window.show()
+                self.app.processEvents()
+                for room in window.rooms:
+                    window.alternar_imagen(room)
+                    window.repaint_scheduler.flush_now()
+                if warm:
+                    window.precalentar_cache_disco()
+                    window.sprite_disk_cache.pool.waitForDone()
+                window.close()
+                # Deleted now, while the window is whole: left to the garbage collector, its
+                # widgets would still call handlers the collector had already cleared
+                sip.delete(window)
+        finally:
+            os.chdir(previous_dir)
+        self.app.processEvents()
+
+    def run_size(self, size):
+        w = self.window
+        model = w.model
+        rng = random.Random(self.seed)
+
+        # One turned-on source and size loads in ROOM, wired as a sparse mesh (so there are closed circuits)
+        layout_path = os.path.join(self.workdir, f"layout_{size}.json")
+        LayoutGenerator({ROOM: size}, topology="mesh", density=0.1, seed=self.seed).write(layout_path)
+        model.load(layout_path)
+        if w.current_image != ROOM:
+            w.alternar_imagen(ROOM)
+        w.repaint_scheduler.flush_now()
+        self.app.processEvents()
+        background_path = w.background_images[ROOM]
+        source = model.device(ROOM, 1)
+
+        def render_full():
+            w.invalidar_escena()
+            w.cargar_imagen_con_dispositivos(background_path)
+
+        yield "cargar_imagen_con_dispositivos[full]", measure(render_full, self.min_time)
+        yield "cargar_imagen_con_dispositivos[overlay]", measure(
+            lambda: w.cargar_imagen_con_dispositivos(background_path), self.min_time
+        )
+
+        label = w.background
+        points = [QPoint(rng.randrange(label.width()), rng.randrange(label.height())) for _ in range(200)]
+
+        def hit_test():
+            for point in points:
+                w.obtener_dispositivo_en_pos(point)
+
+        yield "obtener_dispositivo_en_pos", measure(hit_test, self.min_time, per_call=len(points))
+
+        def toggle_source():
+            model.turn_off(ROOM, source)
+            model.turn_on(ROOM, source)
+
+        yield "actualizar_cargas_por_fuentes[toggle]", measure(toggle_source, self.min_time, per_call=2)
+        yield "hay_circuito_cerrado", measure(
+            lambda: [model.has_closed_circuit(ROOM) for _ in range(1000)], self.min_time, per_call=1000
+        )
+
+        frame = w.compositor.frame
+        rects = [dev.rect for dev in model.devices_by_room[ROOM] if dev.rect is not None]
+        sample = rects[0] if rects else QRect(0, 0, 60, 80)
+        yield "calcular_posicion_libre", measure(
+            lambda: w.calcular_posicion_libre(sample.width(), sample.height(), frame.width(), frame.height(), list(rects)),
+            self.min_time,
+        )
+
+        # Saving is write-behind: the GUI thread only marks the state dirty, the write
+        # itself is what flush() waits for
+        yield "guardar_posiciones_dispositivos[request]", measure(w.guardar_posiciones_dispositivos, self.min_time)
+
+        def save_and_flush():
+            w.guardar_posiciones_dispositivos()
+            w.autosave.flush()
+
+        yield "guardar_posiciones_dispositivos[flush]", measure(save_and_flush, self.min_time)
+        yield "cargar_posiciones_dispositivos", measure(w.cargar_posiciones_dispositivos, self.min_time)
+
+    def metadata(self, sizes):
+        try:
+            import numpy
+            numpy_version = numpy.__version__
+        except ImportError:
+            numpy_version = None
+        return {
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "qt": QT_VERSION_STR,
+            "pyqt": PYQT_VERSION_STR,
+            "numpy": numpy_version,
+            "seed": self.seed,
+            "sizes": list(sizes),
+        }
+
+
+# Benchmarks whose median grew by more than the tolerance (1.25 = 25% slower)
+def compare(results, baseline, tolerance=1.25):
+    regressions = []
+    for key, stats in sorted(results.items()):
+        reference = baseline.get(key)
+        if reference is None or reference["median_ms"] <= 0:
+            continue
+        ratio = stats["median_ms"] / reference["median_ms"]
+        if ratio > tolerance:
+            regressions.append((key, reference["median_ms"], stats["median_ms"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the Elechouse simulator hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="device counts to test")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent on each benchmark")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(seed=args.seed, min_time=args.min_time)
+    results = suite.run(args.sizes)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": suite.metadata(args.sizes), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results", {})
+        regressions = compare(results, baseline, args.tolerance)
+        for key, before, after, ratio in regressions:
+            print(f"REGRESSION {key}: {before:.4f} ms -> {after:.4f} ms (x{ratio:.2f})")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+import json
+import os
+
+from connection_set import ConnectionSet
+from house_model import HouseModel
+
+
+# Model event -> journal record. Records hold absolute values (position, state), so
+# replaying one twice gives the same house.
+#   add:         {"op": "add", "room", "dev": DeviceRecord.to_dict()}
+#   remove:      {"op": "remove", "room", "id"}               (its wires go with it)
+#   move:        {"op": "move", "room", "id", "x", "y"}
+#   toggle:      {"op": "toggle", "room", "id", "on", "conectado", "imagen"}
+#                (also a motion sensor that armed or disarmed on its own)
+#   connect:     {"op": "connect", "room", "a", "b"}
+#   temperature: {"op": "temperature", "value"}
+# The first line of a journal is {"op": "begin", "generation": g}: it only applies on
+# top of the snapshot saved with the same "journal_generation".
+def record_from_event(event):
+    dev = event.device
+    if event.kind == "device_added":
+        return {"op": "add", "room": event.room, "dev": dev.to_dict()}
+    if event.kind == "device_removed":
+        return {"op": "remove", "room": event.room, "id": dev.id}
+    if event.kind == "device_moved":
+        return {"op": "move", "room": event.room, "id": dev.id, "x": int(dev.x), "y": int(dev.y)}
+    if event.kind in ("device_switched", "device_forced_off", "sensor_armed", "sensor_disarmed"):
+        return {"op": "toggle", "room": event.room, "id": dev.id, "on": bool(dev.encendido),
+                "conectado": bool(dev.conectado), "imagen": dev.imagen}
+    if event.kind == "wire_added":
+        origen, destino = event.value
+        return {"op": "connect", "room": event.room, "a": origen.id, "b": destino.id}
+    if event.kind == "temperature_changed":
+        return {"op": "temperature", "value": event.value}
+    return None
+
+
+# Wires of a snapshot room as a ConnectionSet, plus the entries that are not a pair of
+# ids (left as they are for the loader to report)
+def _wire_set(room_wires):
+    edges = ConnectionSet()
+    malformed = []
+    for wire in room_wires:
+        origen = wire.get("origen") if isinstance(wire, dict) else None
+        destino = wire.get("destino") if isinstance(wire, dict) else None
+        if type(origen) is int and type(destino) is int:
+            edges.add(origen, destino)
+        else:
+            malformed.append(wire)
+    return edges, malformed
+
+
+# Applies journal records to a to_dict() snapshot, in place. Wires are kept in a
+# ConnectionSet per room, so a removal only visits the wires of that device.
+def replay(data, records):
+    devices = data.setdefault("dispositivos", {})
+    wires = data.setdefault("conexiones", {})
+    by_id = {room: {dev.get("id"): dev for dev in room_devices} for room, room_devices in devices.items()}
+    edges = {}
+    malformed = {}
+    for room, room_wires in wires.items():
+        edges[room], malformed[room] = _wire_set(room_wires)
+    next_id = int(data.get("next_id", 1))
+
+    for record in records:
+        op = record.get("op")
+        room = record.get("room")
+        if op == "temperature":
+            data["temperatura"] = record["value"]
+            continue
+        room_devices = by_id.setdefault(room, {})
+        room_edges = edges.setdefault(room, ConnectionSet())
+
+        if op == "add":
+            dev = dict(record["dev"])
+            room_devices[dev["id"]] = dev
+            next_id = max(next_id, dev["id"] + 1)
+        elif op == "remove":
+            room_devices.pop(record["id"], None)
+            room_edges.remove_device(record["id"])
+        elif op == "move":
+            dev = room_devices.get(record["id"])
+            if dev is not None:
+                dev["x"] = record["x"]
+                dev["y"] = record["y"]
+        elif op == "toggle":
+            dev = room_devices.get(record["id"])
+            if dev is not None:
+                dev["encendido"] = record["on"]
+                dev["conectado"] = record["conectado"]
+                dev["imagen"] = record["imagen"]
+        elif op == "connect":
+            a, b = record["a"], record["b"]
+            if a in room_devices and b in room_devices:
+                room_edges.add(a, b)
+
+    for room, room_devices in by_id.items():
+        devices[room] = list(room_devices.values())
+    for room, room_edges in edges.items():
+        wires[room] = room_edges.to_list() + malformed.get(room, [])
+    data["next_id"] = next_id
+    return data
+
+
+# SRP: this class only persists the house as a snapshot plus an append-only journal.
+# Every change the model reports becomes one compact line at the end of the journal
+# (a drag only keeps its last position), so a save costs the size of the change, not
+# of the house. Lines are fsynced in batches (every fsync_every records or on sync()).
+# When the journal passes compact_bytes it is folded into a fresh snapshot under a new
+# generation; a journal whose generation does not match the snapshot is stale (a crash
+# during compaction) and ignored. A torn last line (a crash during an append) is cut off.
+class ChangeJournal:
+    def __init__(self, compact_bytes=1024 * 1024, fsync_every=64):
+        self.compact_bytes = compact_bytes
+        self.fsync_every = fsync_every
+
+        self.model = None
+        self.snapshot_path = None
+        self.journal_path = None
+        self.generation = 0
+
+        self.records = 0          # records appended in this session
+        self.syncs = 0
+        self.compactions = 0
+        self.replayed = 0         # records applied by the last load
+
+        self._file = None
+        self._size = 0
+        self._unsynced = 0
+        self._moves = {}          # (room, id) -> pending move record
+        self._replaying = False
+
+    @staticmethod
+    def journal_path_for(snapshot_path):
+        return os.path.splitext(snapshot_path)[0] + ".journal"
+
+    # Loads snapshot + journal into model and starts journaling its changes.
+    # Returns False when neither file exists (the model is left as it is). A legacy
+    # snapshot the model cannot read raises LayoutError, and nothing is journaled.
+    def load(self, model, snapshot_path):
+        self.close()
+        if self.model is not model:
+            if self.model is not None:
+                self.model.unsubscribe(self.on_model_event)
+            model.subscribe(self.on_model_event)
+        self.model = model
+        self.snapshot_path = snapshot_path
+        self.journal_path = self.journal_path_for(snapshot_path)
+
+        data = {}
+        found = False
+        if os.path.exists(snapshot_path):
+            try:
+                with open(snapshot_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                found = True
+            except Exception:
+                data = {}
+        migrated = False
+        if "dispositivos" not in data and data:
+            # Old format: the model converts it and rewrites the file in the current one
+            self._replaying = True
+            try:
+                migrated = model.load(snapshot_path)
+            finally:
+                self._replaying = False
+            data = model.to_dict()
+        self.generation = int(data.get("journal_generation", 0))
+
+        records, good_size, stale = self._read_journal()
+        found = found or bool(records)
+        self.replayed = len(records)
+        if records:
+            replay(data, records)
+
+        if found and (records or not migrated):
+            self._replaying = True
+            try:
+                model.load_dict(data)
+            finally:
+                self._replaying = False
+
+        if stale:
+            self._start_journal()
+        else:
+            self._file = open(self.journal_path, "a", encoding="utf-8", newline="\n")
+            self._file.truncate(good_size)
+            self._size = good_size
+        return found
+
+    # Records of the journal that belong to the current snapshot, the size in bytes of
+    # its valid part, and whether it has to be started again
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return [], 0, True
+
+        records = []
+        good_size = 0
+        with open(self.journal_path, "rb") as f:
+            for number, line in enumerate(f):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if number == 0:
+                    if record.get("op") != "begin" or record.get("generation") != self.generation:
+                        return [], 0, True
+                else:
+                    records.append(record)
+                good_size += len(line)
+        if good_size == 0:
+            return [], 0, True
+        return records, good_size, False
+
+    def _start_journal(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.journal_path, "w", encoding="utf-8", newline="\n")
+        self._size = 0
+        self._write({"op": "begin", "generation": self.generation})
+        self._fsync()
+
+    # ---------------- WRITING ----------------
+    def on_model_event(self, event):
+        if self._replaying or self._file is None:
+            return
+        if event.kind == "loaded":
+            # Someone else replaced the whole house: it becomes the new snapshot
+            self.compact()
+            return
+        record = record_from_event(event)
+        if record is None:
+            return
+        if record["op"] == "move":
+            self._moves[(record["room"], record["id"])] = record
+            return
+        self.append(record)
+
+    def append(self, record):
+        self._flush_moves()
+        self._write(record)
+        self.records += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self._fsync()
+        if self._size >= self.compact_bytes:
+            self.compact()
+
+    def _flush_moves(self):
+        if not self._moves:
+            return
+        moves, self._moves = self._moves, {}
+        for record in moves.values():
+            self._write(record)
+            self.records += 1
+            self._unsynced += 1
+
+    def _write(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._file.write(line)
+        self._size += len(line)
+
+    def _fsync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self.syncs += 1
+
+    # Makes every change so far durable (called when the user stops editing and on close)
+    def sync(self):
+        if self._file is None:
+            return
+        self._flush_moves()
+        if self._unsynced:
+            self._fsync()
+        if self._size >= self.compact_bytes:
+            self.compact()
+
+    # Writes the whole house as the snapshot of a new generation and starts an empty journal
+    def compact(self):
+        if self.model is None or self.snapshot_path is None:
+            return
+        self._moves = {}
+        self.generation += 1
+        data = self.model.to_dict()
+        data["journal_generation"] = self.generation
+        HouseModel.write_dict(data, self.snapshot_path)
+        self._start_journal()
+        self.compactions += 1
+
+    # Every room is loaded up front
+    def ensure_room(self, room):
+        pass
+
+    def size(self):
+        return self._size
+
+    def close(self):
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
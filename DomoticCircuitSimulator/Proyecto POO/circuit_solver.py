@@ -0,0 +1,258 @@
+import math
+
+from bedroom_electronics import Bulb, DeskLamp, Lamp
+from kitchen_electronics import HeatSensor, MovementSensor
+from livingroom_electronics import TV, Computer, Radio
+
+# Optional accelerators: SciPy gives a direct sparse solve, NumPy a vectorized
+# conjugate gradient. Without them the same conjugate gradient runs in pure Python.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy.sparse import csc_matrix
+    from scipy.sparse.linalg import spsolve
+except ImportError:
+    csc_matrix = None
+    spsolve = None
+
+
+SOURCE_TYPE = "Voltage Source"
+NOMINAL_VOLTAGE = 5.0
+
+# Margin on the voltage and power limits of broken(): it absorbs the round-off of the
+# solve (about 1e-15), so a load at exactly its rating never reads as over-driven
+LIMIT_TOLERANCE = 1e-9
+
+# Rated power (W) of every load at NOMINAL_VOLTAGE. Loads are modelled as resistors,
+# R = V² / P, so a load draws more than its rating when it gets more than 5 V.
+RATED_POWER = {
+    "Bulb": 5.0,
+    "Lamp": 4.0,
+    "Living Room Lamp": 8.0,
+    "TV": 60.0,
+    "Radio": 10.0,
+    "Computer": 45.0,
+    "Heat Sensor": 0.5,
+    "Motion Sensor": 0.5,
+}
+
+# Device type -> model object of the ElectronicComponent hierarchy, whose broken()
+# is evaluated with the computed voltage and power
+COMPONENT_FACTORIES = {
+    "Bulb": lambda: Bulb("Bulb", 0.0, False, True, "warm"),
+    "Lamp": lambda: DeskLamp("Lamp", 0.0, False, True, "medium"),
+    "Living Room Lamp": lambda: Lamp("Living Room Lamp", 0.0, False, True, "warm", 1),
+    "TV": lambda: TV("TV", 0.0, False, True, 0),
+    "Radio": lambda: Radio("Radio", 0.0, False, True, 0),
+    "Computer": lambda: Computer("Computer", 0.0, False, True, 0),
+    "Heat Sensor": lambda: HeatSensor("Heat Sensor", 0.0, False, True, 25),
+    "Motion Sensor": lambda: MovementSensor("Motion Sensor", 0.0, False, True, False),
+}
+
+
+def make_component(tipo):
+    factory = COMPONENT_FACTORIES.get(tipo)
+    return factory() if factory is not None else None
+
+
+# Result of one solve. Devices outside a powered component are at 0 V.
+#   voltages:        device id -> node voltage (V)
+#   device_currents: device id -> current drawn by a load, or delivered by a source (A)
+#   wire_currents:   (origen, destino) -> current flowing from origen to destino (A)
+class CircuitSolution:
+    __slots__ = ("voltages", "device_currents", "wire_currents", "iterations", "backend")
+
+    def __init__(self, voltages, device_currents, wire_currents, iterations, backend):
+        self.voltages = voltages
+        self.device_currents = device_currents
+        self.wire_currents = wire_currents
+        self.iterations = iterations
+        self.backend = backend
+
+    def voltage(self, dev_id):
+        return self.voltages.get(dev_id, 0.0)
+
+    def current(self, dev_id):
+        return self.device_currents.get(dev_id, 0.0)
+
+    def power(self, dev_id):
+        return self.voltage(dev_id) * self.current(dev_id)
+
+
+# SRP: this class only computes the operating point of ONE room's circuit.
+# Every device is a node; a wire is a conductance between two nodes. A turned-on
+# source is an EMF behind its internal resistance (its Norton equivalent: a current
+# injection plus a conductance to ground), a load that is drawing power is a
+# resistor to ground and anything else is an open circuit. Nodal analysis gives the
+# system G·v = i, with G symmetric positive definite on every component that holds a
+# source. Components without one are skipped (0 V), so G is never singular.
+class CircuitSolver:
+    def __init__(self, source_voltage=NOMINAL_VOLTAGE, source_resistance=0.05, wire_resistance=0.02, tolerance=1e-10):
+        self.source_voltage = source_voltage
+        self.source_resistance = source_resistance
+        self.wire_resistance = wire_resistance
+        self.tolerance = tolerance
+
+    def load_conductance(self, tipo):
+        return RATED_POWER.get(tipo, 1.0) / (NOMINAL_VOLTAGE ** 2)
+
+    # devices: iterable of (id, tipo, conducting); wires: iterable of (origen, destino)
+    def solve(self, devices, wires):
+        source_g = 1.0 / self.source_resistance
+        wire_g = 1.0 / self.wire_resistance
+
+        present = set()
+        shunt = {}        # device id -> conductance to ground
+        sources = []
+        for dev_id, tipo, conducting in devices:
+            present.add(dev_id)
+            if not conducting:
+                continue
+            if tipo == SOURCE_TYPE:
+                shunt[dev_id] = source_g
+                sources.append(dev_id)
+            else:
+                shunt[dev_id] = self.load_conductance(tipo)
+
+        adjacency = {}
+        wire_list = []
+        for origen, destino in wires:
+            if origen == destino or origen not in present or destino not in present:
+                continue
+            adjacency.setdefault(origen, []).append(destino)
+            adjacency.setdefault(destino, []).append(origen)
+            wire_list.append((origen, destino))
+
+        # Nodes reachable from a source: the only ones with a non-zero voltage
+        index = {}
+        order = []
+        for source in sources:
+            if source in index:
+                continue
+            index[source] = len(order)
+            order.append(source)
+            stack = [source]
+            while stack:
+                node = stack.pop()
+                for other in adjacency.get(node, ()):
+                    if other not in index:
+                        index[other] = len(order)
+                        order.append(other)
+                        stack.append(other)
+
+        n = len(order)
+        diag = [shunt.get(dev_id, 0.0) for dev_id in order]
+        rhs = [0.0] * n
+        for source in sources:
+            rhs[index[source]] = self.source_voltage * source_g
+
+        rows = []
+        cols = []
+        for origen, destino in wire_list:
+            i = index.get(origen)
+            if i is None:
+                continue
+            j = index[destino]
+            diag[i] += wire_g
+            diag[j] += wire_g
+            rows.append(i)
+            cols.append(j)
+            rows.append(j)
+            cols.append(i)
+
+        x, iterations, backend = self._solve_system(diag, rows, cols, -wire_g, rhs)
+
+        voltages = dict.fromkeys(present, 0.0)
+        voltages.update(zip(order, x))
+
+        device_currents = {dev_id: voltages[dev_id] * g for dev_id, g in shunt.items()}
+        for source in sources:
+            device_currents[source] = (self.source_voltage - voltages[source]) * source_g
+
+        wire_currents = {
+            (origen, destino): (voltages[origen] - voltages[destino]) * wire_g
+            for origen, destino in wire_list
+        }
+        return CircuitSolution(voltages, device_currents, wire_currents, iterations, backend)
+
+    # ---------------- LINEAR SYSTEM ----------------
+    # diag: diagonal of G; (rows[k], cols[k]) are the off-diagonal entries, all equal to off_value
+    def _solve_system(self, diag, rows, cols, off_value, rhs):
+        n = len(diag)
+        if n == 0:
+            return [], 0, "empty"
+        if spsolve is not None:
+            data = list(diag) + [off_value] * len(rows)
+            matrix = csc_matrix((data, (list(range(n)) + rows, list(range(n)) + cols)), shape=(n, n))
+            return spsolve(matrix, rhs).tolist(), 1, "scipy"
+        if np is not None:
+            return self._conjugate_gradient_numpy(diag, rows, cols, off_value, rhs)
+        return self._conjugate_gradient_python(diag, rows, cols, off_value, rhs)
+
+    def _max_iterations(self, n):
+        return 10 * n + 100
+
+    # Jacobi-preconditioned conjugate gradient on COO arrays; G·x is one bincount
+    def _conjugate_gradient_numpy(self, diag, rows, cols, off_value, rhs):
+        n = len(diag)
+        d = np.asarray(diag, dtype=float)
+        r_index = np.asarray(rows, dtype=np.intp)
+        c_index = np.asarray(cols, dtype=np.intp)
+        b = np.asarray(rhs, dtype=float)
+
+        def matvec(v):
+            return d * v + off_value * np.bincount(r_index, weights=v[c_index], minlength=n)
+
+        x = b / d
+        r = b - matvec(x)
+        z = r / d
+        p = z.copy()
+        rz = r @ z
+        limit = self.tolerance * math.sqrt(b @ b)
+        iterations = 0
+        while iterations < self._max_iterations(n) and math.sqrt(r @ r) > limit:
+            ap = matvec(p)
+            alpha = rz / (p @ ap)
+            x += alpha * p
+            r -= alpha * ap
+            z = r / d
+            rz_next = r @ z
+            p = z + (rz_next / rz) * p
+            rz = rz_next
+            iterations += 1
+        return x.tolist(), iterations, "numpy"
+
+    def _conjugate_gradient_python(self, diag, rows, cols, off_value, rhs):
+        n = len(diag)
+        neighbours = [[] for _ in range(n)]
+        for i, j in zip(rows, cols):
+            neighbours[i].append(j)
+
+        def matvec(v):
+            return [diag[i] * v[i] + off_value * sum(v[j] for j in neighbours[i]) for i in range(n)]
+
+        def dot(a, b):
+            return sum(x * y for x, y in zip(a, b))
+
+        x = [b / d for b, d in zip(rhs, diag)]
+        r = [b - a for b, a in zip(rhs, matvec(x))]
+        z = [ri / d for ri, d in zip(r, diag)]
+        p = list(z)
+        rz = dot(r, z)
+        limit = self.tolerance * math.sqrt(dot(rhs, rhs))
+        iterations = 0
+        while iterations < self._max_iterations(n) and math.sqrt(dot(r, r)) > limit:
+            ap = matvec(p)
+            alpha = rz / dot(p, ap)
+            x = [xi + alpha * pi for xi, pi in zip(x, p)]
+            r = [ri - alpha * api for ri, api in zip(r, ap)]
+            z = [ri / d for ri, d in zip(r, diag)]
+            rz_next = dot(r, z)
+            beta = rz_next / rz
+            p = [zi + beta * pi for zi, pi in zip(z, p)]
+            rz = rz_next
+            iterations += 1
+        return x, iterations, "python"
@@ -0,0 +1,91 @@
+from PyQt5.QtCore import Qt, QRect
+from PyQt5.QtGui import QPixmap, QPainter
+
+
+# SRP: this class only composes the room image out of retained layers.
+#   - static layer: background + devices nobody is touching
+#   - wire layer: wires between untouched devices (transparent pixmap)
+#   - transient overlay: dragged / highlighted devices, their wires and the dashed preview
+# The static and wire layers are rebuilt only when the scene changes. Every other frame
+# just restores the areas the overlay covered before and paints the overlay again.
+class LayeredCompositor:
+    def __init__(self):
+        self.frame = None            # final image shown by the background label
+        self._static = None
+        self._wires = None
+        self._static_key = None
+        self._overlay_rects = []     # areas painted by the overlay in the last frame
+
+    def invalidate(self):
+        self._static_key = None
+
+    def needs_rebuild(self, key):
+        return self._static is None or self._static_key is None or key != self._static_key
+
+    # sprites: iterable of (x, y, pixmap); wires: iterable of (point1, point2, pen)
+    def rebuild(self, key, background, sprites, wires):
+        self._static = QPixmap(background)
+        painter = QPainter(self._static)
+        for x, y, sprite in sprites:
+            painter.drawPixmap(x, y, sprite)
+        painter.end()
+
+        self._wires = QPixmap(background.size())
+        self._wires.fill(Qt.transparent)
+        painter = QPainter(self._wires)
+        for p1, p2, pen in wires:
+            painter.setPen(pen)
+            painter.drawLine(p1, p2)
+        painter.end()
+
+        self.frame = QPixmap(self._static)
+        painter = QPainter(self.frame)
+        painter.drawPixmap(0, 0, self._wires)
+        painter.end()
+
+        self._static_key = key
+        self._overlay_rects = []
+
+    # items: ("sprite", x, y, pixmap) or ("line", point1, point2, pen), painted in order.
+    # Returns the rectangles of the frame that changed.
+    def update_overlay(self, items):
+        new_rects = [self._item_rect(item) for item in items]
+        frame_rect = self.frame.rect()
+
+        dirty = []
+        for rect in self._overlay_rects + new_rects:
+            rect = rect.intersected(frame_rect)
+            if not rect.isEmpty():
+                dirty.append(rect)
+
+        if not dirty:
+            self._overlay_rects = new_rects
+            return dirty
+
+        painter = QPainter(self.frame)
+        for rect in dirty:
+            painter.drawPixmap(rect, self._static, rect)
+            painter.drawPixmap(rect, self._wires, rect)
+
+        for item in items:
+            if item[0] == "sprite":
+                _, x, y, sprite = item
+                painter.drawPixmap(x, y, sprite)
+            else:
+                _, p1, p2, pen = item
+                painter.setPen(pen)
+                painter.drawLine(p1, p2)
+        painter.end()
+
+        self._overlay_rects = new_rects
+        return dirty
+
+    @staticmethod
+    def _item_rect(item):
+        if item[0] == "sprite":
+            _, x, y, sprite = item
+            return QRect(x, y, sprite.width(), sprite.height())
+
+        _, p1, p2, pen = item
+        margin = pen.width() + 2
+        return QRect(p1, p2).normalized().adjusted(-margin, -margin, margin, margin)
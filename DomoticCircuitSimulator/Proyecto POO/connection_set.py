@@ -0,0 +1,75 @@
+# SRP: this class only stores the wires of ONE room.
+# Every wire is keyed by its canonical edge (smallest id, largest id), so a duplicate in
+# either direction is a single hash lookup. Each device also keeps the set of edges that
+# touch it, so removing a device only visits its own wires.
+# The edge dict keeps insertion order and remembers the direction the wire was drawn in,
+# so iterating (and saving) gives the same order as the old list of connections.
+class ConnectionSet:
+    def __init__(self, connections=()):
+        self._edges = {}       # (min id, max id) -> (origen, destino)
+        self._incident = {}    # device id -> set of canonical edges touching it
+        for origen, destino in connections:
+            self.add(origen, destino)
+
+    @staticmethod
+    def edge(id1, id2):
+        return (id1, id2) if id1 <= id2 else (id2, id1)
+
+    def __len__(self):
+        return len(self._edges)
+
+    def __contains__(self, pair):
+        return self.edge(*pair) in self._edges
+
+    # (origen, destino) pairs in insertion order
+    def __iter__(self):
+        return iter(self._edges.values())
+
+    def add(self, origen, destino):
+        if origen == destino:
+            return False
+        key = self.edge(origen, destino)
+        if key in self._edges:
+            return False
+        self._edges[key] = (origen, destino)
+        self._incident.setdefault(origen, set()).add(key)
+        self._incident.setdefault(destino, set()).add(key)
+        return True
+
+    def remove(self, id1, id2):
+        key = self.edge(id1, id2)
+        if self._edges.pop(key, None) is None:
+            return False
+        for dev_id in key:
+            self._discard_incident(dev_id, key)
+        return True
+
+    # Removes every wire of the device; returns the removed (origen, destino) pairs
+    def remove_device(self, dev_id):
+        removed = []
+        for key in self._incident.pop(dev_id, ()):
+            removed.append(self._edges.pop(key))
+            other = key[1] if key[0] == dev_id else key[0]
+            self._discard_incident(other, key)
+        return removed
+
+    # (origen, destino) pairs of the wires touching any of the given devices
+    def incident_to(self, dev_ids):
+        keys = set()
+        for dev_id in dev_ids:
+            keys |= self._incident.get(dev_id, set())
+        return [self._edges[key] for key in keys]
+
+    def degree(self, dev_id):
+        return len(self._incident.get(dev_id, ()))
+
+    def to_list(self):
+        return [{"origen": int(o), "destino": int(d)} for o, d in self._edges.values()]
+
+    def _discard_incident(self, dev_id, key):
+        edges = self._incident.get(dev_id)
+        if edges is None:
+            return
+        edges.discard(key)
+        if not edges:
+            del self._incident[dev_id]
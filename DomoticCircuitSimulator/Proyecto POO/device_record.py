@@ -0,0 +1,32 @@
+# SRP: this class only holds the state of one device placed in a room.
+# __slots__ keeps every record small (no per-instance __dict__), which matters for
+# houses with thousands of devices. Field names follow the keys of the save file.
+class DeviceRecord:
+    __slots__ = ("id", "tipo", "imagen", "x", "y", "rect", "conectado", "encendido", "sensor_armado")
+
+    def __init__(self, dev_id: int, tipo: str, imagen: str, x: int = 0, y: int = 0,
+                 conectado: bool = True, encendido: bool = False, sensor_armado: bool = False):
+        self.id = dev_id
+        self.tipo = tipo
+        self.imagen = imagen
+        self.x = x
+        self.y = y
+        self.rect = None              # drawn rect, set by the renderer
+        self.conectado = conectado
+        self.encendido = encendido
+        self.sensor_armado = sensor_armado
+
+    # Entry written to the save file (the drawn rect and sensor arming are not persisted)
+    def to_dict(self):
+        return {
+            "id": int(self.id),
+            "tipo": self.tipo,
+            "imagen": self.imagen,
+            "x": int(self.x),
+            "y": int(self.y),
+            "conectado": bool(self.conectado),
+            "encendido": bool(self.encendido),
+        }
+
+    def __repr__(self):
+        return f"DeviceRecord(id={self.id}, tipo={self.tipo!r}, x={self.x}, y={self.y}, encendido={self.encendido})"
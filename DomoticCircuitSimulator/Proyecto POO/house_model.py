@@ -0,0 +1,648 @@
+import json
+import os
+import shutil
+from collections import namedtuple
+
+from circuit_solver import LIMIT_TOLERANCE, NOMINAL_VOLTAGE, CircuitSolver, make_component
+from connection_set import ConnectionSet
+from device_record import DeviceRecord
+from layout_loader import LayoutError, LayoutLoader, LoadReport
+from power_network import PowerNetwork
+from simulation_engine import SimulationEngine
+
+
+ROOMS = ["Living_room", "Kitchen", "room"]
+
+# Notification sent to every listener after the model changed.
+#   kind:   "device_added", "device_removed", "device_moved", "device_switched" (value: on),
+#           "device_forced_off", "device_broken" (value: (voltage, power)), "wire_added",
+#           "closed_circuit", "sensor_arming", "sensor_armed", "sensor_disarmed"
+#           (value: it was armed), "heat_alarm" (value: sounding), "temperature_changed",
+#           "loaded" (room: the room loaded on its own, or None for the whole house;
+#           value: the LoadReport of a whole-house load)
+#   room:   room key, or None for house-wide events
+#   device: the DeviceRecord concerned, or None
+ModelEvent = namedtuple("ModelEvent", ["kind", "room", "device", "value"])
+
+
+# SRP: this class only holds the state of the house and applies the simulator rules:
+# devices and wires of every room, persistence, power propagation from the voltage
+# sources, circuit solution, sensors and the simulation clock. It never imports Qt, so
+# it runs the same in the window, in batch jobs or in worker processes. Views subscribe
+# to the ModelEvent notifications and decide how to show them (images, sounds, logs).
+class HouseModel:
+    def __init__(self, rooms=None, motion_sensor_delay=3.0, temperature=25, use_simulation=True, assets=None,
+                 source_voltage=NOMINAL_VOLTAGE):
+        self.rooms = list(rooms) if rooms is not None else list(ROOMS)
+        self.assets = assets                               # AssetManifest, or None (images looked up on disk)
+        self.motion_sensor_delay = motion_sensor_delay     # seconds until a powered sensor is armed
+        self.temperature = temperature                     # ambient temperature (°C)
+        self.heat_alarm_threshold = 40
+
+        self.devices_by_room = {room: [] for room in self.rooms}
+        self.devices_by_id = {room: {} for room in self.rooms}   # room -> {id: DeviceRecord}
+        self.room_of_device = {}                                # id -> room
+        self.connections_by_room = {room: ConnectionSet() for room in self.rooms}
+        self.next_device_id = 1
+
+        # Per-room connectivity to turned-on voltage sources, kept up to date on every change
+        self.power_by_room = {room: PowerNetwork() for room in self.rooms}
+
+        # Node voltages and currents of each room, recomputed whenever a load or source switches.
+        # Loads are rated at NOMINAL_VOLTAGE: sources with a higher EMF over-drive them.
+        self.circuit_solver = CircuitSolver(source_voltage=source_voltage)
+        self.circuit_by_room = {room: None for room in self.rooms}
+        self.components_by_room = {room: {} for room in self.rooms}   # room -> {id: ElectronicComponent}
+        self.broken_by_room = {room: set() for room in self.rooms}
+
+        # Simulation clock. With NumPy the vectorized engine also integrates energy and room
+        # temperatures; without it only the sensor delays are timed, against self.time.
+        self.time = 0.0
+        self.simulation = None
+        if use_simulation and SimulationEngine.available():
+            self.simulation = SimulationEngine(len(self.rooms), ambient=temperature)
+        self._arming = {}            # motion sensor id -> time at which it is armed (no engine)
+        self.heat_alarm_on = False
+
+        self.last_load_report = None     # LoadReport of the last load / load_dict
+        self._listeners = []
+
+    # Listeners are not copied to worker processes
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_listeners"] = []
+        return state
+
+    # ---------------- NOTIFICATIONS ----------------
+    def subscribe(self, listener):
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, kind, room=None, device=None, value=None):
+        event = ModelEvent(kind, room, device, value)
+        for listener in list(self._listeners):
+            listener(event)
+
+    # ---------------- PERSISTENCE ----------------
+    # Streams and validates the file; a legacy file is rewritten once in the current format
+    # (the original is kept as <path>.bak). The report of the last load stays in
+    # last_load_report and travels with the "loaded" notification. Returns False when there
+    # is no file; a file that cannot be read at all raises LayoutError and leaves the house
+    # as it was.
+    def load(self, path):
+        if not os.path.exists(path):
+            return False
+        try:
+            layout = LayoutLoader(self.rooms).read_file(path)
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            report = LoadReport()
+            report.error = str(e) or type(e).__name__
+            self.last_load_report = report
+            raise LayoutError(report) from e
+
+        if layout.report.legacy:
+            try:
+                shutil.copyfile(path, path + ".bak")
+                self.write_dict(self._layout_to_dict(layout), path)
+                layout.report.migrated = True
+            except OSError:
+                pass
+        self.load_layout(layout)
+        return True
+
+    def save(self, path):
+        try:
+            self.write_dict(self.to_dict(), path)
+        except Exception:
+            return False
+        return True
+
+    # Writes a to_dict() snapshot atomically: a crash mid-write leaves the previous file.
+    # Only plain data is touched, so it may run on a background thread.
+    @staticmethod
+    def write_dict(data, path):
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    def to_dict(self):
+        data = {
+            "dispositivos": {},
+            "conexiones": {},
+            "next_id": self.next_device_id,
+            "temperatura": self.temperature,
+        }
+        for room, device_list in self.devices_by_room.items():
+            data["dispositivos"][room] = [dev.to_dict() for dev in device_list]
+        for room, room_connections in self.connections_by_room.items():
+            data["conexiones"][room] = room_connections.to_list()
+        return data
+
+    def clear(self):
+        self.devices_by_room = {room: [] for room in self.rooms}
+        self.devices_by_id = {room: {} for room in self.rooms}
+        self.room_of_device = {}
+        self.connections_by_room = {room: ConnectionSet() for room in self.rooms}
+        self.components_by_room = {room: {} for room in self.rooms}
+        self.broken_by_room = {room: set() for room in self.rooms}
+        self._arming = {}
+        if self.simulation is not None:
+            self.simulation.clear(ambient=self.temperature)
+
+    def load_dict(self, data):
+        try:
+            layout = LayoutLoader(self.rooms).read_dict(data)
+        except ValueError:
+            layout = LayoutLoader(self.rooms).read_dict({})
+        self.load_layout(layout)
+
+    def load_layout(self, layout):
+        if layout.temperature is not None:
+            self.temperature = layout.temperature
+        self.clear()
+
+        for room, record in layout.devices:
+            self.register_device(room, record)
+        for room, origen, destino in layout.wires:
+            self.connections_by_room[room].add(origen, destino)
+        self.next_device_id = layout.next_id
+        self.last_load_report = layout.report
+
+        for room in self.rooms:
+            self.rebuild_power_network(room)
+        self._emit("loaded", None, None, layout.report)
+
+    def _layout_to_dict(self, layout):
+        data = {
+            "dispositivos": {room: [] for room in self.rooms},
+            "conexiones": {room: [] for room in self.rooms},
+            "next_id": layout.next_id,
+            "temperatura": layout.temperature if layout.temperature is not None else self.temperature,
+        }
+        for room, record in layout.devices:
+            data["dispositivos"][room].append(record.to_dict())
+        for room, origen, destino in layout.wires:
+            data["conexiones"][room].append({"origen": origen, "destino": destino})
+        return data
+
+    # Replaces one room with the given device dicts and (origen, destino) wires, leaving
+    # the other rooms as they are (storage that loads rooms lazily)
+    def load_room(self, room, device_dicts, wires):
+        for dev in self.devices_by_room[room]:
+            self.room_of_device.pop(dev.id, None)
+            self._arming.pop(dev.id, None)
+            if self.simulation is not None:
+                self.simulation.remove_device(dev.id)
+        self.devices_by_room[room] = []
+        self.devices_by_id[room] = {}
+        self.connections_by_room[room] = ConnectionSet()
+        self.components_by_room[room] = {}
+        self.broken_by_room[room] = set()
+
+        for dev in device_dicts:
+            record = self._record_from_dict(dev)
+            self.register_device(room, record)
+            self.next_device_id = max(self.next_device_id, record.id + 1)
+
+        room_connections = self.connections_by_room[room]
+        for origen, destino in wires:
+            room_connections.add(origen, destino)
+
+        self.rebuild_power_network(room)
+        self._emit("loaded", room)
+
+    # Rows of a trusted store (the SQLite backend); files go through LayoutLoader
+    @staticmethod
+    def _record_from_dict(dev):
+        powered_on = bool(dev["encendido"])
+        return DeviceRecord(
+            int(dev["id"]),
+            dev["tipo"],
+            dev["imagen"],
+            int(dev["x"]),
+            int(dev["y"]),
+            conectado=bool(dev["conectado"]),
+            encendido=powered_on,
+            sensor_armado=powered_on and dev["tipo"] == "Motion Sensor",
+        )
+
+    # ---------------- DEVICE QUERIES ----------------
+    def device(self, room, dev_id):
+        return self.devices_by_id.get(room, {}).get(dev_id)
+
+    def is_active_source(self, dev):
+        return dev.tipo == "Voltage Source" and dev.conectado and dev.encendido
+
+    def has_active_source(self, room):
+        if room not in self.rooms:
+            return False
+        return self.power_by_room[room].has_active_source()
+
+    def is_powered(self, room, dev):
+        if room not in self.rooms:
+            return False
+        return self.power_by_room[room].is_powered(dev.id)
+
+    # Kept incrementally by the room's PowerNetwork: no graph rebuild, no recursion
+    def has_closed_circuit(self, room):
+        if room not in self.rooms:
+            return False
+        return self.power_by_room[room].has_cycle()
+
+    # Wires (both directions) that belong to a closed loop, so they can be highlighted
+    def closed_loop_wires(self, room):
+        wires = set()
+        if room not in self.rooms:
+            return wires
+        for loop in self.power_by_room[room].loops():
+            for i, dev_id in enumerate(loop):
+                wires.add((loop[i - 1], dev_id))
+                wires.add((dev_id, loop[i - 1]))
+        return wires
+
+    def motion_sensor_armed(self, room):
+        if room not in self.rooms:
+            return False
+        for dev in self.devices_by_room.get(room, []):
+            if dev.tipo == "Motion Sensor" and dev.sensor_armado:
+                return True
+        return False
+
+    # Connected heat sensors are the sensors of the room's PowerNetwork, which keeps how
+    # many of them are powered: no device is visited
+    def is_connected_heat_sensor(self, dev):
+        return dev.tipo == "Heat Sensor" and dev.conectado
+
+    def heat_sensor_active(self, room):
+        if room not in self.rooms:
+            return False
+        return self.power_by_room[room].powered_sensors() > 0
+
+    def energy_used(self, dev_id):
+        if self.simulation is None:
+            return None
+        return self.simulation.energy(dev_id)
+
+    # ---------------- DEVICE MUTATIONS ----------------
+    # Adds a device to a room keeping the list (drawing order) and the id index in sync.
+    # With a manifest its image is the one of its type and state, whatever the file said.
+    def register_device(self, room, dev):
+        if self.assets is not None:
+            self._update_image(dev)
+        self.devices_by_room[room].append(dev)
+        self.devices_by_id[room][dev.id] = dev
+        self.room_of_device[dev.id] = room
+        if self.simulation is not None:
+            self.simulation.add_device(dev.id, self.rooms.index(room), dev.tipo)
+
+    # Returns the new DeviceRecord, or None when the room already has its voltage source
+    def add_device(self, room, tipo, imagen):
+        if room not in self.rooms:
+            return None
+
+        if tipo == "Voltage Source":
+            for dev in self.devices_by_room[room]:
+                if dev.tipo == "Voltage Source":
+                    return None
+
+        dev_id = self.next_device_id
+        self.next_device_id += 1
+
+        new_dev = DeviceRecord(dev_id, tipo, imagen)
+        self.register_device(room, new_dev)
+        self.power_by_room[room].add_device(dev_id, sensor=self.is_connected_heat_sensor(new_dev))
+        self._emit("device_added", room, new_dev)
+        return new_dev
+
+    def remove_device(self, room, dev):
+        if room not in self.rooms or self.devices_by_id[room].get(dev.id) is not dev:
+            return False
+
+        if dev.tipo == "Motion Sensor":
+            self.disarm_motion_sensor(room, dev)
+
+        self.devices_by_room[room].remove(dev)
+        del self.devices_by_id[room][dev.id]
+        self.room_of_device.pop(dev.id, None)
+        self.power_by_room[room].remove_device(dev.id)
+        self.connections_by_room[room].remove_device(dev.id)
+        self.components_by_room[room].pop(dev.id, None)
+        self.broken_by_room[room].discard(dev.id)
+        if self.simulation is not None:
+            self.simulation.remove_device(dev.id)
+        self._emit("device_removed", room, dev)
+
+        if dev.tipo == "Voltage Source":
+            self.turn_off_loads(room)
+
+        self.update_loads(room)
+        return True
+
+    def move_device(self, room, dev, x, y):
+        dev.x = x
+        dev.y = y
+        self._emit("device_moved", room, dev)
+
+    # Returns None when the device was turned on, otherwise the reason:
+    # "no_source" (no turned-on source in the room) or "not_connected" (not wired to one)
+    def turn_on(self, room, dev):
+        if not dev.conectado:
+            dev.conectado = True
+            if room in self.rooms:
+                self.power_by_room[room].set_sensor(dev.id, self.is_connected_heat_sensor(dev))
+
+        if dev.tipo != "Voltage Source":
+            if not self.has_active_source(room):
+                return "no_source"
+            if not self.is_powered(room, dev):
+                return "not_connected"
+
+        self._switch(room, dev, True)
+        self._sync_source(room, dev)
+
+        if dev.tipo == "Voltage Source":
+            self.update_loads(room)
+        else:
+            self.solve_circuit(room)
+        return None
+
+    def turn_off(self, room, dev):
+        self._switch(room, dev, False)
+        self._sync_source(room, dev)
+
+        if dev.tipo == "Voltage Source":
+            self.turn_off_loads(room)
+
+        self.update_loads(room)
+
+    def turn_off_loads(self, room):
+        if room not in self.rooms:
+            return
+        for dev in self.devices_by_room[room]:
+            if dev.tipo != "Voltage Source":
+                self._switch(room, dev, False)
+
+    def _switch(self, room, dev, on):
+        dev.encendido = on
+        self._update_image(dev)
+        self._emit("device_switched", room, dev, on)
+
+    # Swaps the "... ON.png" / "... OFF.png" image of a device after it switched. With a
+    # manifest it is one lookup; without one (batch jobs) the variant is looked up on disk.
+    def _update_image(self, dev):
+        if self.assets is not None:
+            sprite = self.assets.sprite(dev.tipo, dev.encendido)
+            if sprite:
+                dev.imagen = sprite
+            return
+
+        path = dev.imagen
+        if not path:
+            return
+
+        base, ext = os.path.splitext(path)
+
+        if dev.encendido:
+            if " OFF" in base:
+                on_path = base.replace(" OFF", " ON") + ext
+                if os.path.exists(on_path):
+                    dev.imagen = on_path
+        else:
+            if " ON" in base:
+                off_path = base.replace(" ON", " OFF") + ext
+                if os.path.exists(off_path):
+                    dev.imagen = off_path
+
+    # ---------------- WIRES ----------------
+    # Returns True when the wire was added (False for duplicates and self-connections)
+    def connect(self, room, dev_origen, dev_destino):
+        if room not in self.rooms:
+            return False
+
+        id1 = dev_origen.id
+        id2 = dev_destino.id
+        if id1 is None or id2 is None or id1 == id2:
+            return False
+
+        if not self.connections_by_room[room].add(id1, id2):
+            return False
+
+        self.power_by_room[room].add_wire(id1, id2)
+        self._emit("wire_added", room, None, (dev_origen, dev_destino))
+        self.update_loads(room)
+
+        if self.has_closed_circuit(room):
+            self._emit("closed_circuit", room)
+        return True
+
+    # ---------------- POWER LOGIC ----------------
+    def rebuild_power_network(self, room):
+        network = PowerNetwork()
+        for dev in self.devices_by_room[room]:
+            network.add_device(dev.id, self.is_active_source(dev), self.is_connected_heat_sensor(dev))
+        for origen, destino in self.connections_by_room[room]:
+            network.add_wire(origen, destino)
+        network.take_changes()
+        self.power_by_room[room] = network
+        self.solve_circuit(room)
+
+    # Must be called whenever a voltage source is turned on/off or (dis)connected
+    def _sync_source(self, room, dev):
+        if dev.tipo == "Voltage Source" and room in self.rooms:
+            self.power_by_room[room].set_source_active(dev.id, self.is_active_source(dev))
+
+    # Only devices whose powered state changed since the last call are visited
+    def update_loads(self, room):
+        if room not in self.rooms:
+            return
+
+        for dev_id in sorted(self.power_by_room[room].take_changes()):
+            dev = self.device(room, dev_id)
+            if dev is None or dev.tipo == "Voltage Source":
+                continue
+
+            if dev.tipo == "Motion Sensor":
+                powered = dev.conectado and self.is_powered(room, dev)
+                if powered:
+                    self.schedule_motion_sensor(room, dev)
+                else:
+                    self.disarm_motion_sensor(room, dev)
+                continue
+
+            if not dev.conectado:
+                if dev.encendido:
+                    dev.encendido = False
+                    self._update_image(dev)
+                    self._emit("device_forced_off", room, dev)
+                continue
+
+            powered = self.is_powered(room, dev)
+
+            if powered and not dev.encendido:
+                self._switch(room, dev, True)
+            elif not powered and dev.encendido:
+                self._switch(room, dev, False)
+
+        self.solve_circuit(room)
+        self.update_heat_alarm()
+
+    # ---------------- CIRCUIT SOLUTION (VOLTAGES AND CURRENTS) ----------------
+    def conducts(self, dev):
+        if dev.tipo == "Voltage Source":
+            return self.is_active_source(dev)
+        return dev.conectado and dev.encendido
+
+    def solve_circuit(self, room):
+        if room not in self.rooms:
+            return None
+        devices = [(dev.id, dev.tipo, self.conducts(dev)) for dev in self.devices_by_room[room]]
+        solution = self.circuit_solver.solve(devices, self.connections_by_room[room])
+        self.circuit_by_room[room] = solution
+        self._check_broken(room, solution)
+        if self.simulation is not None:
+            self._push_to_simulation(room, solution)
+        return solution
+
+    # EMF of every voltage source; the circuits of all rooms are solved again with it
+    def set_source_voltage(self, volts):
+        self.circuit_solver.source_voltage = float(volts)
+        for room in self.rooms:
+            self.solve_circuit(room)
+        self.update_heat_alarm()
+
+    # broken() of each component model is evaluated with the computed voltage and power,
+    # less LIMIT_TOLERANCE. Only devices whose operating point changed are checked again.
+    def _check_broken(self, room, solution):
+        components = self.components_by_room[room]
+        broken = self.broken_by_room[room]
+        for dev in self.devices_by_room[room]:
+            component = components.get(dev.id)
+            if component is None:
+                component = make_component(dev.tipo)
+                if component is None:
+                    continue
+                components[dev.id] = component
+
+            voltage = solution.voltage(dev.id)
+            power = solution.power(dev.id)
+            checked_voltage = voltage - LIMIT_TOLERANCE
+            checked_power = power - LIMIT_TOLERANCE
+            if (abs(component.voltage - checked_voltage) < 1e-12
+                    and abs(getattr(component, "power", checked_power) - checked_power) < 1e-12):
+                continue
+            component.voltage = checked_voltage
+            if hasattr(component, "power"):
+                component.power = checked_power
+
+            if component.broken():
+                if dev.id not in broken:
+                    broken.add(dev.id)
+                    self._emit("device_broken", room, dev, (voltage, power))
+            else:
+                broken.discard(dev.id)
+
+    # Loads heat their room with the power they draw; sources only deliver it
+    def _push_to_simulation(self, room, solution):
+        keys = []
+        powers = []
+        active = []
+        for dev in self.devices_by_room[room]:
+            keys.append(dev.id)
+            powers.append(0.0 if dev.tipo == "Voltage Source" else solution.power(dev.id))
+            active.append(dev.conectado and solution.voltage(dev.id) > 0.0)
+        self.simulation.update_devices(keys, powers, active)
+
+    # ---------------- SIMULATION CLOCK ----------------
+    def advance(self, seconds):
+        self.time += seconds
+        if self.simulation is not None:
+            self.simulation.advance(seconds)
+            armed = self.simulation.take_armed()
+        else:
+            armed = [dev_id for dev_id, at in self._arming.items() if at <= self.time]
+
+        for dev_id in armed:
+            self._arming.pop(dev_id, None)
+            room = self.room_of_device.get(dev_id)
+            sensor = self.device(room, dev_id)
+            if sensor is None:
+                continue
+            if sensor.conectado and self.is_powered(room, sensor):
+                self.arm_motion_sensor(room, dev_id)
+
+        if self.simulation is not None and self._heat_alarm_due() != self.heat_alarm_on:
+            self.update_heat_alarm()
+
+    def room_temperature(self, room):
+        if self.simulation is not None and room in self.rooms:
+            return self.simulation.room_temperature(self.rooms.index(room))
+        return self.temperature
+
+    def set_temperature(self, value):
+        self.temperature = value
+        if self.simulation is not None:
+            self.simulation.ambient = value
+        self._emit("temperature_changed", None, None, value)
+        self.update_heat_alarm()
+
+    # ---------------- MOTION SENSOR ----------------
+    def schedule_motion_sensor(self, room, dev):
+        dev_id = dev.id
+        if dev_id is None or dev.sensor_armado:
+            return
+
+        if self.simulation is not None:
+            if self.simulation.is_arming(dev_id):
+                return
+            self.simulation.start_arming(dev_id, self.motion_sensor_delay)
+        else:
+            if dev_id in self._arming:
+                return
+            self._arming[dev_id] = self.time + self.motion_sensor_delay
+        self._emit("sensor_arming", room, dev)
+
+    def arm_motion_sensor(self, room, dev_id):
+        dev = self.device(room, dev_id)
+        if dev is None:
+            return
+
+        dev.sensor_armado = True
+        dev.encendido = True
+        self._update_image(dev)
+        self._emit("sensor_armed", room, dev)
+
+    def disarm_motion_sensor(self, room, dev):
+        dev_id = dev.id
+        if dev_id is None:
+            return
+
+        self._arming.pop(dev_id, None)
+        if self.simulation is not None:
+            self.simulation.cancel_arming(dev_id)
+
+        was_armed = dev.sensor_armado or dev.encendido
+        if was_armed:
+            dev.sensor_armado = False
+            dev.encendido = False
+            self._update_image(dev)
+        self._emit("sensor_disarmed", room, dev, was_armed)
+
+    # ---------------- HEAT SENSOR ----------------
+    def update_heat_alarm(self):
+        should_alarm = self._heat_alarm_due()
+        self.heat_alarm_on = should_alarm
+        self._emit("heat_alarm", None, None, should_alarm)
+
+    # An ambient temperature over the threshold sounds the alarm at once wherever a heat
+    # sensor is powered. With the simulation, a room that its loads heated past the
+    # threshold does too (simulated rooms follow the ambient with a thermal delay).
+    def _heat_alarm_due(self):
+        if self.temperature > self.heat_alarm_threshold:
+            for room in self.rooms:
+                if self.heat_sensor_active(room):
+                    return True
+        return self.simulation is not None and bool(self.simulation.heat_alarm_rooms())
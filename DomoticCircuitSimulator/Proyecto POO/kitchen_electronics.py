@@ -15,7 +15,7 @@ class HeatSensor(Sensors):
     # LSP: A sensor behaves like an electronic component.
     # ISP: Break functionality only added where needed.
     def __init__(self, name, voltage, polarized, connected, temperature: int):
-        super().__init__("Heat Sensor", polarized, connected)
+        super().__init__(name, voltage, polarized, connected)
         self.temperature = temperature
 
     def turn_on(self):
@@ -30,6 +30,8 @@ class HeatSensor(Sensors):
     def broken(self):
         if self.voltage > 10: 
             print(f"{self.name} broke!. To much power.")
+            return True
+        return False
 
     def temperature_alarm(self):
         if self.temperature > 30:
@@ -57,6 +59,8 @@ class MovementSensor(Sensors):
     def broken(self):
         if self.voltage > 10: 
             print(f"{self.name} broke!. To much power.")
+            return True
+        return False
 
     def movement_alarm(self):
         if self.laser == True:
@@ -0,0 +1,214 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+
+from house_model import ROOMS
+
+
+SOURCE_TYPE = "Voltage Source"
+
+# Image of every device type as it is saved by the window (devices start OFF)
+IMAGE_FILES = {
+    "Lamp": "Desk Lamp OFF.png",
+    "Radio": "Radio.png",
+    "Bulb": "Bulb OFF.png",
+    "Heat Sensor": "Heat Sensor.png",
+    "Computer": "PC OFF.png",
+    "Voltage Source": "Voltage Source.png",
+    "TV": "TV OFF.png",
+    "Motion Sensor": "Motion Sensor.png",
+    "Living Room Lamp": "Lamp Living Room OFF.png",
+}
+
+DEFAULT_TYPE_MIX = {
+    "Bulb": 3,
+    "Lamp": 2,
+    "Living Room Lamp": 1,
+    "TV": 1,
+    "Radio": 1,
+    "Computer": 1,
+    "Heat Sensor": 1,
+    "Motion Sensor": 1,
+}
+
+# How the devices of a room are wired (sources are always the first nodes):
+#   tree:  every device hangs from a random earlier one (no closed circuits)
+#   mesh:  grid lattice; horizontal wires always, vertical wires with probability
+#          density (the first column always, so the room stays connected)
+#   chain: one long line of wires
+#   cycle: a chain closed on itself
+TOPOLOGIES = ("tree", "mesh", "chain", "cycle")
+
+
+# SRP: this class only writes synthetic save files for scale testing.
+# The output follows the dispositivos/conexiones/next_id schema of HouseModel.save,
+# and it is written record by record: neither the devices nor the wires are ever
+# held in memory, so layouts of millions of devices are fine. Every room draws from
+# its own random stream (seed + room), so the same arguments always give the same file.
+class LayoutGenerator:
+    def __init__(self, devices_per_room=None, type_mix=None, topology="tree", density=1.0,
+                 sources_per_room=1, powered_sources=None, seed=0, width=800, height=550, image_dir=None):
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown topology '{topology}', expected one of {', '.join(TOPOLOGIES)}")
+
+        type_mix = dict(type_mix or DEFAULT_TYPE_MIX)
+        unknown = [tipo for tipo in type_mix if tipo not in IMAGE_FILES or tipo == SOURCE_TYPE]
+        if unknown:
+            raise ValueError(f"Unknown device types in the mix: {', '.join(unknown)}")
+        if not any(weight > 0 for weight in type_mix.values()):
+            raise ValueError("The type mix needs at least one positive weight")
+
+        if devices_per_room is None:
+            devices_per_room = {room: 10 for room in ROOMS}
+        elif isinstance(devices_per_room, int):
+            devices_per_room = {room: devices_per_room for room in ROOMS}
+
+        self.devices_per_room = {room: max(0, int(devices_per_room.get(room, 0))) for room in ROOMS}
+        self.types = list(type_mix)
+        self.weights = [max(0.0, float(type_mix[tipo])) for tipo in self.types]
+        self.topology = topology
+        self.density = density
+        self.sources_per_room = max(0, sources_per_room)
+        self.powered_sources = self.sources_per_room if powered_sources is None else powered_sources
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.image_dir = image_dir if image_dir is not None else os.path.dirname(os.path.abspath(__file__))
+
+    # Ids of a room: rooms are numbered one after another, sources first
+    def room_ids(self, room):
+        first = 1
+        for other in ROOMS:
+            count = self.room_size(other)
+            if other == room:
+                return range(first, first + count)
+            first += count
+        return range(0)
+
+    def room_size(self, room):
+        count = self.devices_per_room.get(room, 0)
+        return count + self.sources_per_room if count else 0
+
+    def total_devices(self):
+        return sum(self.room_size(room) for room in ROOMS)
+
+    def _rng(self, room, section):
+        return random.Random(f"{self.seed}:{room}:{section}")
+
+    def iter_devices(self, room):
+        rng = self._rng(room, "devices")
+        ids = self.room_ids(room)
+        for n, dev_id in enumerate(ids):
+            is_source = n < self.sources_per_room
+            tipo = SOURCE_TYPE if is_source else rng.choices(self.types, self.weights)[0]
+            yield {
+                "id": dev_id,
+                "tipo": tipo,
+                "imagen": os.path.join(self.image_dir, IMAGE_FILES[tipo]),
+                "x": rng.randrange(1, self.width),
+                "y": rng.randrange(1, self.height),
+                "conectado": True,
+                "encendido": is_source and n < self.powered_sources,
+            }
+
+    def iter_wires(self, room):
+        ids = self.room_ids(room)
+        n = len(ids)
+        if n < 2:
+            return
+        rng = self._rng(room, "wires")
+
+        if self.topology == "tree":
+            for i in range(1, n):
+                yield ids[rng.randrange(i)], ids[i]
+
+        elif self.topology in ("chain", "cycle"):
+            for i in range(1, n):
+                yield ids[i - 1], ids[i]
+            if self.topology == "cycle" and n > 2:
+                yield ids[-1], ids[0]
+
+        else:
+            columns = math.ceil(math.sqrt(n))
+            for i in range(n):
+                if i % columns:
+                    yield ids[i - 1], ids[i]
+                if i >= columns and (i % columns == 0 or rng.random() < self.density):
+                    yield ids[i - columns], ids[i]
+
+    # Writes the layout to path (through a temporary file, so a half-written layout never
+    # replaces a good one). Returns (devices, wires) written.
+    def write(self, path, temperature=25):
+        temp_path = path + ".tmp"
+        device_count = 0
+        wire_count = 0
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write('{"dispositivos": {')
+            for r, room in enumerate(ROOMS):
+                f.write(f'{", " if r else ""}{json.dumps(room)}: [')
+                for i, dev in enumerate(self.iter_devices(room)):
+                    f.write(("," if i else "") + "\n" + json.dumps(dev))
+                    device_count += 1
+                f.write("]")
+
+            f.write('}, "conexiones": {')
+            for r, room in enumerate(ROOMS):
+                f.write(f'{", " if r else ""}{json.dumps(room)}: [')
+                for i, (origen, destino) in enumerate(self.iter_wires(room)):
+                    f.write(("," if i else "") + f'\n{{"origen": {origen}, "destino": {destino}}}')
+                    wire_count += 1
+                f.write("]")
+
+            f.write(f'}}, "next_id": {self.total_devices() + 1}, "temperatura": {int(temperature)}}}\n')
+
+        os.replace(temp_path, path)
+        return device_count, wire_count
+
+
+# "Bulb=3,TV=1" -> {"Bulb": 3.0, "TV": 1.0}
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        tipo, _, weight = item.partition("=")
+        mix[tipo.strip()] = float(weight) if weight else 1.0
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Writes a synthetic Elechouse layout for scale testing.")
+    parser.add_argument("output", help="layout file to write, e.g. posiciones_dispositivos.json")
+    parser.add_argument("--devices", type=int, default=10, help="devices in every room (sources not included)")
+    parser.add_argument("--room", action="append", default=[], metavar="ROOM=COUNT",
+                        help=f"devices of one room ({', '.join(ROOMS)}); overrides --devices")
+    parser.add_argument("--mix", type=parse_mix, help="type weights, e.g. 'Bulb=3,TV=1,Radio=1'")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default="tree")
+    parser.add_argument("--density", type=float, default=1.0, help="share of vertical wires in a mesh")
+    parser.add_argument("--sources", type=int, default=1, help="voltage sources in every room")
+    parser.add_argument("--powered", type=int, help="turned-on sources in every room (default: all)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    devices_per_room = {room: args.devices for room in ROOMS}
+    for item in args.room:
+        room, _, count = item.partition("=")
+        if room not in ROOMS:
+            parser.error(f"unknown room '{room}'")
+        devices_per_room[room] = int(count)
+
+    try:
+        generator = LayoutGenerator(devices_per_room, args.mix, args.topology, args.density,
+                                    args.sources, args.powered, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    devices, wires = generator.write(args.output)
+    print(f"{args.output}: {devices} devices, {wires} wires")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
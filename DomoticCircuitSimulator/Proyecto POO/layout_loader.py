@@ -0,0 +1,437 @@
+import json
+import re
+from collections import Counter, namedtuple
+from operator import itemgetter
+
+from circuit_solver import RATED_POWER, SOURCE_TYPE
+from device_record import DeviceRecord
+
+
+KNOWN_TYPES = frozenset(RATED_POWER) | {SOURCE_TYPE}
+
+# Validated content of a save file, ready for HouseModel:
+#   devices: list of (room, DeviceRecord), in file order
+#   wires:   list of (room, origen, destino)
+Layout = namedtuple("Layout", ["devices", "wires", "next_id", "temperature", "report"])
+
+
+# What a load accepted and what it rejected (reason -> count), instead of dropping silently
+class LoadReport:
+    def __init__(self):
+        self.devices = 0
+        self.wires = 0
+        self.rejected = Counter()
+        self.legacy = False        # the file used the old per-room format
+        self.migrated = False      # ... and was rewritten in the current one
+        self.error = None          # why the file could not be read at all
+
+    def reject(self, reason, count=1):
+        self.rejected[reason] += count
+
+    @property
+    def rejected_total(self):
+        return sum(self.rejected.values())
+
+    def summary(self):
+        if self.error is not None:
+            return f"unreadable: {self.error}"
+        text = f"{self.devices} devices, {self.wires} wires"
+        if self.rejected:
+            text += "; rejected: " + ", ".join(f"{count} {reason}" for reason, count in self.rejected.most_common())
+        return text
+
+
+# A save file that could not be read at all (not JSON, cut short, not an object): nothing
+# was loaded, and report.error says why
+class LayoutError(ValueError):
+    def __init__(self, report):
+        super().__init__(report.error)
+        self.report = report
+
+
+# Type check of the fields of a record, compiled once: one itemgetter call and one tuple
+# comparison, both in C. Records that pass need no further conversion.
+class RecordSchema:
+    def __init__(self, fields):
+        self.keys = tuple(name for name, _ in fields)
+        self.types = tuple(field_type for _, field_type in fields)
+        self._getter = itemgetter(*self.keys)
+
+    # The values of the fields, in order, or None when one is missing or of another type
+    def values(self, record):
+        try:
+            values = self._getter(record)
+        except (KeyError, TypeError):
+            return None
+        if tuple(map(type, values)) != self.types:
+            return None
+        return values
+
+
+DEVICE_SCHEMA = RecordSchema([
+    ("id", int), ("tipo", str), ("imagen", str), ("x", int), ("y", int), ("conectado", bool), ("encendido", bool),
+])
+WIRE_SCHEMA = RecordSchema([("origen", int), ("destino", int)])
+
+CURRENT_SECTIONS = ("dispositivos", "conexiones")
+
+
+# The format rule both readers share: a dispositivos or conexiones object at the top
+# level makes the file current. A section that is not an object is rejected instead.
+def _is_current_section(key, is_object):
+    return key in CURRENT_SECTIONS and is_object
+
+
+def _to_int(value):
+    if isinstance(value, bool):
+        raise ValueError("bool is not a number")
+    return int(value)
+
+
+# Incremental reader of one JSON document: keeps only a window of the file in memory and
+# decodes one value at a time, so arrays of any length are walked element by element
+class JsonStream:
+    _whitespace = re.compile(r"\s*")
+    _delimiter = re.compile(r"\s*([,\]])\s*")
+    _number_chars = frozenset("0123456789.eE+-")
+
+    def __init__(self, f, chunk_size=64 * 1024, max_value_bytes=16 * 1024 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.max_value_bytes = max_value_bytes
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    # Next non-blank character ("" at the end of the file), without consuming it
+    def peek(self):
+        while True:
+            self.pos = self._whitespace.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected '{char}' in the layout file")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the window may continue in the next chunk, also
+                # when the window ends in its fraction or exponent ("1." or "2e")
+                if self.eof or (end < len(self.buffer) and self.buffer[end] not in self._number_chars):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise ValueError("malformed value in the layout file")
+            if len(self.buffer) - self.pos > self.max_value_bytes:
+                raise ValueError("value too large in the layout file")
+            self._fill()
+
+    def _walk(self, opening, closing, read):
+        self.expect(opening)
+        if self.peek() == closing:
+            self.pos += 1
+            return
+        while True:
+            yield read()
+            char = self.peek()
+            self.pos += 1
+            if char == closing:
+                return
+            if char != ",":
+                raise ValueError(f"expected ',' or '{closing}' in the layout file")
+
+    # Keys of the object at the current position; the caller consumes each value
+    def keys(self):
+        def read_key():
+            key = self.value()
+            if not isinstance(key, str):
+                raise ValueError("object key is not a string in the layout file")
+            self.expect(":")
+            return key
+        return self._walk("{", "}", read_key)
+
+    # Elements of the array at the current position. The part of the window up to its last
+    # "}" is decoded in one call, wrapped in brackets: if it parses, it held whole elements
+    # (or the end of the array). Otherwise (the cut fell inside an element) the window is
+    # walked one element at a time; only an element that crosses the edge goes through value()
+    def elements(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        decode = self.decoder.raw_decode
+        scan = self.decoder.scan_once
+        delimiter = self._delimiter.match
+        single_until = -1
+        while True:
+            buffer = self.buffer
+            cut = buffer.rfind("}", self.pos) + 1
+            if cut > max(self.pos, single_until):
+                text = "[" + buffer[self.pos:cut] + "]"
+                try:
+                    batch, end = decode(text)
+                except ValueError:
+                    single_until = cut
+                else:
+                    yield from batch
+                    if end < len(text):
+                        # The "]" of the array was inside the window
+                        self.pos += end - 1
+                        return
+                    self.pos = cut
+                    char = self.peek()
+                    self.pos += 1
+                    if char == "]":
+                        return
+                    if char != ",":
+                        raise ValueError("expected ',' or ']' in the layout file")
+                    single_until = -1
+                    continue
+
+            try:
+                value, end = scan(buffer, self.pos)
+                match = delimiter(buffer, end)
+            except (StopIteration, ValueError):
+                match = None
+            if match is not None and match.end() < len(buffer):
+                char = match.group(1)
+                self.pos = match.end()
+            else:
+                value = self.value()
+                char = self.peek()
+                self.pos += 1
+                single_until = -1
+
+            yield value
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError("expected ',' or ']' in the layout file")
+
+
+# Validates records one by one as the reader (file stream or dict) produces them
+class _LayoutBuilder:
+    def __init__(self, rooms):
+        self.rooms = rooms
+        self.report = LoadReport()
+        self.devices = []
+        self.ids = set()
+        self.room_of = {}
+        self.unnumbered = []        # records with no valid id: numbered after the others
+        self.raw_wires = []
+        self.legacy_devices = []
+        self.current_format = False
+        self.next_id = None
+        self.temperature = None
+
+    def device(self, room, dev, legacy=False):
+        if room not in self.rooms:
+            self.report.reject("in an unknown room")
+            return
+        values = DEVICE_SCHEMA.values(dev)
+        if values is not None:
+            dev_id, tipo, image_path, x, y, conectado, encendido = values
+            if tipo not in KNOWN_TYPES:
+                self.report.reject("of an unknown type")
+                return
+            record = DeviceRecord(0 if legacy else dev_id, tipo, image_path, x, y, conectado, encendido,
+                                  encendido and tipo == "Motion Sensor")
+        else:
+            record = self._coerce_device(dev, legacy)
+            if record is None:
+                return
+
+        if legacy:
+            self.legacy_devices.append((room, record))
+        elif record.id <= 0:
+            self.unnumbered.append((room, record))
+        elif record.id in self.ids:
+            self.report.reject("with a duplicate id")
+        else:
+            self.ids.add(record.id)
+            self.room_of[record.id] = room
+            self.devices.append((room, record))
+
+    # Slow path: missing flags get their defaults, numbers written as strings or floats
+    # are converted; anything else rejects the record
+    def _coerce_device(self, dev, legacy):
+        if not isinstance(dev, dict):
+            self.report.reject("that are not objects")
+            return None
+        tipo = dev.get("tipo")
+        if tipo not in KNOWN_TYPES:
+            self.report.reject("of an unknown type")
+            return None
+        try:
+            dev_id = 0 if legacy else _to_int(dev.get("id", 0))
+        except (TypeError, ValueError):
+            dev_id = 0
+        try:
+            x = _to_int(float(dev.get("x", 0)))
+            y = _to_int(float(dev.get("y", 0)))
+        except (TypeError, ValueError, OverflowError):
+            self.report.reject("with an invalid position")
+            return None
+        image_path = dev.get("imagen", "")
+        if not isinstance(image_path, str):
+            image_path = ""
+        powered_on = bool(dev.get("encendido", False))
+        return DeviceRecord(
+            dev_id, tipo, image_path, x, y,
+            conectado=bool(dev.get("conectado", True)),
+            encendido=powered_on,
+            sensor_armado=powered_on and tipo == "Motion Sensor",
+        )
+
+    def wire(self, room, wire):
+        values = WIRE_SCHEMA.values(wire)
+        if values is not None:
+            self.raw_wires.append((room, *values))
+            return
+        try:
+            self.raw_wires.append((room, _to_int(wire.get("origen")), _to_int(wire.get("destino"))))
+        except (AttributeError, TypeError, ValueError):
+            self.report.reject("invalid wires")
+
+    def finish(self):
+        report = self.report
+        if self.current_format:
+            if self.legacy_devices:
+                report.reject("legacy records next to the current format", len(self.legacy_devices))
+            pending = self.unnumbered
+        else:
+            report.legacy = bool(self.legacy_devices)
+            pending = self.legacy_devices
+
+        max_id = max(self.ids, default=0)
+        for room, record in pending:
+            max_id += 1
+            record.id = max_id
+            self.room_of[record.id] = room
+            self.devices.append((room, record))
+
+        wires = []
+        seen = set()
+        for room, origen, destino in self.raw_wires:
+            if room not in self.rooms:
+                report.reject("in an unknown room")
+            elif origen == destino:
+                report.reject("self-connections")
+            elif self.room_of.get(origen) != room or self.room_of.get(destino) != room:
+                report.reject("wires to unknown devices")
+            else:
+                key = (room, origen, destino) if origen < destino else (room, destino, origen)
+                if key in seen:
+                    report.reject("duplicate wires")
+                    continue
+                seen.add(key)
+                wires.append((room, origen, destino))
+
+        next_id = max_id + 1
+        try:
+            next_id = max(next_id, _to_int(self.next_id))
+        except (TypeError, ValueError):
+            pass
+        temperature = None
+        try:
+            temperature = int(self.temperature)
+        except (TypeError, ValueError):
+            pass
+
+        report.devices = len(self.devices)
+        report.wires = len(wires)
+        return Layout(self.devices, wires, next_id, temperature, report)
+
+
+# SRP: this class only turns save files (or their dicts) into validated layouts.
+# Files are read with JsonStream, so memory holds the records being built and a window
+# of the text, never the whole document and its parsed tree at once. Both formats go
+# through the same validation: the current one (dispositivos/conexiones/next_id) and the
+# legacy one (a list of devices per room, no ids or wires), which the report flags so
+# the caller can rewrite the file once in the current format.
+class LayoutLoader:
+    def __init__(self, rooms, chunk_size=64 * 1024):
+        self.rooms = list(rooms)
+        self.chunk_size = chunk_size
+
+    def read_file(self, path):
+        builder = _LayoutBuilder(self.rooms)
+        with open(path, "r", encoding="utf-8") as f:
+            stream = JsonStream(f, self.chunk_size)
+            for key in stream.keys():
+                if _is_current_section(key, stream.peek() == "{"):
+                    builder.current_format = True
+                    for room in stream.keys():
+                        self._read_room(stream, builder, key, room)
+                elif key in CURRENT_SECTIONS:
+                    stream.value()
+                    builder.report.reject("rooms that are not lists")
+                elif key in self.rooms and stream.peek() == "[":
+                    for dev in stream.elements():
+                        builder.device(key, dev, legacy=True)
+                elif key == "next_id":
+                    builder.next_id = stream.value()
+                elif key == "temperatura":
+                    builder.temperature = stream.value()
+                else:
+                    stream.value()
+            if stream.peek() != "":
+                raise ValueError("unexpected data after the layout")
+        return builder.finish()
+
+    def _read_room(self, stream, builder, section, room):
+        if stream.peek() != "[":
+            stream.value()
+            builder.report.reject("rooms that are not lists")
+            return
+        for record in stream.elements():
+            if section == "dispositivos":
+                builder.device(room, record)
+            else:
+                builder.wire(room, record)
+
+    def read_dict(self, data):
+        builder = _LayoutBuilder(self.rooms)
+        if not isinstance(data, dict):
+            raise ValueError("the layout is not an object")
+        builder.current_format = any(_is_current_section(key, isinstance(data.get(key), dict))
+                                     for key in CURRENT_SECTIONS)
+        for section, add in (("dispositivos", builder.device), ("conexiones", builder.wire)):
+            if section not in data:
+                continue
+            rooms = data[section]
+            if not isinstance(rooms, dict):
+                builder.report.reject("rooms that are not lists")
+                continue
+            for room, records in rooms.items():
+                if not isinstance(records, list):
+                    builder.report.reject("rooms that are not lists")
+                    continue
+                for record in records:
+                    add(room, record)
+        for room in self.rooms:
+            records = data.get(room)
+            if isinstance(records, list):
+                for dev in records:
+                    builder.device(room, dev, legacy=True)
+        builder.next_id = data.get("next_id")
+        builder.temperature = data.get("temperatura")
+        return builder.finish()
@@ -23,6 +23,8 @@ class TV(Electrodomestics):
     def broken(self):
         if self.power > 120: 
             print(f"{self.name} broke!. To much power.")
+            return True
+        return False
 
 
 
@@ -40,6 +42,8 @@ class Radio(Electrodomestics):
     def broken(self):
         if self.power > 120: 
             print(f"{self.name} broke!. To much power.")
+            return True
+        return False
 
 class Computer(Electrodomestics):
     def turn_on(self):
@@ -53,4 +57,6 @@ class Computer(Electrodomestics):
 
     def broken(self):
         if self.power > 120: 
-            print(f"{self.name} broke!. To much power.")
\ No newline at end of file
+            print(f"{self.name} broke!. To much power.")
+            return True
+        return False
\ No newline at end of file
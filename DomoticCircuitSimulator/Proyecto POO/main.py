@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
-import json
+import shutil
+import time
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -16,10 +17,28 @@ from PyQt5.QtWidgets import (
     QListWidget,
     QListWidgetItem,
     QSpinBox,
+    QShortcut,
 )
-from PyQt5.QtGui import QIcon, QFont, QPixmap, QPainter, QPen, QColor
-from PyQt5.QtCore import Qt, QTimer, QRect, QPoint
-from PyQt5.QtMultimedia import QSound
+from PyQt5.QtGui import QIcon, QFont, QPixmap, QPainter, QPen, QColor, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, QRect, QPoint, QStandardPaths
+
+from asset_bundle import BUNDLE_FILE, AssetBundle
+from asset_manifest import AssetManifest
+from audio_engine import AudioEngine
+from autosave import WriteBehindSaver
+from change_journal import ChangeJournal
+from circuit_solver import NOMINAL_VOLTAGE
+from compositor import LayeredCompositor
+from house_model import HouseModel
+from layout_loader import LayoutError
+from perf_monitor import PerfMonitor
+from render_cache import BackgroundCache, SpriteCache, load_pixmap
+from placement import FreeSlotPlacer
+from repaint_scheduler import RepaintScheduler
+from spatial_index import SpatialGrid
+from sprite_disk_cache import ScaledImageDiskCache
+from sqlite_store import SqliteHouseStore
+from threaded_renderer import SceneSnapshot, ThreadedSceneRenderer
 
 
 class BackgroundLabel(QLabel):
@@ -27,6 +46,32 @@ class BackgroundLabel(QLabel):
         super().__init__(parent)
         self.mainwindow = mainwindow
         self.setMouseTracking(True)
+        self.frame = None   # composed room image, painted centered by paintEvent
+
+    def set_frame(self, frame, dirty_rects=None):
+        self.frame = frame
+        if frame is None or dirty_rects is None:
+            self.update()
+            return
+        offset = self.frame_offset()
+        for rect in dirty_rects:
+            self.update(rect.translated(offset))
+
+    def frame_offset(self):
+        return QPoint((self.width() - self.frame.width()) // 2, (self.height() - self.frame.height()) // 2)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.frame is None:
+            return
+        # Only the exposed area is copied, so small overlay updates stay cheap
+        offset = self.frame_offset()
+        target = event.rect().intersected(self.frame.rect().translated(offset))
+        if target.isEmpty():
+            return
+        painter = QPainter(self)
+        painter.drawPixmap(target, self.frame, target.translated(-offset))
+        painter.end()
 
     def mousePressEvent(self, event):
         if self.mainwindow is not None:
@@ -89,11 +134,66 @@ class MainWindow(QMainWindow):
             "Living Room Lamp": os.path.join(self.base_dir, "Lamp Living Room OFF.png"),
         }
 
-        # ---------------- ROOMS AND DEVICE STORAGE ----------------
-        self.rooms = ["Living_room", "Kitchen", "room"]
-        self.devices_by_room = {room: [] for room in self.rooms}
-        self.connections_by_room = {room: [] for room in self.rooms}
-        self.next_device_id = 1
+        # ---------------- ASSET BUNDLE ----------------
+        # When the images and sounds are packed in assets.bundle (python asset_bundle.py),
+        # they are served from that one memory-mapped file instead of the loose files.
+        # ELECHOUSE_ASSET_BUNDLE points to another bundle ("" reads the loose files).
+        bundle_path = os.environ.get("ELECHOUSE_ASSET_BUNDLE", os.path.join(self.base_dir, BUNDLE_FILE))
+        self.asset_bundle = AssetBundle.open(bundle_path)
+
+        # ---------------- ASSET MANIFEST ----------------
+        # Every (type, state) image and every background is resolved and checked once here;
+        # switching, drawing and listing devices never ask the disk whether a file exists
+        self.assets = AssetManifest(
+            self.component_files, extra_files=self.background_images.values(), bundle=self.asset_bundle
+        )
+        for tipo, (declared, used) in self.assets.substituted.items():
+            self.log(f"{os.path.basename(declared)} not found, {tipo} uses {os.path.basename(used)}")
+        for tipo, on in self.assets.missing:
+            self.log(f"No image for {tipo} ({'ON' if on else 'OFF'})")
+
+        # ---------------- PERFORMANCE INSTRUMENTATION ----------------
+        # Entry points are wrapped before anything binds them (timers, scheduler, model
+        # listener). Off by default; F3 toggles it, ELECHOUSE_PROFILE=1 starts it on.
+        self.perf = PerfMonitor(capacity=1024, enabled=os.environ.get("ELECHOUSE_PROFILE") == "1")
+        self.perf_profile_file = "perf_profile.json"
+        self.perf.instrument(self, [
+            "dibujar_escena",
+            "mostrar_frame_hilo",
+            "actualizar_imagen",
+            "actualizar_lista_dispositivos",
+            "guardar_posiciones_dispositivos",
+            "cargar_posiciones_dispositivos",
+            "obtener_dispositivo_en_pos",
+            "on_evento_modelo",
+            "muestrear_simulacion",
+        ])
+
+        # ---------------- HOUSE MODEL ----------------
+        # Devices, wires, power, sensors and persistence live in the Qt-free HouseModel.
+        # This window draws it and turns its notifications into images, sounds and messages.
+        # ELECHOUSE_SOURCE_VOLTAGE sets the EMF of the voltage sources (5 V, the rating of
+        # every load, by default): above it loads are over-driven and break.
+        try:
+            source_voltage = float(os.environ.get("ELECHOUSE_SOURCE_VOLTAGE", NOMINAL_VOLTAGE))
+        except ValueError:
+            source_voltage = NOMINAL_VOLTAGE
+        self.model = HouseModel(
+            motion_sensor_delay=3.0, temperature=25, assets=self.assets, source_voltage=source_voltage
+        )
+        self.rooms = self.model.rooms
+        self.perf.instrument(self.model, [
+            "update_loads",
+            "solve_circuit",
+            "has_closed_circuit",
+            "closed_loop_wires",
+            "advance",
+        ], prefix="model.")
+        self.model.subscribe(self.on_evento_modelo)
+
+        # Per-room grid of drawn device rects, used for hit-testing (click, hover, drag)
+        self.interaction_margin = 20
+        self.spatial_index_by_room = {room: SpatialGrid(margin=self.interaction_margin) for room in self.rooms}
 
         # ---------------- DRAG STATE ----------------
         self.dragging = False
@@ -105,21 +205,43 @@ class MainWindow(QMainWindow):
         self.temp_connection_pos = None
 
         # ---------------- PERSISTENCE FILE ----------------
+        # "snapshot" (default): write-behind, a burst of changes becomes one write of the
+        # whole file on a worker thread. With ELECHOUSE_PERSISTENCE=journal every change is
+        # appended to a journal next to the file; with ELECHOUSE_PERSISTENCE=sqlite it is a
+        # row update in a database next to it, whose rooms are read when first entered.
+        # Both commit once editing pauses.
         self.positions_file = "posiciones_dispositivos.json"
+        self.persistence_mode = os.environ.get("ELECHOUSE_PERSISTENCE", "snapshot")
+        self.autosave = WriteBehindSaver(self.model.to_dict, HouseModel.write_dict, idle_ms=500, parent=self)
+        self.autosave.failed.connect(lambda error: self.log(f"Error saving devices: {error}"))
+        self.unreadable_layout = False   # the file failed to load: keep it until the user edits
+        self.persistence = None
+        if self.persistence_mode == "journal":
+            self.persistence = ChangeJournal()
+        elif self.persistence_mode == "sqlite":
+            self.persistence = SqliteHouseStore()
+        self.persistence_sync_timer = QTimer(self)
+        self.persistence_sync_timer.setSingleShot(True)
+        self.persistence_sync_timer.timeout.connect(self.sincronizar_persistencia)
 
         # ---------------- SOUNDS ----------------
-        self.alarm_sound = QSound(os.path.join(self.base_dir,"Security Alarm.wav"))
-        self.tv_sound = QSound(os.path.join(self.base_dir,"TV sound.wav"))
-        self.radio_sound = QSound(os.path.join(self.base_dir,"Radio Static.wav"))
-        self.pc_sound = QSound(os.path.join(self.base_dir,"Computer Typing.wav"))
-        self.heat_alarm_sound = QSound(os.path.join(self.base_dir,"Fire Alarm.wav"))
-
-        # ---------------- MOTION SENSOR TIMERS ----------------
-        self.motion_sensor_delay_ms = 3000
-        self.motion_sensor_timers = {}
-
-        # ---------------- GLOBAL TEMPERATURE ----------------
-        self.current_temperature = 25  # °C
+        # Every sound is decoded once here. Each device plays on its own voice (its id), so
+        # two TVs sound at the same time and switching one off leaves the other on.
+        self.device_sounds = {
+            "TV": "TV sound.wav",
+            "Radio": "Radio Static.wav",
+            "Computer": "Computer Typing.wav",
+        }
+        self.alarm_sounds = {
+            "alarm": "Security Alarm.wav",
+            "heat_alarm": "Fire Alarm.wav",
+        }
+        # The alarms have voices of their own: no number of devices can silence them.
+        self.audio = AudioEngine(max_voices=8, reserved=self.alarm_sounds, parent=self)
+        for name, file_name in {**self.device_sounds, **self.alarm_sounds}.items():
+            self.audio.load(name, os.path.join(self.base_dir, file_name), self.asset_bundle)
+        for problem in self.audio.problems:
+            self.log(problem)
 
         # ---------------- ANIMATION STATE ----------------
         self.animation_timer = QTimer(self)
@@ -130,6 +252,41 @@ class MainWindow(QMainWindow):
         self.highlighted_device = None
         self.animation_type = "agregar"
 
+        # ---------------- RENDER CACHES ----------------
+        # Scaled sprites and backgrounds also persist on disk between launches, prepared on
+        # a worker shortly after startup. ELECHOUSE_SPRITE_CACHE sets the folder ("" disables it).
+        self.sprite_disk_cache = self.crear_cache_disco()
+        self.sprite_cache = SpriteCache(
+            max_entries=256, exists=self.assets.is_valid, bundle=self.asset_bundle, disk_cache=self.sprite_disk_cache
+        )
+        self.background_cache = BackgroundCache(
+            max_bytes=64 * 1024 * 1024, exists=self.assets.is_valid, bundle=self.asset_bundle,
+            disk_cache=self.sprite_disk_cache,
+        )
+        self.disk_cache_warm_timer = QTimer(self)
+        self.disk_cache_warm_timer.setSingleShot(True)
+        self.disk_cache_warm_timer.timeout.connect(self.precalentar_cache_disco)
+        self.compositor = LayeredCompositor()
+        self.icon_cache = {}        # image path -> QIcon (or None) shared by all list items
+
+        # ---------------- REPAINT SCHEDULING ----------------
+        # actualizar_imagen() only marks the scene dirty; drawing happens once per frame
+        self.repaint_max_fps = 60
+        self.repaint_scheduler = RepaintScheduler(self.dibujar_escena, max_fps=self.repaint_max_fps, parent=self)
+
+        # Optional mode, on with ELECHOUSE_RENDER_THREAD=1: compose frames into a QImage on a
+        # worker thread. The GUI thread then only lays out the scene and swaps the finished pixmap.
+        self.render_in_thread = os.environ.get("ELECHOUSE_RENDER_THREAD") == "1"
+        self.threaded_renderer = ThreadedSceneRenderer(self, exists=self.assets.is_valid, bundle=self.asset_bundle)
+        self.threaded_renderer.frame_ready.connect(self.mostrar_frame_hilo)
+
+        # ---------------- SIMULATION CLOCK ----------------
+        # The model's clock (sensor delays, energy, room temperatures) is sampled at display rate
+        self.simulation_fps = 30
+        self.simulation_last_sample = None
+        self.simulation_timer = QTimer(self)
+        self.simulation_timer.timeout.connect(self.muestrear_simulacion)
+
         # ---------------- MAIN WIDGET AND LAYOUT ----------------
         container_widget = QWidget(self)
         self.setCentralWidget(container_widget)
@@ -188,7 +345,7 @@ class MainWindow(QMainWindow):
         self.temperature_label.setObjectName("sectionTitleSmall")
         self.temperature_spinbox = QSpinBox(self)
         self.temperature_spinbox.setRange(-20, 80)
-        self.temperature_spinbox.setValue(self.current_temperature)
+        self.temperature_spinbox.setValue(self.model.temperature)
         self.temperature_spinbox.setSuffix(" °C")
 
         actions_layout.addSpacing(20)
@@ -222,6 +379,16 @@ class MainWindow(QMainWindow):
         self.setStatusBar(QStatusBar(self))
         self.statusBar().showMessage("Select a room to get started.", 3000)
 
+        # Performance HUD: p50/p99 of the frames and of the slowest handler, refreshed twice a second
+        self.perf_label = QLabel(self)
+        self.perf_label.setObjectName("perfHud")
+        self.statusBar().addPermanentWidget(self.perf_label)
+        self.perf_hud_timer = QTimer(self)
+        self.perf_hud_timer.timeout.connect(self.actualizar_hud_rendimiento)
+        self.perf_shortcut = QShortcut(QKeySequence("F3"), self)
+        self.perf_shortcut.activated.connect(lambda: self.activar_monitor_rendimiento(not self.perf.enabled))
+        self.activar_monitor_rendimiento(self.perf.enabled)
+
         # ---------------- SIGNAL CONNECTIONS ----------------
         self.living_room_button.clicked.connect(lambda: self.alternar_imagen("Living_room"))
         self.kitchen_button.clicked.connect(lambda: self.alternar_imagen("Kitchen"))
@@ -233,10 +400,13 @@ class MainWindow(QMainWindow):
 
         # Load state from disk
         self.cargar_posiciones_dispositivos()
-        self.temperature_spinbox.setValue(self.current_temperature)
+        self.temperature_spinbox.setValue(self.model.temperature)
 
         QTimer.singleShot(0, self.actualizar_imagen)
         self.actualizar_lista_dispositivos()
+        self.disk_cache_warm_timer.start(1000)
+
+        self.simulation_timer.start(1000 // self.simulation_fps)
 
         self.aplicar_estilos()
 
@@ -285,6 +455,11 @@ class MainWindow(QMainWindow):
             font-weight: bold;
         }
 
+        QLabel#perfHud {
+            font-family: monospace;
+            color: #3B3B3B;
+        }
+
         QPushButton {
             background-color: #F0A15E;
             color: #FFFFFF;
@@ -339,7 +514,7 @@ class MainWindow(QMainWindow):
     # COORDINATE CONVERSION
     # -------------------------------------------------------------------------
     def label_pos_to_pixmap_pos(self, pos_label):
-        pixmap = self.background.pixmap()
+        pixmap = self.background.frame
         if pixmap is None:
             return pos_label
 
@@ -356,174 +531,46 @@ class MainWindow(QMainWindow):
     # -------------------------------------------------------------------------
     # LOAD DEVICES AND CONNECTIONS FROM JSON
     # -------------------------------------------------------------------------
+    # A file that cannot be read is reported and left alone: nothing is saved over it
+    # until the user changes the house
     def cargar_posiciones_dispositivos(self):
-        if not os.path.exists(self.positions_file):
-            return
-
         try:
-            with open(self.positions_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            return
-
-        self.devices_by_room = {room: [] for room in self.rooms}
-        self.connections_by_room = {room: [] for room in self.rooms}
-        max_id = 0
-
-        try:
-            self.current_temperature = int(data.get("temperatura", self.current_temperature))
-        except Exception:
-            pass
-
-        if "dispositivos" in data:
-            dispositivos_data = data.get("dispositivos", {})
-            conexiones_data = data.get("conexiones", {})
-
-            for room in self.rooms:
-                device_list_data = dispositivos_data.get(room, [])
-                if not isinstance(device_list_data, list):
-                    continue
-
-                for dev in device_list_data:
-                    if not isinstance(dev, dict):
-                        continue
-
-                    device_type = dev.get("tipo", "")
-                    image_path = dev.get("imagen", "")
-                    try:
-                        x = int(dev.get("x", 0))
-                        y = int(dev.get("y", 0))
-                    except Exception:
-                        x, y = 0, 0
-
-                    connected = bool(dev.get("conectado", True))
-                    powered_on = bool(dev.get("encendido", False))
-                    try:
-                        dev_id = int(dev.get("id", 0))
-                    except Exception:
-                        dev_id = 0
-
-                    if dev_id <= 0:
-                        max_id += 1
-                        dev_id = max_id
-
-                    max_id = max(max_id, dev_id)
-
-                    dev_dict = {
-                        "id": dev_id,
-                        "tipo": device_type,
-                        "imagen": image_path,
-                        "x": x,
-                        "y": y,
-                        "rect": None,
-                        "conectado": connected,
-                        "encendido": powered_on,
-                    }
-
-                    if device_type == "Motion Sensor":
-                        dev_dict["sensor_armado"] = powered_on
-
-                    self.devices_by_room[room].append(dev_dict)
-
-                room_connections = conexiones_data.get(room, [])
-                if isinstance(room_connections, list):
-                    valid_connections = []
-                    for c in room_connections:
-                        if not isinstance(c, dict):
-                            continue
-                        try:
-                            o = int(c.get("origen"))
-                            d = int(c.get("destino"))
-                        except Exception:
-                            continue
-                        valid_connections.append({"origen": o, "destino": d})
-                    self.connections_by_room[room] = valid_connections
-
-            try:
-                self.next_device_id = int(data.get("next_id", max_id + 1))
-            except Exception:
-                self.next_device_id = max_id + 1
-
-        else:
-            for room in self.rooms:
-                device_list_data = data.get(room, [])
-                if not isinstance(device_list_data, list):
-                    continue
-
-                for dev in device_list_data:
-                    if not isinstance(dev, dict):
-                        continue
-
-                    device_type = dev.get("tipo", "")
-                    image_path = dev.get("imagen", "")
-                    try:
-                        x = int(dev.get("x", 0))
-                        y = int(dev.get("y", 0))
-                    except Exception:
-                        x, y = 0, 0
-
-                    connected = bool(dev.get("conectado", True))
-                    powered_on = bool(dev.get("encendido", False))
-
-                    max_id += 1
-                    dev_id = max_id
-
-                    dev_dict = {
-                        "id": dev_id,
-                        "tipo": device_type,
-                        "imagen": image_path,
-                        "x": x,
-                        "y": y,
-                        "rect": None,
-                        "conectado": connected,
-                        "encendido": powered_on,
-                    }
-
-                    if device_type == "Motion Sensor":
-                        dev_dict["sensor_armado"] = powered_on
-
-                    self.devices_by_room[room].append(dev_dict)
-
-            self.next_device_id = max_id + 1
+            if self.persistence is not None:
+                self.persistence.load(self.model, self.positions_file)
+                return
+            self.autosave.flush()
+            self.model.load(self.positions_file)
+        except LayoutError as e:
+            self.unreadable_layout = True
+            self.log(f"Could not load {self.positions_file}: {e.report.summary()}")
+            self.statusBar().showMessage(
+                "The saved layout could not be read; it will not be overwritten until you change the house.", 8000
+            )
 
     # -------------------------------------------------------------------------
     # SAVE DEVICES AND CONNECTIONS IN JSON
     # -------------------------------------------------------------------------
+    # With a journal or a database the changes are already recorded: only their commit is pending
     def guardar_posiciones_dispositivos(self):
-        data = {
-            "dispositivos": {},
-            "conexiones": {},
-            "next_id": self.next_device_id,
-            "temperatura": self.current_temperature,
-        }
-
-        for room, device_list in self.devices_by_room.items():
-            data["dispositivos"][room] = []
-            for dev in device_list:
-                data["dispositivos"][room].append(
-                    {
-                        "id": int(dev.get("id", 0)),
-                        "tipo": dev["tipo"],
-                        "imagen": dev["imagen"],
-                        "x": int(dev["x"]),
-                        "y": int(dev["y"]),
-                        "conectado": bool(dev.get("conectado", True)),
-                        "encendido": bool(dev.get("encendido", False)),
-                    }
-                )
-
-        for room, room_connections in self.connections_by_room.items():
-            data["conexiones"][room] = []
-            for c in room_connections:
-                data["conexiones"][room].append(
-                    {"origen": int(c["origen"]), "destino": int(c["destino"])}
-                )
+        if self.persistence is not None:
+            self.persistence_sync_timer.start(500)
+            return
+        if self.unreadable_layout:
+            # First change after a failed load: the unreadable file is kept as <file>.bak
+            try:
+                shutil.copyfile(self.positions_file, self.positions_file + ".bak")
+            except OSError as e:
+                self.log(f"Error keeping the unreadable layout, not saving: {e}")
+                return
+            self.unreadable_layout = False
+            self.log(f"Unreadable layout kept as {self.positions_file}.bak")
+        self.autosave.request(self.positions_file)
 
+    def sincronizar_persistencia(self):
         try:
-            with open(self.positions_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception:
-            pass
+            self.persistence.sync()
+        except Exception as e:
+            self.log(f"Error saving devices: {e}")
 
     # -------------------------------------------------------------------------
     # CHANGE IMAGE / ROOM (WITH CONSOLE MESSAGES)
@@ -542,6 +589,10 @@ class MainWindow(QMainWindow):
         self.connection_source = None
         self.temp_connection_pos = None
 
+        # Storage that reads rooms on demand loads this one the first time it is entered
+        if self.current_image in self.rooms and self.persistence is not None:
+            self.persistence.ensure_room(self.current_image)
+
         if self.current_image == "menu":
             self.add_device_button.setEnabled(False)
             self.components_combo.setEnabled(False)
@@ -569,123 +620,337 @@ class MainWindow(QMainWindow):
         self.actualizar_lista_dispositivos()
 
     def actualizar_imagen(self):
+        self.repaint_scheduler.request()
+
+    def dibujar_escena(self):
         key = self.current_image
         base_path = self.background_images[key]
-        self.cargar_imagen_con_dispositivos(base_path)
+        if self.render_in_thread:
+            self.cargar_imagen_en_hilo(base_path)
+        else:
+            self.cargar_imagen_con_dispositivos(base_path)
+
+    def activar_render_en_hilo(self, enabled):
+        self.render_in_thread = bool(enabled)
+        self.invalidar_escena()
+        self.actualizar_imagen()
 
     # -------------------------------------------------------------------------
     # CALCULATE FREE POSITION FOR NEW DEVICES
     # -------------------------------------------------------------------------
+    # Single placement against a list of rects. Rendering uses distribuir_dispositivos,
+    # which places every pending device of a room in one pass.
     def calcular_posicion_libre(self, device_width, device_height, background_width, background_height, existing_rects):
-        margin = 20
-        step_x = max(device_width // 2, 40)
-        step_y = max(device_height // 2, 40)
-
-        for y in range(margin, max(background_height - device_height - margin, margin), step_y):
-            for x in range(margin, max(background_width - device_width - margin, margin), step_x):
-                new_rect = QRect(x, y, device_width, device_height)
-                if all(not new_rect.intersects(r) for r in existing_rects):
-                    existing_rects.append(new_rect)
-                    return x, y, new_rect
-
-        x = (background_width - device_width) // 2
-        y = (background_height - device_height) // 2
+        placer = FreeSlotPlacer(background_width, background_height)
+        for r in existing_rects:
+            placer.occupy(r.x(), r.y(), r.width(), r.height())
+
+        x, y = placer.find_slot(device_width, device_height)
         new_rect = QRect(x, y, device_width, device_height)
         existing_rects.append(new_rect)
         return x, y, new_rect
 
+    # sized_devices: list of (dev, width, height). Devices still at (0, 0) get a free spot,
+    # all of them in a single sweep, and then every device gets its drawn rect.
+    def distribuir_dispositivos(self, sized_devices, background_width, background_height):
+        pending = [entry for entry in sized_devices if entry[0].x == 0 and entry[0].y == 0]
+        if pending:
+            placer = FreeSlotPlacer(background_width, background_height)
+            for dev, width, height in sized_devices:
+                if not (dev.x == 0 and dev.y == 0):
+                    placer.occupy(dev.x, dev.y, width, height)
+
+            slots = placer.place_many((width, height) for _, width, height in pending)
+            for (dev, _, _), (x, y) in zip(pending, slots):
+                self.model.move_device(self.current_image, dev, x, y)
+
+        for dev, width, height in sized_devices:
+            self.asignar_rect_dispositivo(dev, QRect(dev.x, dev.y, width, height))
+
     # -------------------------------------------------------------------------
-    # DRAW BACKGROUND, DEVICES, AND CONNECTIONS
+    # DISK CACHE OF SCALED IMAGES
     # -------------------------------------------------------------------------
-    def cargar_imagen_con_dispositivos(self, background_path):
-        if not os.path.exists(background_path):
-            self.background.setPixmap(QPixmap())
-            self.background.setText(f"File not found:\n{background_path}")
-            return
+    def crear_cache_disco(self):
+        directory = os.environ.get("ELECHOUSE_SPRITE_CACHE")
+        if directory is None:
+            cache_root = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation)
+            directory = os.path.join(cache_root, "elechouse", "sprites") if cache_root else ""
+        if not directory:
+            return None
+        try:
+            return ScaledImageDiskCache(directory, max_bytes=128 * 1024 * 1024, bundle=self.asset_bundle)
+        except OSError as e:
+            self.log(f"Sprite disk cache disabled: {e}")
+            return None
 
-        background_pix = QPixmap(background_path)
-        if background_pix.isNull():
-            self.background.setPixmap(QPixmap())
-            self.background.setText(f"Could not load:\n{background_path}")
+    # Prepares, for the current window size, every background and the image of every
+    # device type and state at its normal and highlighted heights (altura_dispositivo)
+    def precalentar_cache_disco(self):
+        cache = self.sprite_disk_cache
+        if cache is None:
             return
 
+        jobs = []
+        room_heights = set()
+        for key, background_path in self.background_images.items():
+            source_size = cache.source_size(background_path) if self.assets.is_valid(background_path) else None
+            if source_size is None:
+                continue
+            height = source_size.scaled(self.background.width(), self.background.height(), Qt.KeepAspectRatio).height()
+            if height <= 0:
+                continue
+            jobs.append((background_path, height))
+            if key in self.rooms:
+                room_heights.add(height)
+
+        for tipo in self.component_files:
+            for on in (False, True):
+                image_path = self.assets.sprite(tipo, on)
+                if not image_path:
+                    continue
+                for background_height in room_heights:
+                    device_height = self.altura_base_dispositivo(tipo, background_height)
+                    for scale in (1.0, 1.2, 0.8):
+                        jobs.append((image_path, int(device_height * scale)))
+
+        cache.warm(dict.fromkeys(jobs))
+
+    # -------------------------------------------------------------------------
+    # DRAW BACKGROUND, DEVICES, AND CONNECTIONS (LAYERED)
+    # -------------------------------------------------------------------------
+    def cargar_imagen_con_dispositivos(self, background_path):
         width = self.background.width()
         height = self.background.height()
 
-        scaled_background = background_pix.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        composed = QPixmap(scaled_background)
-        painter = QPainter(composed)
+        # Cached per (room, label size): only the first frame at a given size touches the disk
+        scaled_background = self.background_cache.get(self.current_image, background_path, width, height)
+        if scaled_background is None:
+            self.background.set_frame(None)
+            if not self.assets.is_valid(background_path):
+                self.background.setText(f"File not found:\n{background_path}")
+            else:
+                self.background.setText(f"Could not load:\n{background_path}")
+            return
+
+        active = self.dispositivos_activos()
+        static_key = (self.current_image, scaled_background.cacheKey(), tuple(id(dev) for dev in active))
+
+        full_repaint = self.compositor.needs_rebuild(static_key)
+        if full_repaint:
+            self.background.setText("")
+            self.reconstruir_capas_estaticas(static_key, scaled_background, active)
+
+        dirty_rects = self.compositor.update_overlay(self.elementos_transitorios(active))
+        self.background.set_frame(self.compositor.frame, None if full_repaint else dirty_rects)
+        self.window_initialized = True
+
+    def invalidar_escena(self):
+        self.compositor.invalidate()
+
+    # Devices being dragged or animated live in the overlay; everything else is static
+    def dispositivos_activos(self):
+        if self.current_image not in self.rooms:
+            return []
+
+        active = []
+        if self.dragging and self.selected_device is not None:
+            active.append(self.selected_device)
+
+        highlighted = self.highlighted_device
+        if (self.animation_active or self.highlight_mode) and highlighted is not None:
+            if all(dev is not highlighted for dev in active):
+                active.append(highlighted)
+        return active
+
+    def altura_base_dispositivo(self, tipo, background_height):
+        device_height = max(80, background_height // 4)
+
+        if tipo == "Living Room Lamp":
+            device_height = int(device_height * 1.5)
+        return device_height
+
+    def altura_dispositivo(self, dev, background_height):
+        device_height = self.altura_base_dispositivo(dev.tipo, background_height)
+
+        highlight_scale = 1.0
+        if self.highlight_mode and dev is self.highlighted_device:
+            if self.animation_type in ("agregar", "encender"):
+                highlight_scale = 1.2
+            elif self.animation_type == "apagar":
+                highlight_scale = 0.8
+
+        return device_height, highlight_scale
+
+    def obtener_sprite_dispositivo(self, dev, background_height):
+        image_path = dev.imagen
+        if not image_path:
+            return None
+
+        device_height, highlight_scale = self.altura_dispositivo(dev, background_height)
+
+        # Cached: no disk access or rescaling once the sprite has been prepared
+        return self.sprite_cache.get(image_path, device_height, highlight_scale)
+
+    # Every change of a drawn rect goes through here so the hit-test grid stays in sync
+    def asignar_rect_dispositivo(self, dev, rect):
+        dev.rect = rect
+        if self.current_image in self.rooms:
+            self.spatial_index_by_room[self.current_image].update(dev.id, dev, rect)
+
+    def reconstruir_capas_estaticas(self, static_key, scaled_background, active):
+        sprites = []
+        wires = []
 
         if self.current_image in self.rooms:
-            device_list = self.devices_by_room[self.current_image]
-            placed_rects = []
+            device_list = self.model.devices_by_room[self.current_image]
+            active_ids = {id(dev) for dev in active}
+            self.sprite_cache.sync_background_size(scaled_background.width(), scaled_background.height())
 
+            drawable = []
             for dev in device_list:
-                image_path = dev.get("imagen", "")
-                if not image_path or not os.path.exists(image_path):
-                    continue
+                scaled_device = self.obtener_sprite_dispositivo(dev, scaled_background.height())
+                if scaled_device is not None:
+                    drawable.append((dev, scaled_device))
+
+            self.distribuir_dispositivos(
+                [(dev, sprite.width(), sprite.height()) for dev, sprite in drawable],
+                scaled_background.width(),
+                scaled_background.height(),
+            )
+            for dev, scaled_device in drawable:
+                if id(dev) not in active_ids:
+                    sprites.append((dev.x, dev.y, scaled_device))
 
-                device_pix = QPixmap(image_path)
-                if device_pix.isNull():
+            # Wires touching an active device are drawn by the overlay instead
+            pen = QPen(QColor(0, 0, 0), 3)
+            loop_pen = QPen(QColor(200, 30, 30), 3)
+            loop_wires = self.model.closed_loop_wires(self.current_image)
+            for origen, destino in self.model.connections_by_room[self.current_image]:
+                dev1 = self.obtener_dispositivo_por_id(self.current_image, origen)
+                dev2 = self.obtener_dispositivo_por_id(self.current_image, destino)
+                if not dev1 or not dev2:
+                    continue
+                if id(dev1) in active_ids or id(dev2) in active_ids:
+                    continue
+                r1 = dev1.rect
+                r2 = dev2.rect
+                if r1 is None or r2 is None:
                     continue
+                wire_pen = loop_pen if (dev1.id, dev2.id) in loop_wires else pen
+                wires.append((r1.center(), r2.center(), wire_pen))
 
-                device_height = max(80, scaled_background.height() // 4)
+        self.compositor.rebuild(static_key, scaled_background, sprites, wires)
 
-                if dev.get("tipo") == "Living Room Lamp":
-                    device_height = int(device_height * 1.5)
+    def elementos_transitorios(self, active):
+        items = []
+        if self.current_image not in self.rooms:
+            return items
 
-                if self.highlight_mode and dev is self.highlighted_device:
-                    if self.animation_type in ("agregar", "encender"):
-                        device_height = int(device_height * 1.2)
-                    elif self.animation_type == "apagar":
-                        device_height = int(device_height * 0.8)
+        background_height = self.compositor.frame.height()
+        for dev in active:
+            scaled_device = self.obtener_sprite_dispositivo(dev, background_height)
+            if scaled_device is None:
+                continue
+            self.asignar_rect_dispositivo(dev, QRect(dev.x, dev.y, scaled_device.width(), scaled_device.height()))
+            items.append(("sprite", dev.x, dev.y, scaled_device))
 
-                scaled_device = device_pix.scaledToHeight(device_height, Qt.SmoothTransformation)
+        if active:
+            active_ids = {dev.id for dev in active}
+            pen = QPen(QColor(0, 0, 0), 3)
+            loop_pen = QPen(QColor(200, 30, 30), 3)
+            loop_wires = self.model.closed_loop_wires(self.current_image)
+            for origen, destino in self.model.connections_by_room[self.current_image].incident_to(active_ids):
+                dev1 = self.obtener_dispositivo_por_id(self.current_image, origen)
+                dev2 = self.obtener_dispositivo_por_id(self.current_image, destino)
+                if not dev1 or not dev2:
+                    continue
+                r1 = dev1.rect
+                r2 = dev2.rect
+                if r1 is None or r2 is None:
+                    continue
+                wire_pen = loop_pen if (dev1.id, dev2.id) in loop_wires else pen
+                items.append(("line", r1.center(), r2.center(), wire_pen))
 
-                if dev["x"] == 0 and dev["y"] == 0:
-                    x, y, rect = self.calcular_posicion_libre(
-                        scaled_device.width(),
-                        scaled_device.height(),
-                        scaled_background.width(),
-                        scaled_background.height(),
-                        placed_rects,
-                    )
-                    dev["x"], dev["y"] = x, y
-                else:
-                    x, y = dev["x"], dev["y"]
-                    rect = QRect(x, y, scaled_device.width(), scaled_device.height())
-                    placed_rects.append(rect)
+        # Temporary dashed line
+        if self.connection_source is not None and self.temp_connection_pos is not None:
+            source_rect = self.connection_source.rect
+            if source_rect is not None:
+                temp_pen = QPen(QColor(0, 0, 255), 2, Qt.DashLine)
+                items.append(("line", source_rect.center(), self.temp_connection_pos, temp_pen))
 
-                painter.drawPixmap(x, y, scaled_device)
-                dev["rect"] = rect
+        return items
 
-            # Draw wires
-            pen = QPen(QColor(0, 0, 0), 3)
-            painter.setPen(pen)
+    # -------------------------------------------------------------------------
+    # DRAW BACKGROUND, DEVICES, AND CONNECTIONS (WORKER THREAD MODE)
+    # -------------------------------------------------------------------------
+    def cargar_imagen_en_hilo(self, background_path):
+        renderer = self.threaded_renderer
+        background_size = renderer.background_size(background_path, self.background.width(), self.background.height())
+        if background_size is None:
+            self.background.set_frame(None)
+            if not self.assets.is_valid(background_path):
+                self.background.setText(f"File not found:\n{background_path}")
+            else:
+                self.background.setText(f"Could not load:\n{background_path}")
+            return
+
+        sprites = []
+        wires = []
+        preview = None
 
-            connections = self.connections_by_room.get(self.current_image, [])
-            for c in connections:
-                dev1 = self.obtener_dispositivo_por_id(self.current_image, c["origen"])
-                dev2 = self.obtener_dispositivo_por_id(self.current_image, c["destino"])
+        if self.current_image in self.rooms:
+            background_width = background_size.width()
+            background_height = background_size.height()
+
+            sized_devices = []
+            for dev in self.model.devices_by_room[self.current_image]:
+                image_path = dev.imagen
+                if not image_path:
+                    continue
+                device_height, highlight_scale = self.altura_dispositivo(dev, background_height)
+                size = renderer.sprite_size(image_path, int(device_height * highlight_scale))
+                if size is not None:
+                    sized_devices.append((dev, size.width(), size.height()))
+
+            self.distribuir_dispositivos(sized_devices, background_width, background_height)
+            for dev, width, height in sized_devices:
+                sprites.append((dev.imagen, dev.x, dev.y, width, height))
+
+            loop_wires = self.model.closed_loop_wires(self.current_image)
+            for origen, destino in self.model.connections_by_room[self.current_image]:
+                dev1 = self.obtener_dispositivo_por_id(self.current_image, origen)
+                dev2 = self.obtener_dispositivo_por_id(self.current_image, destino)
                 if not dev1 or not dev2:
                     continue
-                r1 = dev1.get("rect")
-                r2 = dev2.get("rect")
+                r1 = dev1.rect
+                r2 = dev2.rect
                 if r1 is None or r2 is None:
                     continue
-                painter.drawLine(r1.center(), r2.center())
+                p1, p2 = r1.center(), r2.center()
+                wires.append((p1.x(), p1.y(), p2.x(), p2.y(), (dev1.id, dev2.id) in loop_wires))
 
-            # Temporary dashed line
             if self.connection_source is not None and self.temp_connection_pos is not None:
-                source_rect = self.connection_source.get("rect")
+                source_rect = self.connection_source.rect
                 if source_rect is not None:
-                    p_source = source_rect.center()
-                    temp_pen = QPen(QColor(0, 0, 255), 2, Qt.DashLine)
-                    painter.setPen(temp_pen)
-                    painter.drawLine(p_source, self.temp_connection_pos)
+                    p1, p2 = source_rect.center(), self.temp_connection_pos
+                    preview = (p1.x(), p1.y(), p2.x(), p2.y())
+
+        snapshot = SceneSnapshot(
+            renderer.next_generation(),
+            background_path,
+            background_size.width(),
+            background_size.height(),
+            tuple(sprites),
+            tuple(wires),
+            preview,
+        )
+        renderer.submit(snapshot)
 
-        painter.end()
-        self.background.setPixmap(composed)
+    def mostrar_frame_hilo(self, frame):
+        if not self.render_in_thread:
+            return
+        self.background.setText("")
+        self.background.set_frame(frame)
         self.window_initialized = True
 
     # -------------------------------------------------------------------------
@@ -696,11 +961,12 @@ class MainWindow(QMainWindow):
         if self.current_image not in self.rooms:
             return
 
-        device_list = self.devices_by_room[self.current_image]
+        device_list = self.model.devices_by_room[self.current_image]
+        solution = self.model.circuit_by_room[self.current_image]
         for dev in device_list:
-            name = dev.get("tipo", "Unknown")
-            connected = dev.get("conectado", True)
-            powered_on = dev.get("encendido", False)
+            name = dev.tipo
+            connected = dev.conectado
+            powered_on = dev.encendido
 
             if not connected:
                 state_emoji = "⚫"
@@ -715,14 +981,30 @@ class MainWindow(QMainWindow):
 
             item = QListWidgetItem(f"{state_emoji} {name}")
 
-            icon_path = dev.get("imagen", "")
-            if icon_path and os.path.exists(icon_path):
-                item.setIcon(QIcon(icon_path))
-
-            item.setData(Qt.UserRole, dev.get("id", 0))
-            item.setToolTip(f"Type: {name}\nStatus: {state_text}\nRoom: {self.current_image}")
+            icon = self.obtener_icono(dev.imagen)
+            if icon is not None:
+                item.setIcon(icon)
+
+            item.setData(Qt.UserRole, dev.id)
+            tooltip = f"Type: {name}\nStatus: {state_text}\nRoom: {self.current_image}"
+            if solution is not None:
+                tooltip += f"\nVoltage: {solution.voltage(dev.id):.2f} V\nCurrent: {solution.current(dev.id):.3f} A"
+            energy = self.model.energy_used(dev.id)
+            if energy is not None:
+                tooltip += f"\nEnergy used: {energy / 3600:.3f} Wh"
+            if dev.id in self.model.broken_by_room[self.current_image]:
+                tooltip += "\nBROKEN: over its rated limits"
+            item.setToolTip(tooltip)
             self.device_list.addItem(item)
 
+    # One QIcon per image file: each new QIcon would decode the full-size PNG again
+    def obtener_icono(self, icon_path):
+        if icon_path not in self.icon_cache:
+            self.icon_cache[icon_path] = (
+                QIcon(load_pixmap(icon_path, self.asset_bundle)) if self.assets.is_valid(icon_path) else None
+            )
+        return self.icon_cache[icon_path]
+
     def on_lista_dispositivos_changed(self, current, previous):
         if current is None or self.current_image not in self.rooms:
             self.highlighted_device = None
@@ -742,10 +1024,9 @@ class MainWindow(QMainWindow):
     # TEMPERATURE CHANGE HANDLING
     # -------------------------------------------------------------------------
     def on_temperatura_cambiada(self, value):
-        self.current_temperature = value
         self.statusBar().showMessage(f"Temperature set to {value} °C", 3000)
         self.log(f"Temperature set to {value} °C")
-        self.actualizar_alarma_calor()
+        self.model.set_temperature(value)
 
     # -------------------------------------------------------------------------
     # DEVICE DETECTION BY POSITION (CLICK)
@@ -754,27 +1035,12 @@ class MainWindow(QMainWindow):
         if self.current_image not in self.rooms:
             return None
 
-        device_list = self.devices_by_room[self.current_image]
-        if not device_list:
-            return None
-
-        interaction_margin = 20
+        # Grid lookup: topmost device whose rect (plus the interaction margin) holds the point
         pos_pix = self.label_pos_to_pixmap_pos(pos_label)
-
-        for dev in reversed(device_list):
-            rect = dev.get("rect")
-            if rect is None:
-                continue
-            area = rect.adjusted(-interaction_margin, -interaction_margin, interaction_margin, interaction_margin)
-            if area.contains(pos_pix):
-                return dev
-        return None
+        return self.spatial_index_by_room[self.current_image].item_at(pos_pix.x(), pos_pix.y())
 
     def obtener_dispositivo_por_id(self, room, dev_id):
-        for dev in self.devices_by_room.get(room, []):
-            if dev.get("id") == dev_id:
-                return dev
-        return None
+        return self.model.device(room, dev_id)
 
     # -------------------------------------------------------------------------
     # DEVICE CONTEXT MENU (RIGHT CLICK)
@@ -807,13 +1073,13 @@ class MainWindow(QMainWindow):
             else:
                 accion_conectar_con_origen = menu.addAction(
                     "Connect with selected source "
-                    f"({self.connection_source.get('tipo', 'device')})"
+                    f"({self.connection_source.tipo})"
                 )
 
         menu.addSeparator()
 
-        if dev.get("conectado", True) and dev.get("tipo") == "Voltage Source":
-            if dev.get("encendido", False):
+        if dev.conectado and dev.tipo == "Voltage Source":
+            if dev.encendido:
                 accion_apagar = menu.addAction("Turn off")
             else:
                 accion_encender = menu.addAction("Turn on")
@@ -862,329 +1128,127 @@ class MainWindow(QMainWindow):
             return
 
         room = self.current_image
-        id1 = dev_origen.get("id")
-        id2 = dev_destino.get("id")
-        if id1 is None or id2 is None or id1 == id2:
+        if not self.model.connect(room, dev_origen, dev_destino):
             return
 
-        for c in self.connections_by_room[room]:
-            if (c["origen"] == id1 and c["destino"] == id2) or (c["origen"] == id2 and c["destino"] == id1):
-                return
-
-        self.connections_by_room[room].append({"origen": id1, "destino": id2})
-        self.statusBar().showMessage(
-            f"'{dev_origen.get('tipo', 'device')}' connected to '{dev_destino.get('tipo', 'device')}'.",
-            5000,
-        )
-        self.log(f"Wire connected: {self.pretty_name(dev_origen.get('tipo'))} -> {self.pretty_name(dev_destino.get('tipo'))}")
-
         self.guardar_posiciones_dispositivos()
-        self.actualizar_cargas_por_fuentes(room)
         self.actualizar_imagen()
         self.actualizar_lista_dispositivos()
-
-        if self.hay_circuito_cerrado(room):
-            self.statusBar().showMessage("A closed circuit was detected in this room.", 6000)
-            self.log("Circuit: closed circuit detected")
-
         self.registrar_interaccion_usuario()
 
-    def hay_circuito_cerrado(self, room):
-        devices = self.devices_by_room.get(room, [])
-        connections = self.connections_by_room.get(room, [])
-
-        if len(devices) < 3 or len(connections) < 3:
-            return False
-
-        ids = [dev.get("id") for dev in devices if dev.get("id") is not None]
-        if not ids:
-            return False
-
-        graph = {i: [] for i in ids}
-        for c in connections:
-            o = c.get("origen")
-            d = c.get("destino")
-            if o in graph and d in graph and o != d:
-                graph[o].append(d)
-                graph[d].append(o)
-
-        visited = set()
-
-        def dfs(u, parent):
-            visited.add(u)
-            for v in graph[u]:
-                if v not in visited:
-                    if dfs(v, u):
-                        return True
-                elif v != parent:
-                    return True
-            return False
-
-        for node in ids:
-            if node not in visited:
-                if dfs(node, None):
-                    return True
-
-        return False
-
     # -------------------------------------------------------------------------
-    # POWER LOGIC
+    # MODEL NOTIFICATIONS (IMAGES, SOUNDS, MESSAGES)
     # -------------------------------------------------------------------------
-    def hay_fuente_activa(self, room):
-        if room not in self.rooms:
-            return False
-        for dev in self.devices_by_room[room]:
-            if dev.get("tipo") == "Voltage Source" and dev.get("conectado", False) and dev.get("encendido", False):
-                return True
-        return False
-
-    def hay_fuente_activa_conectada(self, room, dev):
-        if room not in self.rooms:
-            return False
-
-        devices = self.devices_by_room.get(room, [])
-        connections = self.connections_by_room.get(room, [])
-        dev_id = dev.get("id")
-        if dev_id is None:
-            return False
-
-        active_sources = {
-            d.get("id")
-            for d in devices
-            if d.get("tipo") == "Voltage Source"
-            and d.get("conectado", False)
-            and d.get("encendido", False)
-            and d.get("id") is not None
-        }
-        if not active_sources:
-            return False
-
-        graph = {d.get("id"): [] for d in devices if d.get("id") is not None}
-        for c in connections:
-            o = c.get("origen")
-            d = c.get("destino")
-            if o in graph and d in graph and o != d:
-                graph[o].append(d)
-                graph[d].append(o)
-
-        visited = set()
-        stack = [dev_id]
-        while stack:
-            u = stack.pop()
-            if u in visited:
-                continue
-            visited.add(u)
-            if u in active_sources:
-                return True
-            for v in graph.get(u, []):
-                if v not in visited:
-                    stack.append(v)
-
-        return False
-
-    def actualizar_cargas_por_fuentes(self, room):
-        if room not in self.rooms:
-            return
+    def on_evento_modelo(self, event):
+        kind = event.kind
+        dev = event.device
+
+        if kind in ("device_added", "device_removed", "device_switched", "device_forced_off",
+                    "wire_added", "sensor_armed", "sensor_disarmed"):
+            self.invalidar_escena()
+
+        if kind == "loaded":
+            for room, index in self.spatial_index_by_room.items():
+                if event.room is None or room == event.room:
+                    index.clear()
+            self.invalidar_escena()
+
+            report = event.value
+            if report is not None and report.migrated:
+                self.log(f"Layout migrated to the current format ({report.summary()})")
+            if report is not None and report.rejected:
+                self.log(f"Layout loaded with rejected records: {report.summary()}")
+                self.statusBar().showMessage(
+                    f"{report.rejected_total} invalid records in the saved layout were skipped.", 6000
+                )
 
-        devices = self.devices_by_room.get(room, [])
-        for dev in devices:
-            if dev.get("tipo") == "Voltage Source":
-                continue
+        elif kind == "device_added":
+            self.log(f"{self.pretty_name(dev.tipo)} added")
 
-            if dev.get("tipo") == "Motion Sensor":
-                powered = dev.get("conectado", False) and self.hay_fuente_activa_conectada(room, dev)
-                if powered:
-                    self.programar_armado_sensor_movimiento(room, dev)
-                else:
-                    self.desarmar_sensor_movimiento(room, dev)
-                continue
-
-            if not dev.get("conectado", False):
-                if dev.get("encendido", False):
-                    dev["encendido"] = False
-                    self.actualizar_imagen_por_estado(dev)
-                    if dev.get("tipo") in ("TV", "Radio", "Computer"):
-                        self.detener_sonido_dispositivo(dev.get("tipo"))
-                    self.log(f"{self.pretty_name(dev.get('tipo'))} forced off (disconnected)")
-                continue
+        elif kind == "device_removed":
+            self.spatial_index_by_room[event.room].remove(dev.id)
+            self.detener_sonido_dispositivo(dev)
+            self.log(f"{self.pretty_name(dev.tipo)} removed")
 
-            powered = self.hay_fuente_activa_conectada(room, dev)
-
-            if powered and not dev.get("encendido", False):
-                dev["encendido"] = True
-                self.actualizar_imagen_por_estado(dev)
-                if dev.get("tipo") in ("TV", "Radio", "Computer"):
-                    self.reproducir_sonido_dispositivo(dev.get("tipo"))
-                self.log(f"{self.pretty_name(dev.get('tipo'))} turn on")
+        elif kind == "device_switched":
+            if event.value:
+                self.reproducir_sonido_dispositivo(dev)
+            else:
+                self.detener_sonido_dispositivo(dev)
+            self.log(f"{self.pretty_name(dev.tipo)} turn {'on' if event.value else 'off'}")
 
-            elif not powered and dev.get("encendido", False):
-                dev["encendido"] = False
-                self.actualizar_imagen_por_estado(dev)
-                if dev.get("tipo") in ("TV", "Radio", "Computer"):
-                    self.detener_sonido_dispositivo(dev.get("tipo"))
-                self.log(f"{self.pretty_name(dev.get('tipo'))} turn off")
+        elif kind == "device_forced_off":
+            self.detener_sonido_dispositivo(dev)
+            self.log(f"{self.pretty_name(dev.tipo)} forced off (disconnected)")
 
-        self.actualizar_alarma_calor()
+        elif kind == "device_broken":
+            voltage, power = event.value
+            self.statusBar().showMessage(
+                f"{self.pretty_name(dev.tipo)} broke: {voltage:.2f} V, {power:.1f} W.", 6000
+            )
 
-    def actualizar_imagen_por_estado(self, dev):
-        path = dev.get("imagen", "")
-        if not path:
-            return
+        elif kind == "wire_added":
+            dev_origen, dev_destino = event.value
+            self.statusBar().showMessage(
+                f"'{dev_origen.tipo}' connected to '{dev_destino.tipo}'.",
+                5000,
+            )
+            self.log(f"Wire connected: {self.pretty_name(dev_origen.tipo)} -> {self.pretty_name(dev_destino.tipo)}")
 
-        base, ext = os.path.splitext(path)
+        elif kind == "closed_circuit":
+            self.statusBar().showMessage("A closed circuit was detected in this room.", 6000)
+            self.log("Circuit: closed circuit detected")
 
-        if dev.get("encendido", False):
-            if " OFF" in base:
-                on_path = base.replace(" OFF", " ON") + ext
-                if os.path.exists(on_path):
-                    dev["imagen"] = on_path
-        else:
-            if " ON" in base:
-                off_path = base.replace(" ON", " OFF") + ext
-                if os.path.exists(off_path):
-                    dev["imagen"] = off_path
+        elif kind == "sensor_arming":
+            self.log("Motion Sensor arming")
 
-    def apagar_cargas_en_habitacion(self, room):
-        if room not in self.rooms:
-            return
-        for dev in self.devices_by_room[room]:
-            if dev.get("tipo") != "Voltage Source":
-                dev["encendido"] = False
-                self.actualizar_imagen_por_estado(dev)
-                if dev.get("tipo") in ("TV", "Radio", "Computer"):
-                    self.detener_sonido_dispositivo(dev.get("tipo"))
+        elif kind == "sensor_armed":
+            self.actualizar_imagen()
+            self.actualizar_lista_dispositivos()
+            self.statusBar().showMessage("Motion sensor armed: any interaction will trigger the alarm.", 5000)
+            self.log("Motion Sensor armed")
+
+        elif kind == "sensor_disarmed":
+            if event.value:
+                self.log("Motion Sensor disarmed")
+            self.audio.stop("alarm")
+
+        elif kind == "heat_alarm":
+            if event.value:
+                self.log("ALARM: heat detected (T > 40°C)")
+                self.audio.play("heat_alarm", "heat_alarm")
+            else:
+                self.audio.stop("heat_alarm")
 
     # -------------------------------------------------------------------------
-    # MOTION SENSOR
+    # SOUNDS
     # -------------------------------------------------------------------------
-    def hay_sensor_movimiento_activo(self, room):
-        if room not in self.rooms:
-            return False
-        for dev in self.devices_by_room.get(room, []):
-            if dev.get("tipo") == "Motion Sensor" and dev.get("sensor_armado", False):
-                return True
-        return False
-
     def reproducir_alarma_movimiento(self):
         self.log("ALARM: motion detected / user interaction")
-        if self.alarm_sound is not None:
-            self.alarm_sound.play()
-
-    def reproducir_sonido_dispositivo(self, tipo):
-        if tipo == "TV" and self.tv_sound is not None:
-            self.tv_sound.play()
-        elif tipo == "Radio" and self.radio_sound is not None:
-            self.radio_sound.play()
-        elif tipo == "Computer" and self.pc_sound is not None:
-            self.pc_sound.play()
-
-    def detener_sonido_dispositivo(self, tipo):
-        if tipo == "TV" and self.tv_sound is not None:
-            self.tv_sound.stop()
-        elif tipo == "Radio" and self.radio_sound is not None:
-            self.radio_sound.stop()
-        elif tipo == "Computer" and self.pc_sound is not None:
-            self.pc_sound.stop()
-
-    def programar_armado_sensor_movimiento(self, room, dev):
-        dev_id = dev.get("id")
-        if dev_id is None:
-            return
-
-        if dev.get("sensor_armado", False):
-            return
-
-        timer = self.motion_sensor_timers.get(dev_id)
-        if timer is not None and timer.isActive():
-            return
-
-        timer = QTimer(self)
-        timer.setSingleShot(True)
-
-        def al_terminar():
-            sensor = self.obtener_dispositivo_por_id(room, dev_id)
-            if sensor is None:
-                return
-            powered = sensor.get("conectado", False) and self.hay_fuente_activa_conectada(room, sensor)
-            if not powered:
-                return
-            self.armar_sensor_movimiento(room, dev_id)
-
-        timer.timeout.connect(al_terminar)
-        self.motion_sensor_timers[dev_id] = timer
-        timer.start(self.motion_sensor_delay_ms)
-        self.log("Motion Sensor arming")
-
-    def armar_sensor_movimiento(self, room, dev_id):
-        dev = self.obtener_dispositivo_por_id(room, dev_id)
-        if dev is None:
-            return
-
-        dev["sensor_armado"] = True
-        dev["encendido"] = True
-        self.actualizar_imagen_por_estado(dev)
-        self.actualizar_imagen()
-        self.actualizar_lista_dispositivos()
-        self.statusBar().showMessage("Motion sensor armed: any interaction will trigger the alarm.", 5000)
-        self.log("Motion Sensor armed")
-
-        timer = self.motion_sensor_timers.pop(dev_id, None)
-        if timer is not None:
-            timer.stop()
-
-    def desarmar_sensor_movimiento(self, room, dev):
-        dev_id = dev.get("id")
-        if dev_id is None:
-            return
-
-        timer = self.motion_sensor_timers.pop(dev_id, None)
-        if timer is not None:
-            timer.stop()
+        self.audio.play("alarm", "alarm")
 
-        if dev.get("sensor_armado", False) or dev.get("encendido", False):
-            dev["sensor_armado"] = False
-            dev["encendido"] = False
-            self.actualizar_imagen_por_estado(dev)
-            self.log("Motion Sensor disarmed")
+    def reproducir_sonido_dispositivo(self, dev):
+        if dev.tipo in self.device_sounds:
+            self.audio.play(dev.id, dev.tipo)
 
-        if self.alarm_sound is not None:
-            self.alarm_sound.stop()
+    def detener_sonido_dispositivo(self, dev):
+        self.audio.stop(dev.id)
 
     # -------------------------------------------------------------------------
-    # HEAT SENSOR
+    # SIMULATION CLOCK (SAMPLED AT DISPLAY RATE)
     # -------------------------------------------------------------------------
-    def hay_sensor_calor_activo(self, room):
-        if room not in self.rooms:
-            return False
-        for dev in self.devices_by_room.get(room, []):
-            if dev.get("tipo") == "Heat Sensor":
-                if dev.get("conectado", False) and self.hay_fuente_activa_conectada(room, dev):
-                    return True
-        return False
-
-    def actualizar_alarma_calor(self):
-        if self.heat_alarm_sound is None:
-            return
-
-        should_alarm_sound = False
-        if self.current_temperature > 40:
-            for room in self.rooms:
-                if self.hay_sensor_calor_activo(room):
-                    should_alarm_sound = True
-                    break
-
-        if should_alarm_sound:
-            self.log("ALARM: heat detected (T > 40°C)")
-            self.heat_alarm_sound.play()
-        else:
-            self.heat_alarm_sound.stop()
+    def muestrear_simulacion(self):
+        now = time.perf_counter()
+        if self.simulation_last_sample is not None:
+            self.model.advance(now - self.simulation_last_sample)
+        self.simulation_last_sample = now
 
     # -------------------------------------------------------------------------
     # USER INTERACTION REGISTRATION
     # -------------------------------------------------------------------------
     def registrar_interaccion_usuario(self):
         room = self.current_image
-        if self.hay_sensor_movimiento_activo(room):
+        if self.model.motion_sensor_armed(room):
             self.reproducir_alarma_movimiento()
 
     # -------------------------------------------------------------------------
@@ -1193,27 +1257,16 @@ class MainWindow(QMainWindow):
     def encender_dispositivo(self, dev):
         room = self.current_image
 
-        if not dev.get("conectado", True):
-            dev["conectado"] = True
-
-        if dev.get("tipo") != "Voltage Source":
-            if not self.hay_fuente_activa(room):
-                self.statusBar().showMessage("There is no 'Voltage Source' turned on in this room.", 6000)
-                return
-
-            if not self.hay_fuente_activa_conectada(room, dev):
-                self.statusBar().showMessage(
-                    "This device is not connected by wires to any turned-on 'Voltage Source'.",
-                    6000,
-                )
-                return
-
-        dev["encendido"] = True
-        self.actualizar_imagen_por_estado(dev)
-        self.log(f"{self.pretty_name(dev.get('tipo'))} turn on")
-
-        if dev.get("tipo") == "Voltage Source":
-            self.actualizar_cargas_por_fuentes(room)
+        reason = self.model.turn_on(room, dev)
+        if reason == "no_source":
+            self.statusBar().showMessage("There is no 'Voltage Source' turned on in this room.", 6000)
+            return
+        if reason == "not_connected":
+            self.statusBar().showMessage(
+                "This device is not connected by wires to any turned-on 'Voltage Source'.",
+                6000,
+            )
+            return
 
         self.highlighted_device = dev
         self.iniciar_animacion("encender")
@@ -1224,16 +1277,11 @@ class MainWindow(QMainWindow):
 
     def apagar_dispositivo(self, dev):
         room = self.current_image
-        dev["encendido"] = False
-        self.actualizar_imagen_por_estado(dev)
-        self.log(f"{self.pretty_name(dev.get('tipo'))} turn off")
+        self.model.turn_off(room, dev)
 
-        if dev.get("tipo") == "Voltage Source":
-            self.apagar_cargas_en_habitacion(room)
+        if dev.tipo == "Voltage Source":
             self.statusBar().showMessage("Voltage source turned off: all loads in the room were turned off.", 5000)
 
-        self.actualizar_cargas_por_fuentes(room)
-
         self.highlighted_device = dev
         self.iniciar_animacion("apagar")
         self.guardar_posiciones_dispositivos()
@@ -1246,34 +1294,12 @@ class MainWindow(QMainWindow):
             return
 
         room = self.current_image
-        device_list = self.devices_by_room[room]
-        if dev not in device_list:
+        if not self.model.remove_device(room, dev):
             return
 
-        is_source = dev.get("tipo") == "Voltage Source"
-        is_motion_sensor = dev.get("tipo") == "Motion Sensor"
-
-        if is_motion_sensor:
-            self.desarmar_sensor_movimiento(room, dev)
-
-        if dev.get("tipo") in ("TV", "Radio", "Computer"):
-            self.detener_sonido_dispositivo(dev.get("tipo"))
-
-        device_list.remove(dev)
-        self.log(f"{self.pretty_name(dev.get('tipo'))} removed")
-
-        dev_id = dev.get("id")
-        if dev_id is not None:
-            self.connections_by_room[room] = [
-                c for c in self.connections_by_room[room]
-                if c["origen"] != dev_id and c["destino"] != dev_id
-            ]
-
-        if is_source:
-            self.apagar_cargas_en_habitacion(room)
+        if dev.tipo == "Voltage Source":
             self.statusBar().showMessage("Voltage source removed: all loads lost power.", 5000)
 
-        self.actualizar_cargas_por_fuentes(room)
         self.highlighted_device = None
         self.guardar_posiciones_dispositivos()
         self.actualizar_imagen()
@@ -1293,33 +1319,12 @@ class MainWindow(QMainWindow):
         if not image_file:
             return
 
-        if component_name == "Voltage Source":
-            for dev in self.devices_by_room[room]:
-                if dev["tipo"] == "Voltage Source":
-                    self.statusBar().showMessage("There is already a 'Voltage Source' in this room.", 4000)
-                    return
-
-        dev_id = self.next_device_id
-        self.next_device_id += 1
-
-        new_dev = {
-            "id": dev_id,
-            "tipo": component_name,
-            "imagen": image_file,
-            "x": 0,
-            "y": 0,
-            "rect": None,
-            "conectado": True,
-            "encendido": False,
-        }
-
-        if component_name == "Motion Sensor":
-            new_dev["sensor_armado"] = False
+        new_dev = self.model.add_device(room, component_name, image_file)
+        if new_dev is None:
+            self.statusBar().showMessage("There is already a 'Voltage Source' in this room.", 4000)
+            return
 
-        self.devices_by_room[room].append(new_dev)
         self.highlighted_device = new_dev
-        self.log(f"{self.pretty_name(component_name)} added")
-
         self.iniciar_animacion("agregar")
         self.guardar_posiciones_dispositivos()
         self.actualizar_imagen()
@@ -1371,7 +1376,7 @@ class MainWindow(QMainWindow):
         if not self.dragging or self.selected_device is None:
             return
 
-        rect = self.selected_device.get("rect")
+        rect = self.selected_device.rect
         if rect is None:
             return
 
@@ -1379,10 +1384,11 @@ class MainWindow(QMainWindow):
         dx = mouse_pix.x() - self.last_drag_pos.x()
         dy = mouse_pix.y() - self.last_drag_pos.y()
 
-        new_x = rect.x() + dx
-        new_y = rect.y() + dy
+        # Position fields instead of the drawn rect: several moves can happen between frames
+        new_x = self.selected_device.x + dx
+        new_y = self.selected_device.y + dy
 
-        pixmap = self.background.pixmap()
+        pixmap = self.background.frame
         if pixmap is not None:
             max_x = pixmap.width() - rect.width()
             max_y = pixmap.height() - rect.height()
@@ -1396,21 +1402,27 @@ class MainWindow(QMainWindow):
         new_x = max(0, min(new_x, max_x))
         new_y = max(0, min(new_y, max_y))
 
-        self.selected_device["x"] = new_x
-        self.selected_device["y"] = new_y
+        self.model.move_device(self.current_image, self.selected_device, new_x, new_y)
+        self.asignar_rect_dispositivo(self.selected_device, QRect(new_x, new_y, rect.width(), rect.height()))
 
         self.last_drag_pos = mouse_pix
         self.actualizar_imagen()
         self.registrar_interaccion_usuario()
 
     def finalizar_arrastre_dispositivo(self, event):
-        if self.dragging:
+        was_dragging = self.dragging
+        if was_dragging:
             self.guardar_posiciones_dispositivos()
 
         self.dragging = False
         self.last_drag_pos = None
         self.selected_device = None
 
+        # The dropped device leaves the overlay: the static layers are drawn with it again
+        if was_dragging:
+            self.invalidar_escena()
+            self.actualizar_imagen()
+
     # -------------------------------------------------------------------------
     # CURSOR UPDATE
     # -------------------------------------------------------------------------
@@ -1439,13 +1451,55 @@ class MainWindow(QMainWindow):
             self.actualizar_imagen()
 
     # -------------------------------------------------------------------------
-    # WINDOW RESIZE HANDLING
+    # PERFORMANCE HUD
+    # -------------------------------------------------------------------------
+    def activar_monitor_rendimiento(self, enabled):
+        self.perf.set_enabled(enabled)
+        self.perf_label.setVisible(self.perf.enabled)
+        if self.perf.enabled:
+            self.perf_hud_timer.start(500)
+            self.actualizar_hud_rendimiento()
+        else:
+            self.perf_hud_timer.stop()
+
+    def actualizar_hud_rendimiento(self):
+        frame = self.perf.stats("dibujar_escena")
+        text = f"frame p50 {frame['p50_ms']:.1f} ms  p99 {frame['p99_ms']:.1f} ms"
+
+        handlers = [name for name in self.perf.names() if name != "dibujar_escena"]
+        if handlers:
+            slowest = max(handlers, key=lambda name: self.perf.stats(name)["p99_ms"])
+            stats = self.perf.stats(slowest)
+            text += f"  |  {slowest} p50 {stats['p50_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms"
+        self.perf_label.setText(text)
+
+    # -------------------------------------------------------------------------
+    # WINDOW RESIZE AND CLOSE HANDLING
     # -------------------------------------------------------------------------
     def resizeEvent(self, event):
         if self.window_initialized:
             self.actualizar_imagen()
         super().resizeEvent(event)
 
+    # Writes the pending changes, and leaves the timings of the session next to the saved
+    # layout if anything was measured
+    def closeEvent(self, event):
+        self.audio.stop_all()
+        self.threaded_renderer.stop()
+        self.disk_cache_warm_timer.stop()
+        if self.sprite_disk_cache is not None:
+            self.sprite_disk_cache.stop()
+        if self.persistence is not None:
+            self.persistence_sync_timer.stop()
+            self.persistence.close()
+        self.autosave.flush()
+        if self.perf.names():
+            try:
+                self.perf.dump(self.perf_profile_file)
+            except Exception as e:
+                self.log(f"Error saving performance profile: {e}")
+        super().closeEvent(event)
+
 
 def main():
     app = QApplication(sys.argv)
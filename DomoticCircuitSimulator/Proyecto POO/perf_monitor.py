@@ -0,0 +1,119 @@
+import json
+import math
+import os
+import platform
+import time
+from collections import deque
+
+
+# Wraps one bound method: when the monitor is enabled every call is timed into its ring
+# buffer, otherwise the only cost is one attribute check
+class TimedCall:
+    __slots__ = ("monitor", "name", "function")
+
+    def __init__(self, monitor, name, function):
+        self.monitor = monitor
+        self.name = name
+        self.function = function
+
+    def __call__(self, *args, **kwargs):
+        monitor = self.monitor
+        if not monitor.enabled:
+            return self.function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return self.function(*args, **kwargs)
+        finally:
+            monitor.record(self.name, time.perf_counter() - start)
+
+    # A pickled object keeps its plain method, not the timer
+    def __reduce__(self):
+        return getattr, (self.function.__self__, self.function.__name__)
+
+
+# SRP: this class only measures how long the entry points of the application take.
+# The last `capacity` durations of every entry point live in a ring buffer (so memory
+# stays bounded however long the session is) next to the total count and time of all
+# calls. Percentiles are computed on demand from the buffer, when the HUD refreshes or
+# the profile is dumped, never on the measured path.
+class PerfMonitor:
+    def __init__(self, capacity=1024, enabled=False):
+        self.capacity = capacity
+        self.enabled = enabled
+        self.started = time.time()
+        self._samples = {}   # name -> deque of the last durations (s)
+        self._counts = {}    # name -> calls recorded
+        self._totals = {}    # name -> time recorded (s)
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def reset(self):
+        self._samples.clear()
+        self._counts.clear()
+        self._totals.clear()
+        self.started = time.time()
+
+    def record(self, name, seconds):
+        samples = self._samples.get(name)
+        if samples is None:
+            samples = self._samples[name] = deque(maxlen=self.capacity)
+            self._counts[name] = 0
+            self._totals[name] = 0.0
+        samples.append(seconds)
+        self._counts[name] += 1
+        self._totals[name] += seconds
+
+    # Replaces obj.<method> by a timed version for every name; callers that bind the
+    # method afterwards (signals, callbacks) go through the timer too
+    def instrument(self, obj, names, prefix=""):
+        for name in names:
+            function = getattr(obj, name)
+            if isinstance(function, TimedCall):
+                continue
+            setattr(obj, name, TimedCall(self, prefix + name, function))
+
+    def names(self):
+        return list(self._samples)
+
+    def count(self, name):
+        return self._counts.get(name, 0)
+
+    @staticmethod
+    def percentile(sorted_samples, q):
+        if not sorted_samples:
+            return 0.0
+        rank = max(0, math.ceil(q / 100.0 * len(sorted_samples)) - 1)
+        return sorted_samples[rank]
+
+    # Times in ms; the percentiles and max cover the samples still in the ring buffer
+    def stats(self, name):
+        samples = sorted(self._samples.get(name, ()))
+        count = self._counts.get(name, 0)
+        total = self._totals.get(name, 0.0)
+        return {
+            "count": count,
+            "total_ms": total * 1000,
+            "mean_ms": total * 1000 / count if count else 0.0,
+            "p50_ms": self.percentile(samples, 50) * 1000,
+            "p99_ms": self.percentile(samples, 99) * 1000,
+            "max_ms": samples[-1] * 1000 if samples else 0.0,
+            "window": len(samples),
+        }
+
+    def report(self):
+        return {name: self.stats(name) for name in sorted(self._samples)}
+
+    def dump(self, path):
+        data = {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "duration_s": time.time() - self.started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "capacity": self.capacity,
+            "entries": self.report(),
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
@@ -0,0 +1,68 @@
+# SRP: this class only finds free spots for new devices on a room background.
+# Candidate spots form the same raster the simulator always used (rows from the top
+# margin, half a sprite apart, at least 40 px). Occupied rects live in a coarse grid so
+# testing a candidate only looks at the rects near it, and a cursor per sprite size
+# remembers where the last search stopped: while a layout pass only adds devices,
+# earlier candidates stay occupied, so placing many devices is one sweep in total.
+class FreeSlotPlacer:
+    def __init__(self, background_width, background_height, margin=20, cell_size=64):
+        self.background_width = background_width
+        self.background_height = background_height
+        self.margin = margin
+        self.cell_size = cell_size
+        self._cells = {}      # (column, row) -> list of (left, top, right, bottom)
+        self._cursors = {}    # (width, height) -> index of the next candidate to try
+
+    # x, y, width, height of a device that is already on the background
+    def occupy(self, x, y, width, height):
+        if width <= 0 or height <= 0:
+            return
+        box = (x, y, x + width - 1, y + height - 1)
+        for cell in self._cells_for(*box):
+            self._cells.setdefault(cell, []).append(box)
+
+    def find_slot(self, width, height):
+        m = self.margin
+        step_x = max(width // 2, 40)
+        step_y = max(height // 2, 40)
+        columns = len(range(m, max(self.background_width - width - m, m), step_x))
+        rows = len(range(m, max(self.background_height - height - m, m), step_y))
+        total = columns * rows
+
+        key = (width, height)
+        index = self._cursors.get(key, 0)
+        while index < total:
+            x = m + (index % columns) * step_x
+            y = m + (index // columns) * step_y
+            if self._is_free(x, y, width, height):
+                self._cursors[key] = index + 1
+                self.occupy(x, y, width, height)
+                return x, y
+            index += 1
+
+        # No free candidate: center it, like the original placement did
+        self._cursors[key] = total
+        x = (self.background_width - width) // 2
+        y = (self.background_height - height) // 2
+        self.occupy(x, y, width, height)
+        return x, y
+
+    # sizes: iterable of (width, height); returns the (x, y) of each one, in order
+    def place_many(self, sizes):
+        return [self.find_slot(width, height) for width, height in sizes]
+
+    def _is_free(self, x, y, width, height):
+        left, top, right, bottom = x, y, x + width - 1, y + height - 1
+        for cell in self._cells_for(left, top, right, bottom):
+            for o_left, o_top, o_right, o_bottom in self._cells.get(cell, ()):
+                if left <= o_right and o_left <= right and top <= o_bottom and o_top <= bottom:
+                    return False
+        return True
+
+    def _cells_for(self, left, top, right, bottom):
+        cs = self.cell_size
+        return [
+            (column, row)
+            for column in range(left // cs, right // cs + 1)
+            for row in range(top // cs, bottom // cs + 1)
+        ]
@@ -0,0 +1,271 @@
+from itertools import count
+
+
+# SRP: this class only knows which devices of ONE room are electrically connected
+# to a turned-on voltage source. It does not know about Qt, images or sounds.
+#
+# Every device carries a component label. Adding a wire merges two components by
+# relabelling the smaller one (union by size), so n insertions cost O(n log n) in total.
+# Removing a wire or a device only re-labels the component it belonged to, with an
+# iterative traversal. Each component counts its active sources, so "is this device
+# powered?" is a dictionary lookup. Devices whose powered state flips are collected
+# and handed out by take_changes(). Each component also counts its devices flagged as
+# sensors, which keeps the number of powered sensors of the room without visiting them.
+#
+# Closed circuits are tracked the same way: a component with as many wires as devices
+# contains a loop. A wire joining two devices that were already connected closes one,
+# and the devices on that loop are stored right away. After a deletion the loop of the
+# affected pieces is searched again with an iterative DFS (no recursion limits).
+class PowerNetwork:
+    def __init__(self):
+        self._adjacency = {}        # device id -> set of neighbour ids
+        self._label = {}            # device id -> component label
+        self._members = {}          # component label -> set of device ids
+        self._sources = {}          # component label -> number of active sources
+        self._wires = {}            # component label -> number of wires
+        self._loops = {}            # component label -> tuple of device ids forming a loop
+        self._sensors = {}          # component label -> number of sensors
+        self._active_sources = set()
+        self._sensor_ids = set()
+        self._powered_sensors = 0
+        self._labels = count(1)
+        self._changed = set()
+
+    # ---------------- QUERIES ----------------
+    def __contains__(self, dev_id):
+        return dev_id in self._label
+
+    def is_powered(self, dev_id):
+        label = self._label.get(dev_id)
+        return label is not None and self._sources[label] > 0
+
+    def has_active_source(self):
+        return bool(self._active_sources)
+
+    def component_of(self, dev_id):
+        label = self._label.get(dev_id)
+        return set(self._members[label]) if label is not None else set()
+
+    # Number of sensors connected to a turned-on source
+    def powered_sensors(self):
+        return self._powered_sensors
+
+    def has_cycle(self):
+        return bool(self._loops)
+
+    # Loops of every component that has one, each as a tuple of device ids in order
+    def loops(self):
+        return list(self._loops.values())
+
+    def take_changes(self):
+        changed, self._changed = self._changed, set()
+        return changed
+
+    # ---------------- MUTATIONS ----------------
+    def add_device(self, dev_id, active_source=False, sensor=False):
+        if dev_id in self._label:
+            return
+        label = next(self._labels)
+        self._adjacency[dev_id] = set()
+        self._label[dev_id] = label
+        self._members[label] = {dev_id}
+        self._sources[label] = 0
+        self._wires[label] = 0
+        self._sensors[label] = 0
+        if sensor:
+            self.set_sensor(dev_id, True)
+        if active_source:
+            self.set_source_active(dev_id, True)
+
+    def remove_device(self, dev_id):
+        if dev_id not in self._label:
+            return
+        self.set_source_active(dev_id, False)
+        self.set_sensor(dev_id, False)
+        neighbours = self._adjacency.pop(dev_id)
+        for other in neighbours:
+            self._adjacency[other].discard(dev_id)
+
+        label = self._label.pop(dev_id)
+        self._members[label].discard(dev_id)
+        self._changed.discard(dev_id)
+        if neighbours:
+            self._split(label)
+        elif not self._members[label]:
+            del self._members[label]
+            del self._sources[label]
+            del self._wires[label]
+            del self._sensors[label]
+            self._loops.pop(label, None)
+
+    def add_wire(self, id1, id2):
+        if id1 == id2 or id1 not in self._label or id2 not in self._label:
+            return
+        if id2 in self._adjacency[id1]:
+            return
+
+        label1 = self._label[id1]
+        label2 = self._label[id2]
+        if label1 == label2:
+            # Both ends already connected: this wire closes a loop
+            if label1 not in self._loops:
+                self._loops[label1] = self._path(id1, id2)
+            self._wires[label1] += 1
+        else:
+            self._merge(label1, label2)
+            self._wires[self._label[id1]] += 1
+
+        self._adjacency[id1].add(id2)
+        self._adjacency[id2].add(id1)
+
+    def remove_wire(self, id1, id2):
+        if id1 not in self._adjacency or id2 not in self._adjacency[id1]:
+            return
+        self._adjacency[id1].discard(id2)
+        self._adjacency[id2].discard(id1)
+        self._split(self._label[id1])
+
+    def set_source_active(self, dev_id, active):
+        if dev_id not in self._label or active == (dev_id in self._active_sources):
+            return
+        label = self._label[dev_id]
+        was_powered = self._sources[label] > 0
+        if active:
+            self._active_sources.add(dev_id)
+            self._sources[label] += 1
+        else:
+            self._active_sources.discard(dev_id)
+            self._sources[label] -= 1
+        if was_powered != (self._sources[label] > 0):
+            self._changed |= self._members[label]
+            self._powered_sensors += self._sensors[label] if active else -self._sensors[label]
+
+    def set_sensor(self, dev_id, sensor):
+        if dev_id not in self._label or sensor == (dev_id in self._sensor_ids):
+            return
+        label = self._label[dev_id]
+        step = 1 if sensor else -1
+        if sensor:
+            self._sensor_ids.add(dev_id)
+        else:
+            self._sensor_ids.discard(dev_id)
+        self._sensors[label] += step
+        if self._sources[label] > 0:
+            self._powered_sensors += step
+
+    # ---------------- INTERNALS ----------------
+    def _merge(self, label1, label2):
+        if len(self._members[label1]) < len(self._members[label2]):
+            label1, label2 = label2, label1
+
+        powered1 = self._sources[label1] > 0
+        powered2 = self._sources[label2] > 0
+        if powered1 and not powered2:
+            self._changed |= self._members[label2]
+            self._powered_sensors += self._sensors[label2]
+        elif powered2 and not powered1:
+            self._changed |= self._members[label1]
+            self._powered_sensors += self._sensors[label1]
+
+        moved = self._members.pop(label2)
+        for dev_id in moved:
+            self._label[dev_id] = label1
+        self._members[label1] |= moved
+        self._sources[label1] += self._sources.pop(label2)
+        self._wires[label1] += self._wires.pop(label2)
+        self._sensors[label1] += self._sensors.pop(label2)
+        loop = self._loops.pop(label2, None)
+        if loop is not None and label1 not in self._loops:
+            self._loops[label1] = loop
+
+    # Re-labels the pieces of a component after a wire or device disappeared
+    def _split(self, label):
+        remaining = self._members.pop(label)
+        was_powered = self._sources.pop(label) > 0
+        del self._wires[label]
+        if was_powered:
+            self._powered_sensors -= self._sensors[label]
+        del self._sensors[label]
+        old_loop = self._loops.pop(label, None)
+
+        while remaining:
+            start = remaining.pop()
+            piece = {start}
+            stack = [start]
+            while stack:
+                node = stack.pop()
+                for other in self._adjacency[node]:
+                    if other not in piece:
+                        piece.add(other)
+                        stack.append(other)
+            remaining -= piece
+
+            new_label = next(self._labels)
+            for dev_id in piece:
+                self._label[dev_id] = new_label
+            self._members[new_label] = piece
+            self._sources[new_label] = len(piece & self._active_sources)
+            self._sensors[new_label] = len(piece & self._sensor_ids)
+            if was_powered != (self._sources[new_label] > 0):
+                self._changed |= piece
+            if self._sources[new_label] > 0:
+                self._powered_sensors += self._sensors[new_label]
+
+            wires = sum(len(self._adjacency[dev_id]) for dev_id in piece) // 2
+            self._wires[new_label] = wires
+            if wires >= len(piece):
+                if old_loop is not None and old_loop[0] in piece and self._loop_intact(old_loop):
+                    self._loops[new_label] = old_loop
+                else:
+                    self._loops[new_label] = self._find_loop(start)
+
+    # Devices on the wire path from id1 to id2 (breadth-first, shortest path)
+    def _path(self, id1, id2):
+        previous = {id1: None}
+        queue = [id1]
+        for node in queue:
+            if node == id2:
+                break
+            for other in self._adjacency[node]:
+                if other not in previous:
+                    previous[other] = node
+                    queue.append(other)
+
+        path = []
+        node = id2
+        while node is not None:
+            path.append(node)
+            node = previous[node]
+        return tuple(reversed(path))
+
+    def _loop_intact(self, loop):
+        for i, dev_id in enumerate(loop):
+            other = loop[i - 1]
+            if dev_id not in self._adjacency or other not in self._adjacency[dev_id]:
+                return False
+        return True
+
+    # Iterative DFS: the first wire back to a device still on the DFS path closes a loop
+    def _find_loop(self, start):
+        parent = {start: None}
+        on_path = {start}
+        stack = [(start, iter(self._adjacency[start]))]
+        while stack:
+            node, neighbours = stack[-1]
+            for other in neighbours:
+                if other == parent[node]:
+                    continue
+                if other in on_path:
+                    loop = [node]
+                    while loop[-1] != other:
+                        loop.append(parent[loop[-1]])
+                    return tuple(reversed(loop))
+                if other not in parent:
+                    parent[other] = node
+                    on_path.add(other)
+                    stack.append((other, iter(self._adjacency[other])))
+                    break
+            else:
+                stack.pop()
+                on_path.discard(node)
+        return None
@@ -0,0 +1,162 @@
+import os
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPixmap
+
+
+# Decodes an image from the asset bundle when it packs it (straight from the mapped
+# file), otherwise from the file itself
+def load_pixmap(image_path, bundle=None):
+    data = bundle.data_for(image_path) if bundle is not None else None
+    if data is None:
+        return QPixmap(image_path)
+    pixmap = QPixmap()
+    pixmap.loadFromData(data)
+    return pixmap
+
+
+# SRP: this class only keeps device sprites already scaled for the current background.
+# Keys are (image path, target height, highlight scale) so the highlight animation
+# and the normal size of the same device are cached side by side. A sprite missing here
+# is taken from the disk cache when it has one near that size, else scaled from the
+# source (and the disk cache is asked to prepare it for next time).
+class SpriteCache:
+    def __init__(self, max_entries=256, exists=os.path.exists, bundle=None, disk_cache=None):
+        self.max_entries = max_entries
+        self.exists = exists            # file check (the asset manifest, no disk access)
+        self.bundle = bundle            # AssetBundle the images are read from, if any
+        self.disk_cache = disk_cache    # ScaledImageDiskCache shared across launches, if any
+        self._sprites = OrderedDict()   # LRU order: oldest entries first
+        self._sources = {}              # unscaled pixmaps (None when the file is missing)
+        self._background_size = None
+
+    # Every sprite height depends on the background height, so a new size drops every
+    # scaled sprite; the unscaled sources stay, so they are not read from disk again.
+    def sync_background_size(self, width, height):
+        size = (width, height)
+        if size != self._background_size:
+            self._background_size = size
+            self._sprites.clear()
+
+    def clear(self):
+        self._sprites.clear()
+        self._sources.clear()
+
+    def get(self, image_path, height, scale=1.0):
+        key = (image_path, height, scale)
+        if key in self._sprites:
+            self._sprites.move_to_end(key)
+            return self._sprites[key]
+
+        target_height = int(height * scale)
+        sprite = self._from_disk(image_path, target_height)
+        if sprite is None:
+            source = self._load_source(image_path)
+            if source is not None:
+                sprite = source.scaledToHeight(target_height, Qt.SmoothTransformation)
+                if self.disk_cache is not None:
+                    self.disk_cache.warm([(image_path, target_height)])
+
+        self._sprites[key] = sprite
+        while len(self._sprites) > self.max_entries:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def _from_disk(self, image_path, height):
+        if self.disk_cache is None or not image_path or not self.exists(image_path):
+            return None
+        image = self.disk_cache.load(image_path, height)
+        if image is None:
+            return None
+        if image.height() != height:
+            image = image.scaledToHeight(height, Qt.SmoothTransformation)
+        return QPixmap.fromImage(image)
+
+    def _load_source(self, image_path):
+        if image_path in self._sources:
+            return self._sources[image_path]
+
+        source = None
+        if image_path and self.exists(image_path):
+            pixmap = load_pixmap(image_path, self.bundle)
+            if not pixmap.isNull():
+                source = pixmap
+
+        self._sources[image_path] = source
+        return source
+
+
+# SRP: this class only keeps room backgrounds already scaled to the label size.
+# Entries are keyed by (room key, label width, label height) and survive room changes,
+# so going back to a room or redrawing during a drag reuses the prepared image.
+class BackgroundCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, exists=os.path.exists, bundle=None, disk_cache=None):
+        self.max_bytes = max_bytes
+        self.exists = exists
+        self.bundle = bundle
+        self.disk_cache = disk_cache
+        self._backgrounds = OrderedDict()   # LRU order: oldest entries first
+        self._used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, room_key, image_path, width, height):
+        key = (room_key, width, height)
+        if key in self._backgrounds:
+            self.hits += 1
+            self._backgrounds.move_to_end(key)
+            return self._backgrounds[key]
+
+        self.misses += 1
+        if not self.exists(image_path):
+            return None
+
+        background = self._from_disk(image_path, width, height)
+        if background is None:
+            source = load_pixmap(image_path, self.bundle)
+            if source.isNull():
+                return None
+            background = source.scaled(width, height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self._store(key, background)
+        return background
+
+    # Same size as scaling the source with KeepAspectRatio, from the disk cache entry of
+    # that height; a miss asks the disk cache to prepare it
+    def _from_disk(self, image_path, width, height):
+        if self.disk_cache is None:
+            return None
+        source_size = self.disk_cache.source_size(image_path)
+        if source_size is None:
+            return None
+        size = source_size.scaled(width, height, Qt.KeepAspectRatio)
+        if size.height() <= 0:
+            return None
+
+        image = self.disk_cache.load(image_path, size.height())
+        if image is None:
+            self.disk_cache.warm([(image_path, size.height())])
+            return None
+        if image.size() != size:
+            image = image.scaled(size, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+        return QPixmap.fromImage(image)
+
+    def clear(self):
+        self._backgrounds.clear()
+        self._used_bytes = 0
+
+    def _store(self, key, background):
+        size = self._pixmap_bytes(background)
+        if size > self.max_bytes:
+            return
+
+        while self._backgrounds and self._used_bytes + size > self.max_bytes:
+            _, oldest = self._backgrounds.popitem(last=False)
+            self._used_bytes -= self._pixmap_bytes(oldest)
+
+        self._backgrounds[key] = background
+        self._used_bytes += size
+
+    @staticmethod
+    def _pixmap_bytes(pixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
@@ -0,0 +1,53 @@
+from PyQt5.QtCore import QObject, QTimer, QElapsedTimer
+
+
+# SRP: this class only decides WHEN the room image is redrawn.
+# Callers mark the scene dirty as often as they like; the scene is composed at most
+# once per display frame through a single-shot timer. Extra requests that arrive while
+# a frame is already pending are only counted (coalesced).
+class RepaintScheduler(QObject):
+    def __init__(self, flush_callback, max_fps=60, parent=None):
+        super().__init__(parent)
+        self.flush_callback = flush_callback
+        self.max_fps = max_fps
+
+        self.dirty = False
+        self.requests = 0
+        self.coalesced = 0
+        self.flushes = 0
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._flush)
+
+        self._last_flush = QElapsedTimer()
+
+    def set_max_fps(self, max_fps):
+        self.max_fps = max(1, int(max_fps))
+
+    def frame_interval_ms(self):
+        return 1000 // max(1, self.max_fps)
+
+    def request(self):
+        self.requests += 1
+        if self.dirty:
+            self.coalesced += 1
+            return
+
+        self.dirty = True
+        delay = 0
+        if self._last_flush.isValid():
+            delay = max(0, self.frame_interval_ms() - self._last_flush.elapsed())
+        self._timer.start(delay)
+
+    # Draws right away if a frame is pending (e.g. before reading the composed image)
+    def flush_now(self):
+        if self.dirty:
+            self._timer.stop()
+            self._flush()
+
+    def _flush(self):
+        self.dirty = False
+        self.flushes += 1
+        self._last_flush.start()
+        self.flush_callback()
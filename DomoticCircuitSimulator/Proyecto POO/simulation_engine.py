@@ -0,0 +1,206 @@
+import math
+
+# The engine is vectorized with NumPy; without it the simulator keeps its event-driven
+# behaviour (QTimer arming, alarms decided on each change)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+KIND_OTHER = 0
+KIND_HEAT_SENSOR = 1
+KIND_MOTION_SENSOR = 2
+
+KINDS = {
+    "Heat Sensor": KIND_HEAT_SENSOR,
+    "Motion Sensor": KIND_MOTION_SENSOR,
+}
+
+
+# SRP: this class only advances the simulated state of the whole house in time.
+# It knows nothing about Qt: the GUI pushes the electrical state of the devices
+# (power drawn, powered or not) after each change and samples the results at display
+# rate. All devices live in parallel NumPy arrays (one slot per device), so a step is a
+# handful of array operations whatever the number of devices:
+#   - energy:      every device integrates the power it draws
+#   - temperature: every room relaxes towards the ambient temperature and is heated
+#                  by the power of its devices (first-order thermal model)
+#   - sensors:     motion sensors count down their arming delay; heat sensors that are
+#                  powered raise an alarm when their room is over the threshold
+class SimulationEngine:
+    def __init__(self, room_count, dt=0.01, ambient=25.0, thermal_time_constant=2.0,
+                 heat_capacity=240.0, heat_alarm_threshold=40.0, capacity=64):
+        self.room_count = room_count
+        self.dt = dt
+        self.ambient = ambient
+        self.thermal_time_constant = thermal_time_constant
+        self.heat_capacity = heat_capacity                  # J/°C of every room
+        self.heat_alarm_threshold = heat_alarm_threshold
+        self.max_catch_up = 1.0                             # seconds simulated at most per advance()
+
+        self.time = 0.0
+        self.steps = 0
+        self._pending_time = 0.0
+
+        self.temperature = np.full(room_count, float(ambient))
+        self._keys = []          # slot -> device key
+        self._index = {}         # device key -> slot
+        self._count = 0
+        self._allocate(capacity)
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    def _allocate(self, capacity):
+        def grow(old, fill, dtype):
+            array = np.full(capacity, fill, dtype=dtype)
+            if old is not None:
+                array[:self._count] = old[:self._count]
+            return array
+
+        self._room = grow(getattr(self, "_room", None), 0, np.intp)
+        self._kind = grow(getattr(self, "_kind", None), KIND_OTHER, np.int8)
+        self._power = grow(getattr(self, "_power", None), 0.0, float)
+        self._active = grow(getattr(self, "_active", None), False, bool)
+        self._energy = grow(getattr(self, "_energy", None), 0.0, float)
+        self._arm_remaining = grow(getattr(self, "_arm_remaining", None), np.inf, float)
+        self._armed_now = grow(getattr(self, "_armed_now", None), False, bool)
+
+    # ---------------- DEVICE SET ----------------
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def clear(self, ambient=None):
+        if ambient is not None:
+            self.ambient = ambient
+        self._keys = []
+        self._index = {}
+        self._count = 0
+        self.temperature[:] = self.ambient
+
+    def add_device(self, key, room_index, tipo):
+        if key in self._index:
+            return
+        if self._count == len(self._room):
+            self._allocate(2 * len(self._room))
+        slot = self._count
+        self._count += 1
+        self._keys.append(key)
+        self._index[key] = slot
+        self._room[slot] = room_index
+        self._kind[slot] = KINDS.get(tipo, KIND_OTHER)
+        self._power[slot] = 0.0
+        self._active[slot] = False
+        self._energy[slot] = 0.0
+        self._arm_remaining[slot] = np.inf
+        self._armed_now[slot] = False
+
+    # The last slot moves into the freed one, so the arrays stay dense
+    def remove_device(self, key):
+        slot = self._index.pop(key, None)
+        if slot is None:
+            return
+        last = self._count - 1
+        if slot != last:
+            moved = self._keys[last]
+            self._keys[slot] = moved
+            self._index[moved] = slot
+            for array in (self._room, self._kind, self._power, self._active,
+                          self._energy, self._arm_remaining, self._armed_now):
+                array[slot] = array[last]
+        self._keys.pop()
+        self._count = last
+
+    # powers: W drawn by each device; active: True when the device is powered and connected
+    def update_devices(self, keys, powers, active):
+        slots = [self._index[key] for key in keys if key in self._index]
+        if len(slots) != len(keys):
+            known = [i for i, key in enumerate(keys) if key in self._index]
+            powers = [powers[i] for i in known]
+            active = [active[i] for i in known]
+        if slots:
+            self._power[slots] = powers
+            self._active[slots] = active
+
+    def room_of(self, key):
+        slot = self._index.get(key)
+        return int(self._room[slot]) if slot is not None else None
+
+    def energy(self, key):
+        slot = self._index.get(key)
+        return float(self._energy[slot]) if slot is not None else 0.0
+
+    def room_temperature(self, room_index):
+        return float(self.temperature[room_index])
+
+    # ---------------- SENSORS ----------------
+    def start_arming(self, key, delay):
+        slot = self._index.get(key)
+        if slot is not None and math.isinf(self._arm_remaining[slot]):
+            self._arm_remaining[slot] = delay
+
+    def is_arming(self, key):
+        slot = self._index.get(key)
+        return slot is not None and not math.isinf(self._arm_remaining[slot])
+
+    def cancel_arming(self, key):
+        slot = self._index.get(key)
+        if slot is not None:
+            self._arm_remaining[slot] = np.inf
+            self._armed_now[slot] = False
+
+    # Keys of the motion sensors whose arming delay ran out while powered, since the last call
+    def take_armed(self):
+        n = self._count
+        slots = np.flatnonzero(self._armed_now[:n])
+        self._armed_now[slots] = False
+        return [self._keys[slot] for slot in slots]
+
+    # Rooms with a powered heat sensor over the alarm threshold
+    def heat_alarm_rooms(self):
+        n = self._count
+        rooms = self._room[:n]
+        sensing = (self._kind[:n] == KIND_HEAT_SENSOR) & self._active[:n]
+        hot = self.temperature[rooms] > self.heat_alarm_threshold
+        return [int(room) for room in np.unique(rooms[sensing & hot])]
+
+    # ---------------- TIME ----------------
+    # Runs as many fixed steps as fit in the elapsed wall time; returns the number of steps
+    def advance(self, seconds):
+        self._pending_time = min(self._pending_time + seconds, self.max_catch_up)
+        steps = int(self._pending_time / self.dt)
+        self._pending_time -= steps * self.dt
+        self.run(steps)
+        return steps
+
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
+
+    def step(self):
+        n = self._count
+        dt = self.dt
+        rooms = self._room[:n]
+        power = self._power[:n]
+
+        heat = np.bincount(rooms, weights=power, minlength=self.room_count)
+        self.temperature += dt * (
+            (self.ambient - self.temperature) / self.thermal_time_constant + heat / self.heat_capacity
+        )
+
+        self._energy[:n] += power * dt
+
+        arming = self._arm_remaining[:n]
+        arming -= dt
+        done = arming <= 0.0
+        if done.any():
+            self._armed_now[:n] |= done & self._active[:n]
+            arming[done] = np.inf
+
+        self.time += dt
+        self.steps += 1
@@ -0,0 +1,88 @@
+from itertools import count
+
+
+# SRP: this class only answers "which device is under this point?" for one room.
+# Device rects are stored in a uniform grid of square cells. Every rect is registered
+# in the cells covered by the rect grown by the interaction margin, so a point query
+# only looks at the devices of a single cell.
+# Stacking follows insertion order (the order of the room's device list): when several
+# devices overlap the point, the one inserted last is on top, as in reversed(device_list).
+class SpatialGrid:
+    def __init__(self, cell_size=128, margin=20):
+        self.cell_size = cell_size
+        self.margin = margin
+        self._cells = {}       # (column, row) -> set of keys
+        self._entries = {}     # key -> (item, left, top, right, bottom, z, cells)
+        self._z = count()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._cells.clear()
+        self._entries.clear()
+        self._z = count()
+
+    # rect is any object with x(), y(), width(), height() (QRect)
+    def update(self, key, item, rect):
+        old = self._entries.get(key)
+        z = old[5] if old is not None else next(self._z)
+
+        m = self.margin
+        left = rect.x() - m
+        top = rect.y() - m
+        right = rect.x() + rect.width() - 1 + m
+        bottom = rect.y() + rect.height() - 1 + m
+        cells = self._cells_for(left, top, right, bottom)
+
+        if old is not None:
+            if old[1:5] == (left, top, right, bottom) and old[0] is item:
+                return
+            for cell in old[6] - cells:
+                self._discard(cell, key)
+            new_cells = cells - old[6]
+        else:
+            new_cells = cells
+
+        for cell in new_cells:
+            self._cells.setdefault(cell, set()).add(key)
+        self._entries[key] = (item, left, top, right, bottom, z, cells)
+
+    def remove(self, key):
+        old = self._entries.pop(key, None)
+        if old is None:
+            return
+        for cell in old[6]:
+            self._discard(cell, key)
+
+    def item_at(self, x, y):
+        cs = self.cell_size
+        keys = self._cells.get((x // cs, y // cs))
+        if not keys:
+            return None
+
+        best = None
+        best_z = -1
+        entries = self._entries
+        for key in keys:
+            item, left, top, right, bottom, z, _ = entries[key]
+            if z > best_z and left <= x <= right and top <= y <= bottom:
+                best = item
+                best_z = z
+        return best
+
+    def _cells_for(self, left, top, right, bottom):
+        cs = self.cell_size
+        return {
+            (column, row)
+            for column in range(left // cs, right // cs + 1)
+            for row in range(top // cs, bottom // cs + 1)
+        }
+
+    def _discard(self, cell, key):
+        keys = self._cells.get(cell)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._cells[cell]
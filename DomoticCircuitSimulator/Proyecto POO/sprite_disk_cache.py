@@ -0,0 +1,221 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+
+from PyQt5.QtCore import Qt, QBuffer, QByteArray, QRunnable, QThreadPool
+from PyQt5.QtGui import QImage, QImageReader
+
+
+# Entry file: header (magic, width, height, bytes per line) + the raw premultiplied
+# ARGB32 pixels, so a hit is one read and one copy, with no decoding at all
+HEADER = struct.Struct("<4sIII")
+MAGIC = b"EHS1"
+EXTENSION = ".img"
+IMAGE_FORMAT = QImage.Format_ARGB32_Premultiplied
+
+
+class _WarmTask(QRunnable):
+    def __init__(self, cache, jobs):
+        super().__init__()
+        self.cache = cache
+        self.jobs = jobs
+
+    def run(self):
+        for image_path, height in self.jobs:
+            try:
+                self.cache.prepare(image_path, height)
+            except Exception as e:
+                self.cache.last_error = str(e)
+
+
+# SRP: this class only keeps scaled copies of the image files on disk, across launches.
+# An entry is keyed by the hash of the source bytes (a changed file never hits a stale
+# entry) and a height rounded up to the next multiple of `bucket`, so nearby window
+# sizes share one entry: the caller only scales it down the last few pixels, which is
+# cheap next to decoding and smoothing the full-size PNG. Entries are made on a single
+# worker thread (warm), the total size is capped and the least recently used entries go
+# first; the last use is the file modification time, so the order survives restarts.
+class ScaledImageDiskCache:
+    def __init__(self, directory, max_bytes=128 * 1024 * 1024, bucket=16, bundle=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bucket = bucket
+        self.bundle = bundle            # AssetBundle the sources are read from, if any
+        os.makedirs(directory, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.last_error = None
+
+        self._lock = threading.Lock()
+        self._hashes = {}               # image path -> hash of its bytes (None: unreadable)
+        self._source_sizes = {}         # image path -> QSize of the source (None: unreadable)
+        self._entries = {}              # entry file name -> [size in bytes, last use]
+        self._used_bytes = 0
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(EXTENSION):
+                    stat = entry.stat()
+                    self._entries[entry.name] = [stat.st_size, stat.st_mtime]
+                    self._used_bytes += stat.st_size
+
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+
+    def bucket_height(self, height):
+        return max(self.bucket, -(-int(height) // self.bucket) * self.bucket)
+
+    def _source_bytes(self, image_path):
+        data = self.bundle.data_for(image_path) if self.bundle is not None else None
+        if data is not None:
+            return data
+        with open(image_path, "rb") as f:
+            return f.read()
+
+    def _source_hash(self, image_path):
+        with self._lock:
+            if image_path in self._hashes:
+                return self._hashes[image_path]
+        try:
+            digest = hashlib.blake2b(self._source_bytes(image_path), digest_size=16).hexdigest()
+        except OSError:
+            digest = None
+        with self._lock:
+            self._hashes[image_path] = digest
+        return digest
+
+    # Size of the source image, from its header only
+    def source_size(self, image_path):
+        with self._lock:
+            if image_path in self._source_sizes:
+                return self._source_sizes[image_path]
+        size = None
+        data = self.bundle.data_for(image_path) if self.bundle is not None else None
+        if data is None:
+            reader_size = QImageReader(image_path).size()
+        else:
+            buffer = QBuffer()
+            buffer.setData(QByteArray.fromRawData(data))
+            reader_size = QImageReader(buffer).size()
+        if reader_size.isValid() and reader_size.height() > 0:
+            size = reader_size
+        with self._lock:
+            self._source_sizes[image_path] = size
+        return size
+
+    def _entry_name(self, image_path, height):
+        digest = self._source_hash(image_path)
+        if digest is None:
+            return None
+        return f"{digest}-{self.bucket_height(height)}{EXTENSION}"
+
+    # The source scaled to the bucket of height (at least height pixels high), or None
+    def load(self, image_path, height):
+        name = self._entry_name(image_path, height)
+        with self._lock:
+            known = name is not None and name in self._entries
+        if not known:
+            self.misses += 1
+            return None
+
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                magic, width, image_height, bytes_per_line = HEADER.unpack(f.read(HEADER.size))
+                pixels = f.read()
+            if magic != MAGIC or len(pixels) != bytes_per_line * image_height:
+                raise ValueError("corrupt entry")
+            image = QImage(pixels, width, image_height, bytes_per_line, IMAGE_FORMAT).copy()
+            os.utime(path)
+        except (OSError, ValueError, struct.error):
+            self._remove(name)
+            self.misses += 1
+            return None
+
+        with self._lock:
+            if name in self._entries:
+                self._entries[name][1] = time.time()
+        self.hits += 1
+        return image
+
+    # Makes the entry for (image_path, height) if it is not on disk yet. Thread-safe.
+    def prepare(self, image_path, height):
+        name = self._entry_name(image_path, height)
+        if name is None:
+            return
+        with self._lock:
+            if name in self._entries:
+                return
+
+        source = QImage.fromData(self._source_bytes(image_path))
+        if source.isNull():
+            return
+        target = self.bucket_height(height)
+        if target < source.height():
+            source = source.scaledToHeight(target, Qt.SmoothTransformation)
+        image = source.convertToFormat(IMAGE_FORMAT)
+
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        path = os.path.join(self.directory, name)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, image.width(), image.height(), image.bytesPerLine()))
+            f.write(bits)
+        os.replace(temp_path, path)
+
+        size = os.path.getsize(path)
+        with self._lock:
+            previous = self._entries.get(name)
+            if previous is not None:
+                self._used_bytes -= previous[0]
+            self._entries[name] = [size, os.path.getmtime(path)]
+            self._used_bytes += size
+            self.writes += 1
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            if self._used_bytes <= self.max_bytes:
+                return
+            oldest_first = sorted(self._entries, key=lambda name: self._entries[name][1])
+            victims = []
+            for name in oldest_first:
+                if self._used_bytes <= self.max_bytes:
+                    break
+                self._used_bytes -= self._entries.pop(name)[0]
+                victims.append(name)
+            self.evictions += len(victims)
+        for name in victims:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _remove(self, name):
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self._used_bytes -= entry[0]
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    # Makes the entries of jobs [(image path, height)] on the worker thread
+    def warm(self, jobs):
+        jobs = list(jobs)
+        if jobs:
+            self.pool.start(_WarmTask(self, jobs))
+
+    def used_bytes(self):
+        return self._used_bytes
+
+    # Drops the jobs not started yet and waits for the running one (closing the app)
+    def stop(self):
+        self.pool.clear()
+        self.pool.waitForDone()
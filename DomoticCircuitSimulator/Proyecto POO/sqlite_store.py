@@ -0,0 +1,258 @@
+import json
+import os
+import sqlite3
+
+from house_model import HouseModel
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    id         INTEGER PRIMARY KEY,
+    room       TEXT    NOT NULL,
+    seq        INTEGER NOT NULL,
+    tipo       TEXT    NOT NULL,
+    imagen     TEXT    NOT NULL,
+    x          INTEGER NOT NULL,
+    y          INTEGER NOT NULL,
+    conectado  INTEGER NOT NULL,
+    encendido  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS devices_by_room ON devices (room, seq);
+CREATE INDEX IF NOT EXISTS devices_by_tipo ON devices (tipo, room);
+
+CREATE TABLE IF NOT EXISTS connections (
+    room     TEXT    NOT NULL,
+    origen   INTEGER NOT NULL,
+    destino  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS connections_by_room ON connections (room);
+CREATE INDEX IF NOT EXISTS connections_by_origen ON connections (origen);
+CREATE INDEX IF NOT EXISTS connections_by_destino ON connections (destino);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value  TEXT NOT NULL
+);
+"""
+
+DEVICE_COLUMNS = ("id", "tipo", "imagen", "x", "y", "conectado", "encendido")
+
+# Devices that act on the whole house (alarms, simulation) wherever the user is
+SENSOR_TYPES = ("Heat Sensor", "Motion Sensor")
+
+
+# SRP: this class only stores the house in a SQLite database, one row per device and
+# per wire. Opening a file reads the meta values and the rooms that hold a sensor (a
+# sensor needs its room's circuit to know whether it is powered, and the heat alarm and
+# the simulation watch every room); any other room's rows are read the first time the
+# user enters it (ensure_room), so files with tens of thousands of devices open at
+# once. Every change the model reports becomes a row-level INSERT, UPDATE or DELETE
+# inside an open transaction that sync() commits; a drag only writes its last position.
+# The first time a database is created next to a JSON save file, that file is imported.
+class SqliteHouseStore:
+    def __init__(self):
+        self.model = None
+        self.database_path = None
+        self.connection = None
+        self.loaded_rooms = set()
+        self.statements = 0       # row-level statements since the file was opened
+        self.commits = 0
+
+        self._moves = {}          # device id -> (x, y) not written yet
+        self._next_seq = 0
+        self._loading = False
+
+    @staticmethod
+    def database_path_for(snapshot_path):
+        return os.path.splitext(snapshot_path)[0] + ".db"
+
+    # Opens the database next to snapshot_path and loads the rooms with sensors into the
+    # model; the other rooms are read on demand. Returns False when there was nothing
+    # stored yet.
+    def load(self, model, snapshot_path):
+        self.close()
+        if self.model is not model:
+            if self.model is not None:
+                self.model.unsubscribe(self.on_model_event)
+            model.subscribe(self.on_model_event)
+        self.model = model
+        self.database_path = self.database_path_for(snapshot_path)
+
+        created = not os.path.exists(self.database_path)
+        self.connection = sqlite3.connect(self.database_path)
+        self.connection.executescript(SCHEMA)
+        if created and os.path.exists(snapshot_path):
+            self._import_json(snapshot_path)
+
+        meta = dict(self.connection.execute("SELECT key, value FROM meta"))
+        max_id, max_seq = self.connection.execute("SELECT MAX(id), MAX(seq) FROM devices").fetchone()
+        self._next_seq = (max_seq or 0) + 1
+        next_id = max(int(meta.get("next_id", 1)), (max_id or 0) + 1)
+
+        self.loaded_rooms = set()
+        self._loading = True
+        try:
+            model.load_dict({
+                "dispositivos": {},
+                "conexiones": {},
+                "next_id": next_id,
+                "temperatura": int(meta.get("temperatura", model.temperature)),
+            })
+        finally:
+            self._loading = False
+
+        placeholders = ", ".join("?" * len(SENSOR_TYPES))
+        sensor_rooms = self.connection.execute(
+            f"SELECT DISTINCT room FROM devices WHERE tipo IN ({placeholders})", SENSOR_TYPES
+        ).fetchall()
+        for (room,) in sensor_rooms:
+            self.ensure_room(room)
+        return max_id is not None or bool(meta)
+
+    def _import_json(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        # Goes through a model so both save formats are accepted
+        staging = HouseModel(use_simulation=False)
+        staging.load_dict(data)
+        self._write_all(staging)
+
+    # Replaces every row with the content of model
+    def _write_all(self, model):
+        with self.connection:
+            self.connection.execute("DELETE FROM devices")
+            self.connection.execute("DELETE FROM connections")
+            seq = 0
+            for room in model.rooms:
+                rows = []
+                for dev in model.devices_by_room[room]:
+                    seq += 1
+                    rows.append((dev.id, room, seq, dev.tipo, dev.imagen, int(dev.x), int(dev.y),
+                                 int(bool(dev.conectado)), int(bool(dev.encendido))))
+                self.connection.executemany("INSERT INTO devices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                self.connection.executemany(
+                    "INSERT INTO connections VALUES (?, ?, ?)",
+                    ((room, origen, destino) for origen, destino in model.connections_by_room[room]),
+                )
+            self._set_meta("next_id", model.next_device_id)
+            self._set_meta("temperatura", model.temperature)
+        self._next_seq = seq + 1
+
+    # Rewrites the rooms that were loaded or that the new house fills. A room never
+    # entered that the model holds empty keeps its rows (they were simply not read) and
+    # stays lazy; ids go on after the highest stored one so they cannot collide.
+    def _write_loaded_house(self):
+        model = self.model
+        rooms = [room for room in model.rooms if room in self.loaded_rooms or model.devices_by_room[room]]
+        with self.connection:
+            for room in rooms:
+                self.connection.execute("DELETE FROM devices WHERE room = ?", (room,))
+                self.connection.execute("DELETE FROM connections WHERE room = ?", (room,))
+                rows = []
+                for dev in model.devices_by_room[room]:
+                    rows.append((dev.id, room, self._next_seq, dev.tipo, dev.imagen, int(dev.x), int(dev.y),
+                                 int(bool(dev.conectado)), int(bool(dev.encendido))))
+                    self._next_seq += 1
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self.connection.executemany(
+                    "INSERT INTO connections VALUES (?, ?, ?)",
+                    ((room, origen, destino) for origen, destino in model.connections_by_room[room]),
+                )
+            (max_id,) = self.connection.execute("SELECT MAX(id) FROM devices").fetchone()
+            model.next_device_id = max(model.next_device_id, (max_id or 0) + 1)
+            self._set_meta("next_id", model.next_device_id)
+            self._set_meta("temperatura", model.temperature)
+        self.loaded_rooms.update(rooms)
+
+    def _set_meta(self, key, value):
+        self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # ---------------- LAZY ROOM LOADING ----------------
+    def ensure_room(self, room):
+        if self.connection is None or room in self.loaded_rooms or room not in self.model.rooms:
+            return
+        self.loaded_rooms.add(room)
+        cursor = self.connection.execute(
+            f"SELECT {', '.join(DEVICE_COLUMNS)} FROM devices WHERE room = ? ORDER BY seq", (room,)
+        )
+        devices = [dict(zip(DEVICE_COLUMNS, row)) for row in cursor]
+        wires = self.connection.execute(
+            "SELECT origen, destino FROM connections WHERE room = ? ORDER BY rowid", (room,)
+        ).fetchall()
+
+        self._loading = True
+        try:
+            self.model.load_room(room, devices, wires)
+        finally:
+            self._loading = False
+
+    # ---------------- WRITING ----------------
+    def on_model_event(self, event):
+        if self._loading or self.connection is None:
+            return
+        kind = event.kind
+        dev = event.device
+
+        if kind == "loaded":
+            # Someone else replaced the whole house: store the rooms it holds
+            if event.room is None:
+                self._write_loaded_house()
+            return
+
+        if kind == "device_moved":
+            self._moves[dev.id] = (int(dev.x), int(dev.y))
+            return
+
+        if kind == "device_added":
+            self._execute(
+                "INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (dev.id, event.room, self._next_seq, dev.tipo, dev.imagen, int(dev.x), int(dev.y),
+                 int(bool(dev.conectado)), int(bool(dev.encendido))),
+            )
+            self._next_seq += 1
+            self._set_meta("next_id", self.model.next_device_id)
+        elif kind == "device_removed":
+            self._moves.pop(dev.id, None)
+            self._execute("DELETE FROM devices WHERE id = ?", (dev.id,))
+            self._execute("DELETE FROM connections WHERE origen = ? OR destino = ?", (dev.id, dev.id))
+        elif kind in ("device_switched", "device_forced_off", "sensor_armed", "sensor_disarmed"):
+            self._execute(
+                "UPDATE devices SET encendido = ?, conectado = ?, imagen = ? WHERE id = ?",
+                (int(bool(dev.encendido)), int(bool(dev.conectado)), dev.imagen, dev.id),
+            )
+        elif kind == "wire_added":
+            origen, destino = event.value
+            self._execute("INSERT INTO connections VALUES (?, ?, ?)", (event.room, origen.id, destino.id))
+        elif kind == "temperature_changed":
+            self._set_meta("temperatura", event.value)
+
+    def _execute(self, sql, parameters):
+        self.connection.execute(sql, parameters)
+        self.statements += 1
+
+    # Writes the pending moves and commits the open transaction
+    def sync(self):
+        if self.connection is None:
+            return
+        if self._moves:
+            moves, self._moves = self._moves, {}
+            self.connection.executemany(
+                "UPDATE devices SET x = ?, y = ? WHERE id = ?",
+                ((x, y, dev_id) for dev_id, (x, y) in moves.items()),
+            )
+            self.statements += len(moves)
+        if self.connection.in_transaction:
+            self.connection.commit()
+            self.commits += 1
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.sync()
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The simulator modules are flat files next to main.py, imported by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
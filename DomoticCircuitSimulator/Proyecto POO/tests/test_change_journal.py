@@ -0,0 +1,103 @@
+import json
+import random
+
+from change_journal import ChangeJournal, replay
+from house_model import HouseModel
+
+
+def state(model):
+    data = model.to_dict()
+    data.pop("journal_generation", None)
+    return data
+
+
+def test_replay_of_a_removal_drops_only_that_device_and_its_wires():
+    data = {
+        "dispositivos": {"Kitchen": [{"id": i} for i in (1, 2, 3)]},
+        "conexiones": {"Kitchen": [{"origen": 1, "destino": 2}, {"origen": 2, "destino": 3},
+                                   {"origen": 3, "destino": 1}]},
+        "next_id": 4,
+    }
+    replay(data, [{"op": "remove", "room": "Kitchen", "id": 2},
+                  {"op": "connect", "room": "Kitchen", "a": 1, "b": 3}])
+    assert [dev["id"] for dev in data["dispositivos"]["Kitchen"]] == [1, 3]
+    assert data["conexiones"]["Kitchen"] == [{"origen": 3, "destino": 1}]
+
+
+def test_reloaded_journal_matches_the_live_model(tmp_path):
+    snapshot = str(tmp_path / "house.json")
+    rnd = random.Random(7)
+    model = HouseModel(use_simulation=False)
+    journal = ChangeJournal(compact_bytes=4096, fsync_every=8)
+    journal.load(model, snapshot)
+    types = ["Bulb", "TV", "Radio", "Heat Sensor", "Motion Sensor", "Lamp"]
+
+    for step in range(400):
+        room = rnd.choice(model.rooms)
+        devices = model.devices_by_room[room]
+        op = rnd.random()
+        if op < 0.3 or len(devices) < 2:
+            tipo = "Voltage Source" if not devices else rnd.choice(types)
+            model.add_device(room, tipo, "")
+        elif op < 0.55:
+            model.connect(room, *rnd.sample(devices, 2))
+        elif op < 0.7:
+            model.remove_device(room, rnd.choice(devices))
+        elif op < 0.85:
+            dev = rnd.choice(devices)
+            model.move_device(room, dev, rnd.randint(0, 800), rnd.randint(0, 600))
+        elif op < 0.92:
+            dev = rnd.choice(devices)
+            (model.turn_off if dev.encendido else model.turn_on)(room, dev)
+        elif op < 0.97:
+            # Motion sensors arm after a delay, without a switch event
+            model.advance(rnd.choice((1, 10)))
+        else:
+            model.set_temperature(rnd.randint(10, 50))
+    expected = state(model)
+    assert journal.compactions > 0
+    journal.close()
+
+    reloaded = HouseModel(use_simulation=False)
+    second = ChangeJournal()
+    assert second.load(reloaded, snapshot)
+    assert second.replayed > 0
+    assert state(reloaded) == expected
+    second.close()
+
+
+def test_motion_sensor_armed_by_the_clock_survives_a_reload(tmp_path):
+    snapshot = str(tmp_path / "house.json")
+    model = HouseModel(use_simulation=False)
+    journal = ChangeJournal()
+    journal.load(model, snapshot)
+    source = model.add_device("Kitchen", "Voltage Source", "")
+    sensor = model.add_device("Kitchen", "Motion Sensor", "")
+    model.turn_on("Kitchen", source)
+    model.connect("Kitchen", source, sensor)
+    model.advance(10)
+    assert sensor.encendido
+    journal.close()
+
+    reloaded = HouseModel(use_simulation=False)
+    ChangeJournal().load(reloaded, snapshot)
+    assert reloaded.device("Kitchen", sensor.id).encendido
+    assert state(reloaded) == state(model)
+
+
+def test_legacy_snapshot_is_migrated_in_journal_mode(tmp_path):
+    snapshot = tmp_path / "house.json"
+    legacy = {"Kitchen": [{"tipo": "Bulb", "imagen": "Bulb OFF.png", "x": 10, "y": 20}]}
+    snapshot.write_text(json.dumps(legacy), encoding="utf-8")
+
+    model = HouseModel(use_simulation=False)
+    reports = []
+    model.subscribe(lambda event: event.kind == "loaded" and reports.append(event.value))
+    journal = ChangeJournal()
+    assert journal.load(model, str(snapshot))
+    journal.close()
+
+    assert reports and reports[0].migrated
+    assert (tmp_path / "house.json.bak").exists()
+    assert "dispositivos" in json.loads(snapshot.read_text(encoding="utf-8"))
+    assert [dev.tipo for dev in model.devices_by_room["Kitchen"]] == ["Bulb"]
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from circuit_solver import NOMINAL_VOLTAGE, CircuitSolver
+from house_model import HouseModel
+
+
+def build_house(source_voltage, load_types):
+    model = HouseModel(rooms=["Kitchen"], use_simulation=False, source_voltage=source_voltage)
+    events = []
+    model.subscribe(events.append)
+    source = model.add_device("Kitchen", "Voltage Source", "")
+    for tipo in load_types:
+        load = model.add_device("Kitchen", tipo, "")
+        model.connect("Kitchen", source, load)
+    model.turn_on("Kitchen", source)
+    return model, events
+
+
+def broken_events(events):
+    return [event for event in events if event.kind == "device_broken"]
+
+
+def test_loads_at_rated_voltage_never_break():
+    model, events = build_house(NOMINAL_VOLTAGE, ["Bulb", "Lamp", "TV", "Radio", "Computer"] * 6)
+    solution = model.circuit_by_room["Kitchen"]
+    assert max(solution.voltages.values()) <= NOMINAL_VOLTAGE + 1e-9
+    assert broken_events(events) == []
+    assert model.broken_by_room["Kitchen"] == set()
+
+
+def test_over_voltage_source_breaks_a_bulb():
+    model, events = build_house(12.0, ["Bulb"])
+    broken = broken_events(events)
+    assert len(broken) == 1
+    voltage, power = broken[0].value
+    assert broken[0].device.tipo == "Bulb"
+    assert voltage > 5
+    assert broken[0].device.id in model.broken_by_room["Kitchen"]
+
+
+def test_over_power_breaks_a_tv_when_the_emf_is_raised():
+    model, events = build_house(NOMINAL_VOLTAGE, ["TV"])
+    assert broken_events(events) == []
+
+    model.set_source_voltage(10.0)
+    broken = broken_events(events)
+    assert [event.device.tipo for event in broken] == ["TV"]
+    assert broken[0].value[1] > 120
+
+    model.set_source_voltage(NOMINAL_VOLTAGE)
+    assert model.broken_by_room["Kitchen"] == set()
+
+
+def test_solution_is_not_clamped_to_the_emf():
+    solution = CircuitSolver(source_voltage=12.0).solve(
+        [(1, "Voltage Source", True), (2, "Bulb", True)], [(1, 2)]
+    )
+    assert 11.0 < solution.voltage(2) < 12.0
+
+
+def random_room(seed, size=60):
+    rnd = random.Random(seed)
+    types = ["Bulb", "Lamp", "TV", "Radio", "Computer", "Heat Sensor"]
+    devices = [(1, "Voltage Source", True)] + [
+        (dev_id, rnd.choice(types), rnd.random() < 0.7) for dev_id in range(2, size + 1)
+    ]
+    wires = {(rnd.randint(1, dev_id - 1), dev_id) for dev_id in range(2, size + 1) if rnd.random() < 0.9}
+    for _ in range(size // 3):
+        a, b = rnd.sample(range(1, size + 1), 2)
+        if (b, a) not in wires:
+            wires.add((a, b))
+    return devices, sorted(wires)
+
+
+def test_currents_obey_kirchhoff_at_every_node():
+    solver = CircuitSolver()
+    for seed in range(10):
+        devices, wires = random_room(seed)
+        solution = solver.solve(devices, wires)
+        balance = {dev_id: 0.0 for dev_id, _, _ in devices}
+        for (origen, destino), current in solution.wire_currents.items():
+            balance[origen] -= current
+            balance[destino] += current
+        for dev_id, tipo, conducting in devices:
+            drawn = solution.current(dev_id)
+            balance[dev_id] += drawn if tipo == "Voltage Source" else -drawn
+            assert abs(balance[dev_id]) < 1e-6
+        assert max(solution.voltages.values()) <= NOMINAL_VOLTAGE + 1e-9
+
+
+def test_numpy_and_python_backends_agree():
+    np = pytest.importorskip("numpy")
+    solver = CircuitSolver()
+    for seed in range(5):
+        devices, wires = random_room(seed, size=40)
+        n = len(devices)
+        diag = [1.0 + seed] * n
+        rows, cols = [], []
+        for origen, destino in wires:
+            rows += [origen - 1, destino - 1]
+            cols += [destino - 1, origen - 1]
+            diag[origen - 1] += 50.0
+            diag[destino - 1] += 50.0
+        rhs = [float(i % 7) for i in range(n)]
+        x_numpy, _, _ = solver._conjugate_gradient_numpy(diag, rows, cols, -50.0, rhs)
+        x_python, _, _ = solver._conjugate_gradient_python(diag, rows, cols, -50.0, rhs)
+        assert np.allclose(x_numpy, x_python, atol=1e-9)
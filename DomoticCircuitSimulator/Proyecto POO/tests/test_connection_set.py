@@ -0,0 +1,62 @@
+import random
+
+from connection_set import ConnectionSet
+from house_model import HouseModel
+
+
+def test_matches_a_plain_list_of_wires():
+    for seed in range(20):
+        rnd = random.Random(seed)
+        wires = ConnectionSet()
+        reference = []     # (origen, destino) in the order they were drawn
+
+        def find(a, b):
+            for i, (origen, destino) in enumerate(reference):
+                if {origen, destino} == {a, b}:
+                    return i
+            return None
+
+        for _ in range(500):
+            a, b = rnd.randint(1, 15), rnd.randint(1, 15)
+            op = rnd.random()
+            if op < 0.6:
+                expected = a != b and find(a, b) is None
+                assert wires.add(a, b) == expected
+                if expected:
+                    reference.append((a, b))
+            elif op < 0.8:
+                i = find(a, b)
+                assert wires.remove(a, b) == (i is not None)
+                if i is not None:
+                    del reference[i]
+            else:
+                removed = wires.remove_device(a)
+                expected = [wire for wire in reference if a in wire]
+                reference = [wire for wire in reference if a not in wire]
+                assert sorted(removed) == sorted(expected)
+
+            assert list(wires) == reference
+            assert len(wires) == len(reference)
+            assert ((b, a) in wires) == (find(a, b) is not None)
+            assert wires.degree(a) == sum(1 for wire in reference if a in wire)
+            assert sorted(wires.incident_to([a, b])) == sorted(
+                wire for wire in reference if a in wire or b in wire
+            )
+
+
+def test_duplicate_wires_of_a_save_file_are_merged_in_order():
+    model = HouseModel(rooms=["Kitchen"], use_simulation=False)
+    model.load_dict({
+        "dispositivos": {"Kitchen": [
+            {"id": i, "tipo": "Bulb", "imagen": "", "x": 0, "y": 0, "conectado": True, "encendido": False}
+            for i in (1, 2, 3)
+        ]},
+        "conexiones": {"Kitchen": [
+            {"origen": 2, "destino": 1}, {"origen": 1, "destino": 2},
+            {"origen": 3, "destino": 2}, {"origen": 2, "destino": 3},
+        ]},
+        "next_id": 4,
+    })
+    assert model.connections_by_room["Kitchen"].to_list() == [
+        {"origen": 2, "destino": 1}, {"origen": 3, "destino": 2},
+    ]
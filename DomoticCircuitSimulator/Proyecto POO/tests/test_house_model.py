@@ -0,0 +1,46 @@
+import pytest
+
+from house_model import HouseModel
+
+
+def heated_kitchen(use_simulation):
+    model = HouseModel(use_simulation=use_simulation)
+    source = model.add_device("Kitchen", "Voltage Source", "")
+    sensor = model.add_device("Kitchen", "Heat Sensor", "")
+    model.turn_on("Kitchen", source)
+    model.connect("Kitchen", source, sensor)
+    alarms = []
+    model.subscribe(lambda event: event.kind == "heat_alarm" and alarms.append(event.value))
+    return model, alarms
+
+
+@pytest.mark.parametrize("use_simulation", [False, True])
+def test_heat_alarm_follows_the_ambient_temperature_at_once(use_simulation):
+    model, alarms = heated_kitchen(use_simulation)
+    if use_simulation and model.simulation is None:
+        pytest.skip("the simulation needs NumPy")
+    model.set_temperature(45)
+    assert alarms[-1] is True
+    model.advance(1)
+    assert model.heat_alarm_on
+    model.set_temperature(25)
+    assert alarms[-1] is False
+
+
+def test_simulated_room_keeps_the_alarm_while_it_cools_down():
+    model, alarms = heated_kitchen(True)
+    if model.simulation is None:
+        pytest.skip("the simulation needs NumPy")
+    model.set_temperature(45)
+    for _ in range(10):
+        model.advance(1)          # at most one simulated second per call
+    assert model.room_temperature("Kitchen") > model.heat_alarm_threshold
+    model.set_temperature(25)
+    # The room is still hot: the alarm stays on until the simulation cools it
+    assert alarms[-1] is True
+    for _ in range(60):
+        model.advance(1)
+        if not model.heat_alarm_on:
+            break
+    assert alarms[-1] is False
+    assert model.room_temperature("Kitchen") <= model.heat_alarm_threshold
@@ -0,0 +1,157 @@
+import io
+import json
+import random
+
+import pytest
+
+from house_model import ROOMS, HouseModel
+from layout_generator import LayoutGenerator
+from layout_loader import JsonStream, LayoutError, LayoutLoader
+
+
+CHUNK_SIZES = (1, 2, 7, 64, 4096)
+
+
+def random_value(rnd, depth=0):
+    kind = rnd.randrange(8 if depth < 3 else 5)
+    if kind == 0:
+        return rnd.randint(-10 ** 6, 10 ** 6)
+    if kind == 1:
+        return rnd.uniform(-1e3, 1e3)
+    if kind == 2:
+        # Brackets, braces and escapes inside strings must not confuse the window cuts
+        return "".join(rnd.choice('ab}]{[,:"\\\n é€') for _ in range(rnd.randint(0, 12)))
+    if kind == 3:
+        return rnd.choice([True, False, None])
+    if kind == 4:
+        return rnd.randint(0, 9)
+    if kind == 5:
+        return [random_value(rnd, depth + 1) for _ in range(rnd.randint(0, 4))]
+    return {f"k{i}": random_value(rnd, depth + 1) for i in range(rnd.randint(0, 4))}
+
+
+def dump(data, rnd):
+    indent = rnd.choice([None, 0, 2])
+    separators = rnd.choice([(",", ":"), (", ", ": "), (" ,  ", " : ")])
+    return json.dumps(data, indent=indent, separators=separators, ensure_ascii=rnd.random() < 0.5)
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_stream_elements_match_json_load(chunk_size):
+    for seed in range(40):
+        rnd = random.Random(seed)
+        elements = [random_value(rnd) for _ in range(rnd.randint(0, 60))]
+        text = dump({"before": 1, "items": elements, "after": [1, 2]}, rnd)
+
+        stream = JsonStream(io.StringIO(text), chunk_size=chunk_size)
+        parsed = {}
+        for key in stream.keys():
+            parsed[key] = list(stream.elements()) if stream.peek() == "[" else stream.value()
+        assert stream.peek() == ""
+        assert parsed == json.loads(text)
+
+
+def layout_summary(layout):
+    return (
+        [(room, record.to_dict()) for room, record in layout.devices],
+        layout.wires,
+        layout.next_id,
+        layout.temperature,
+        dict(layout.report.rejected),
+        layout.report.legacy,
+    )
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES[1:])
+def test_generated_file_reads_like_json_load(tmp_path, chunk_size):
+    path = str(tmp_path / "layout.json")
+    LayoutGenerator({room: 150 for room in ROOMS}, topology="mesh", density=0.5, seed=3).write(path)
+    with open(path, encoding="utf-8") as f:
+        expected = layout_summary(LayoutLoader(ROOMS).read_dict(json.load(f)))
+    assert layout_summary(LayoutLoader(ROOMS, chunk_size=chunk_size).read_file(path)) == expected
+    assert len(expected[0]) == 450 + len(ROOMS)        # plus one source per room
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_invalid_records_are_rejected_the_same_way(tmp_path, chunk_size):
+    data = {
+        "dispositivos": {
+            "Kitchen": [
+                {"id": 1, "tipo": "Voltage Source", "imagen": "a.png", "x": 1, "y": 2,
+                 "conectado": True, "encendido": True},
+                {"id": "2", "tipo": "Bulb", "imagen": "b.png", "x": "3", "y": 4.0},
+                {"id": 1, "tipo": "Bulb", "imagen": "c.png", "x": 0, "y": 0},
+                {"id": 4, "tipo": "Toaster", "imagen": "", "x": 0, "y": 0},
+                {"id": 5, "tipo": "TV", "imagen": "", "x": "left", "y": 0},
+                "not a device",
+            ],
+            "Attic": [{"id": 9, "tipo": "Bulb", "imagen": "", "x": 0, "y": 0}],
+            "room": {"id": 6},
+        },
+        "conexiones": {
+            "Kitchen": [{"origen": 1, "destino": 2}, {"origen": 2, "destino": 1}, {"origen": 1, "destino": 1},
+                        {"origen": 1, "destino": 77}, {"origen": "x"}],
+        },
+        "next_id": 3,
+        "temperatura": "31",
+    }
+    path = tmp_path / "layout.json"
+    path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+    expected = layout_summary(LayoutLoader(ROOMS).read_dict(data))
+    assert layout_summary(LayoutLoader(ROOMS, chunk_size=chunk_size).read_file(str(path))) == expected
+    assert expected[4]                       # something was rejected
+    assert [record["id"] for _, record in expected[0]] == [1, 2]
+
+
+@pytest.mark.parametrize("chunk_size", CHUNK_SIZES)
+def test_legacy_file_reads_like_json_load(tmp_path, chunk_size):
+    rnd = random.Random(5)
+    data = {
+        room: [{"tipo": rnd.choice(["Bulb", "TV", "Radio"]), "imagen": "x.png",
+                "x": rnd.randint(0, 800), "y": rnd.randint(0, 500)} for _ in range(30)]
+        for room in ROOMS
+    }
+    path = tmp_path / "legacy.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    expected = layout_summary(LayoutLoader(ROOMS).read_dict(data))
+    assert expected[5]
+    assert layout_summary(LayoutLoader(ROOMS, chunk_size=chunk_size).read_file(str(path))) == expected
+
+
+BULB = {"tipo": "Bulb", "imagen": "x.png", "x": 5, "y": 6}
+
+
+@pytest.mark.parametrize("data", [
+    {"conexiones": {"Kitchen": []}, "Kitchen": [BULB]},
+    {"dispositivos": {}, "Kitchen": [BULB]},
+    {"dispositivos": [BULB], "Kitchen": [BULB]},
+    {"dispositivos": None, "conexiones": {}, "next_id": 2},
+])
+def test_file_and_dict_agree_on_the_format(tmp_path, data):
+    path = tmp_path / "layout.json"
+    path.write_text(json.dumps(data), encoding="utf-8")
+    expected = layout_summary(LayoutLoader(ROOMS).read_dict(data))
+    assert layout_summary(LayoutLoader(ROOMS, chunk_size=4).read_file(str(path))) == expected
+
+
+@pytest.mark.parametrize("text", ['{"dispositivos": {"Kitchen": [{"id": 1,', '{"next_id": 3} trailing', "[1, 2]"])
+def test_malformed_files_raise_value_error(tmp_path, text):
+    path = tmp_path / "broken.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError):
+        LayoutLoader(ROOMS, chunk_size=4).read_file(str(path))
+
+
+def test_unreadable_file_raises_and_keeps_the_house(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('{"dispositivos": {"Kitchen": [{"id": 1,', encoding="utf-8")
+    model = HouseModel(use_simulation=False)
+    bulb = model.add_device("Kitchen", "Bulb", "")
+    with pytest.raises(LayoutError) as raised:
+        model.load(str(path))
+    assert raised.value.report.error
+    assert model.last_load_report is raised.value.report
+    assert model.devices_by_room["Kitchen"] == [bulb]
+    assert not model.load(str(tmp_path / "missing.json"))
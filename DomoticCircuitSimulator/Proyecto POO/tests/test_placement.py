@@ -0,0 +1,46 @@
+import random
+
+from placement import FreeSlotPlacer
+
+
+# The raster search of the original calcular_posicion_libre, against every placed rect
+def raster_slot(width, height, background_width, background_height, placed):
+    def free(x, y):
+        return all(
+            not (x <= ox + ow - 1 and ox <= x + width - 1 and y <= oy + oh - 1 and oy <= y + height - 1)
+            for ox, oy, ow, oh in placed
+        )
+
+    m = 20
+    for y in range(m, max(background_height - height - m, m), max(height // 2, 40)):
+        for x in range(m, max(background_width - width - m, m), max(width // 2, 40)):
+            if free(x, y):
+                return x, y
+    return (background_width - width) // 2, (background_height - height) // 2
+
+
+def test_matches_the_original_raster_search():
+    for seed in range(20):
+        rnd = random.Random(seed)
+        background_width, background_height = rnd.randint(200, 1000), rnd.randint(150, 700)
+        placer = FreeSlotPlacer(background_width, background_height)
+        placed = []
+        for _ in range(rnd.randint(0, 15)):
+            rect = (rnd.randint(0, background_width), rnd.randint(0, background_height),
+                    rnd.randint(10, 150), rnd.randint(10, 150))
+            placer.occupy(*rect)
+            placed.append(rect)
+
+        sizes = [(60, 60), (80, 45), (120, 90)]
+        for _ in range(rnd.randint(1, 60)):
+            width, height = rnd.choice(sizes)
+            expected = raster_slot(width, height, background_width, background_height, placed)
+            assert placer.find_slot(width, height) == expected
+            placed.append((*expected, width, height))
+
+
+def test_place_many_places_devices_in_order():
+    placer = FreeSlotPlacer(400, 300)
+    slots = placer.place_many([(60, 60)] * 3)
+    # Candidates are 40 px apart: a 60 px sprite covers the next one
+    assert slots == [(20, 20), (100, 20), (180, 20)]
@@ -0,0 +1,164 @@
+import random
+
+from house_model import HouseModel
+from power_network import PowerNetwork
+
+
+# Reference model: plain sets, every answer recomputed with a breadth-first search
+class BruteForceNetwork:
+    def __init__(self):
+        self.adjacency = {}
+        self.sources = set()
+        self.sensors = set()
+
+    def powered(self):
+        seen = set(self.sources)
+        queue = list(self.sources)
+        for node in queue:
+            for other in self.adjacency[node]:
+                if other not in seen:
+                    seen.add(other)
+                    queue.append(other)
+        return seen
+
+    def has_cycle(self):
+        seen = set()
+        components = 0
+        for start in self.adjacency:
+            if start in seen:
+                continue
+            components += 1
+            seen.add(start)
+            stack = [start]
+            while stack:
+                for other in self.adjacency[stack.pop()]:
+                    if other not in seen:
+                        seen.add(other)
+                        stack.append(other)
+        wires = sum(len(neighbours) for neighbours in self.adjacency.values()) // 2
+        # A forest has exactly devices - components wires
+        return wires > len(self.adjacency) - components
+
+
+# Applies the same random operations to both networks, yielding after each one
+def random_operations(seed, steps=600, max_devices=40):
+    rnd = random.Random(seed)
+    network = PowerNetwork()
+    reference = BruteForceNetwork()
+    next_id = 1
+    for _ in range(steps):
+        devices = list(reference.adjacency)
+        op = rnd.random()
+        if op < 0.25 or len(devices) < 2:
+            if len(devices) < max_devices:
+                sensor = rnd.random() < 0.3
+                network.add_device(next_id, sensor=sensor)
+                reference.adjacency[next_id] = set()
+                if sensor:
+                    reference.sensors.add(next_id)
+                next_id += 1
+        elif op < 0.55:
+            a, b = rnd.sample(devices, 2)
+            network.add_wire(a, b)
+            reference.adjacency[a].add(b)
+            reference.adjacency[b].add(a)
+        elif op < 0.7:
+            a = rnd.choice(devices)
+            if reference.adjacency[a]:
+                b = rnd.choice(sorted(reference.adjacency[a]))
+                network.remove_wire(a, b)
+                reference.adjacency[a].discard(b)
+                reference.adjacency[b].discard(a)
+        elif op < 0.8:
+            a = rnd.choice(devices)
+            network.remove_device(a)
+            for other in reference.adjacency.pop(a):
+                reference.adjacency[other].discard(a)
+            reference.sources.discard(a)
+            reference.sensors.discard(a)
+        elif op < 0.9:
+            a = rnd.choice(devices)
+            active = rnd.random() < 0.6
+            network.set_source_active(a, active)
+            (reference.sources.add if active else reference.sources.discard)(a)
+        else:
+            a = rnd.choice(devices)
+            sensor = rnd.random() < 0.5
+            network.set_sensor(a, sensor)
+            (reference.sensors.add if sensor else reference.sensors.discard)(a)
+        yield network, reference
+
+
+def test_powered_states_and_changes_match_a_breadth_first_search():
+    for seed in range(20):
+        powered_before = set()
+        for network, reference in random_operations(seed):
+            powered = reference.powered()
+            for dev_id in reference.adjacency:
+                assert network.is_powered(dev_id) == (dev_id in powered)
+            assert network.take_changes() == (powered ^ powered_before) & set(reference.adjacency)
+            assert network.has_active_source() == bool(reference.sources)
+            powered_before = powered
+
+
+def test_closed_circuits_match_a_cycle_search():
+    for seed in range(20):
+        for network, reference in random_operations(seed):
+            assert network.has_cycle() == reference.has_cycle()
+            for loop in network.loops():
+                assert len(loop) >= 3 and len(set(loop)) == len(loop)
+                for i, dev_id in enumerate(loop):
+                    assert loop[i - 1] in reference.adjacency[dev_id]
+
+
+def test_long_chains_do_not_hit_the_recursion_limit():
+    network = PowerNetwork()
+    size = 20000
+    for dev_id in range(size):
+        network.add_device(dev_id, active_source=dev_id == 0)
+    for dev_id in range(1, size):
+        network.add_wire(dev_id - 1, dev_id)
+    assert network.is_powered(size - 1) and not network.has_cycle()
+    network.add_wire(size - 1, 0)
+    assert network.has_cycle() and len(network.loops()[0]) == size
+    network.remove_wire(size // 2, size // 2 + 1)
+    assert not network.has_cycle() and network.is_powered(size - 1)
+
+
+def test_powered_sensor_count_matches_a_breadth_first_search():
+    for seed in range(20):
+        for network, reference in random_operations(seed):
+            assert network.powered_sensors() == len(reference.sensors & reference.powered())
+
+
+def test_heat_sensor_active_follows_wires_and_sources():
+    model = HouseModel(rooms=["Kitchen"], use_simulation=False)
+    source = model.add_device("Kitchen", "Voltage Source", "")
+    sensor = model.add_device("Kitchen", "Heat Sensor", "")
+    assert not model.heat_sensor_active("Kitchen")
+
+    model.connect("Kitchen", source, sensor)
+    assert not model.heat_sensor_active("Kitchen")
+    model.turn_on("Kitchen", source)
+    assert model.heat_sensor_active("Kitchen")
+
+    model.turn_off("Kitchen", source)
+    assert not model.heat_sensor_active("Kitchen")
+    model.turn_on("Kitchen", source)
+    model.remove_device("Kitchen", sensor)
+    assert not model.heat_sensor_active("Kitchen")
+
+
+def test_disconnected_heat_sensor_counts_once_it_is_connected():
+    model = HouseModel(rooms=["Kitchen"], use_simulation=False)
+    model.load_dict({
+        "dispositivos": {"Kitchen": [
+            {"id": 1, "tipo": "Voltage Source", "imagen": "", "x": 0, "y": 0, "conectado": True, "encendido": True},
+            {"id": 2, "tipo": "Heat Sensor", "imagen": "", "x": 0, "y": 0, "conectado": False, "encendido": False},
+        ]},
+        "conexiones": {"Kitchen": [{"origen": 1, "destino": 2}]},
+        "next_id": 3,
+    })
+    assert not model.heat_sensor_active("Kitchen")
+    model.turn_on("Kitchen", model.device("Kitchen", 2))
+    assert model.heat_sensor_active("Kitchen")
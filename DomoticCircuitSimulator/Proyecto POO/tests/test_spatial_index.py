@@ -0,0 +1,57 @@
+import random
+
+from spatial_index import SpatialGrid
+
+
+class Rect:
+    def __init__(self, x, y, width, height):
+        self._x, self._y, self._width, self._height = x, y, width, height
+
+    def x(self):
+        return self._x
+
+    def y(self):
+        return self._y
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+
+# The scan the window used before the grid: last drawn first, rect grown by the margin
+def linear_item_at(rects, x, y, margin):
+    for key, rect in reversed(list(rects.items())):
+        if (rect.x() - margin <= x <= rect.x() + rect.width() - 1 + margin
+                and rect.y() - margin <= y <= rect.y() + rect.height() - 1 + margin):
+            return key
+    return None
+
+
+def test_matches_a_linear_scan_of_overlapping_devices():
+    for seed in range(10):
+        rnd = random.Random(seed)
+        grid = SpatialGrid(cell_size=rnd.choice([16, 64, 128]), margin=20)
+        rects = {}
+        for step in range(1500):
+            op = rnd.random()
+            if op < 0.5 or not rects:
+                key = rnd.randint(1, 80)
+                rect = Rect(rnd.randint(-50, 400), rnd.randint(-50, 300), rnd.randint(1, 120), rnd.randint(1, 120))
+                grid.update(key, key, rect)
+                rects[key] = rect
+            elif op < 0.6:
+                key = rnd.choice(list(rects))
+                grid.remove(key)
+                del rects[key]
+            x, y = rnd.randint(-80, 560), rnd.randint(-80, 460)
+            assert grid.item_at(x, y) == linear_item_at(rects, x, y, 20)
+        assert len(grid) == len(rects)
+
+
+def test_clear_forgets_every_device():
+    grid = SpatialGrid()
+    grid.update("a", "a", Rect(0, 0, 50, 50))
+    grid.clear()
+    assert len(grid) == 0 and grid.item_at(10, 10) is None
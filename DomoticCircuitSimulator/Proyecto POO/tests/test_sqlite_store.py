@@ -0,0 +1,97 @@
+from house_model import HouseModel
+from sqlite_store import SqliteHouseStore
+
+
+def write_house(path):
+    model = HouseModel(use_simulation=False)
+    for room in ("room", "Living_room"):
+        source = model.add_device(room, "Voltage Source", "")
+        model.turn_on(room, source)
+    sensor = model.add_device("room", "Heat Sensor", "")
+    model.connect("room", model.devices_by_room["room"][0], sensor)
+    tv = model.add_device("Living_room", "TV", "")
+    model.connect("Living_room", model.devices_by_room["Living_room"][0], tv)
+    assert model.save(str(path))
+    return sensor.id
+
+
+def open_store(tmp_path):
+    snapshot = tmp_path / "posiciones_dispositivos.json"
+    sensor_id = write_house(snapshot)
+    model = HouseModel(use_simulation=False)
+    store = SqliteHouseStore()
+    store.load(model, str(snapshot))
+    return model, store, sensor_id
+
+
+def test_rooms_with_sensors_are_loaded_when_the_file_opens(tmp_path):
+    model, store, sensor_id = open_store(tmp_path)
+    try:
+        assert "room" in store.loaded_rooms
+        assert model.device("room", sensor_id) is not None
+        assert model.heat_sensor_active("room")
+        # Rooms without sensors are still read when they are entered
+        assert "Living_room" not in store.loaded_rooms
+        assert model.devices_by_room["Living_room"] == []
+        store.ensure_room("Living_room")
+        assert [dev.tipo for dev in model.devices_by_room["Living_room"]] == ["Voltage Source", "TV"]
+    finally:
+        store.close()
+
+
+def test_heat_alarm_sees_a_room_that_was_never_entered(tmp_path):
+    model, store, _ = open_store(tmp_path)
+    alarms = []
+    model.subscribe(lambda event: event.kind == "heat_alarm" and alarms.append(event.value))
+    try:
+        model.set_temperature(45)
+        assert alarms[-1] is True
+    finally:
+        store.close()
+
+
+def test_a_motion_sensor_that_arms_on_its_own_is_stored(tmp_path):
+    model, store, _ = open_store(tmp_path)
+    try:
+        source = model.devices_by_room["room"][0]
+        sensor = model.add_device("room", "Motion Sensor", "")
+        model.connect("room", source, sensor)
+        model.advance(10)
+        assert sensor.encendido
+        store.sync()
+        row = store.connection.execute("SELECT encendido FROM devices WHERE id = ?", (sensor.id,)).fetchone()
+        assert row == (1,)
+    finally:
+        store.close()
+
+
+def test_replacing_the_house_keeps_rooms_that_were_never_entered(tmp_path):
+    model, store, _ = open_store(tmp_path)
+    try:
+        assert "Living_room" not in store.loaded_rooms
+        model.load_dict(model.to_dict())
+        store.sync()
+        store.ensure_room("Living_room")
+        assert [dev.tipo for dev in model.devices_by_room["Living_room"]] == ["Voltage Source", "TV"]
+        assert len(model.connections_by_room["Living_room"]) == 1
+        # New devices do not reuse the ids of rows that were not read
+        stored_ids = {row[0] for row in store.connection.execute("SELECT id FROM devices")}
+        assert model.next_device_id > max(stored_ids)
+    finally:
+        store.close()
+
+
+def test_replacing_the_house_stores_the_rooms_it_fills(tmp_path):
+    model, store, _ = open_store(tmp_path)
+    try:
+        data = model.to_dict()
+        data["dispositivos"]["Living_room"] = [
+            {"id": 50, "tipo": "Bulb", "imagen": "", "x": 1, "y": 2, "conectado": True, "encendido": False}
+        ]
+        data["conexiones"]["Living_room"] = []
+        model.load_dict(data)
+        store.sync()
+        rows = store.connection.execute("SELECT id, tipo FROM devices WHERE room = 'Living_room'").fetchall()
+        assert rows == [(50, "Bulb")]
+    finally:
+        store.close()
@@ -0,0 +1,182 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from PyQt5.QtCore import Qt, QBuffer, QByteArray, QObject, QRunnable, QSize, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QColor, QImage, QImageReader, QPainter, QPen, QPixmap
+
+
+# Immutable description of one frame. Only plain values, so the worker never reads
+# the live device dicts while the GUI thread keeps modifying them.
+#   sprites: tuple of (image_path, x, y, width, height)
+#   wires:   tuple of (x1, y1, x2, y2, in_closed_loop)
+#   preview: (x1, y1, x2, y2) of the dashed wire, or None
+SceneSnapshot = namedtuple(
+    "SceneSnapshot",
+    ["generation", "background_path", "background_width", "background_height", "sprites", "wires", "preview"],
+)
+
+
+class _FrameSignals(QObject):
+    finished = pyqtSignal(int, QImage)
+
+
+class _ComposeTask(QRunnable):
+    def __init__(self, renderer, snapshot):
+        super().__init__()
+        self.renderer = renderer
+        self.snapshot = snapshot
+
+    def run(self):
+        image = self.renderer.compose(self.snapshot)
+        self.renderer.signals.finished.emit(self.snapshot.generation, image)
+
+
+# SRP: this class only composes room frames on a QThreadPool worker.
+# The GUI thread computes the layout (cheap, uses image headers only), submits a
+# SceneSnapshot and receives the finished frame through frame_ready. Only the most
+# recent generation is ever shown: older frames are dropped when they arrive late.
+class ThreadedSceneRenderer(QObject):
+    frame_ready = pyqtSignal(QPixmap)
+
+    def __init__(self, parent=None, max_bytes=64 * 1024 * 1024, exists=os.path.exists, bundle=None):
+        super().__init__(parent)
+        self.max_bytes = max_bytes
+        self.exists = exists             # file check (the asset manifest, no disk access)
+        self.bundle = bundle             # AssetBundle the images are read from, if any
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+
+        self.signals = _FrameSignals()
+        self.signals.finished.connect(self._on_finished)
+
+        self.generation = 0
+        self.dropped_frames = 0
+        self._in_flight = False
+        self._pending = None
+
+        self._source_sizes = {}          # GUI thread only: image path -> QSize or None
+        self._lock = threading.Lock()    # protects the worker image cache
+        self._images = OrderedDict()
+        self._used_bytes = 0
+
+    # ---------------- GUI THREAD: LAYOUT HELPERS ----------------
+    def next_generation(self):
+        self.generation += 1
+        return self.generation
+
+    def background_size(self, image_path, width, height):
+        source = self._source_size(image_path)
+        if source is None:
+            return None
+        return source.scaled(width, height, Qt.KeepAspectRatio)
+
+    def sprite_size(self, image_path, height):
+        source = self._source_size(image_path)
+        if source is None or source.height() <= 0:
+            return None
+        return QSize(max(1, source.width() * height // source.height()), height)
+
+    def _source_size(self, image_path):
+        if image_path not in self._source_sizes:
+            size = None
+            if image_path and self.exists(image_path):
+                data = self.bundle.data_for(image_path) if self.bundle is not None else None
+                if data is None:
+                    reader_size = QImageReader(image_path).size()
+                else:
+                    # Only the header is parsed, from the mapped bytes (fromRawData does not copy)
+                    buffer = QBuffer()
+                    buffer.setData(QByteArray.fromRawData(data))
+                    reader_size = QImageReader(buffer).size()
+                if reader_size.isValid():
+                    size = reader_size
+            self._source_sizes[image_path] = size
+        return self._source_sizes[image_path]
+
+    # ---------------- GUI THREAD: SUBMISSION ----------------
+    def submit(self, snapshot):
+        # Only one frame is composed at a time; newer snapshots replace the waiting one
+        if self._in_flight:
+            self._pending = snapshot
+            return
+        self._in_flight = True
+        self.pool.start(_ComposeTask(self, snapshot))
+
+    def _on_finished(self, generation, image):
+        self._in_flight = False
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            self.submit(pending)
+
+        if generation < self.generation:
+            self.dropped_frames += 1
+            return
+        self.frame_ready.emit(QPixmap.fromImage(image))
+
+    def wait(self):
+        self.pool.waitForDone()
+
+    # Drops the waiting snapshot and waits for the frame being composed (closing the app):
+    # a task still running at exit would emit through deleted signals
+    def stop(self):
+        self._pending = None
+        self.pool.clear()
+        self.pool.waitForDone()
+
+    # ---------------- WORKER THREAD: COMPOSITION ----------------
+    def compose(self, snapshot):
+        background = self._scaled_image(
+            snapshot.background_path, snapshot.background_width, snapshot.background_height
+        )
+        frame = QImage(snapshot.background_width, snapshot.background_height, QImage.Format_ARGB32_Premultiplied)
+        frame.fill(Qt.transparent)
+
+        painter = QPainter(frame)
+        if background is not None:
+            painter.drawImage(0, 0, background)
+
+        for image_path, x, y, width, height in snapshot.sprites:
+            sprite = self._scaled_image(image_path, width, height)
+            if sprite is not None:
+                painter.drawImage(x, y, sprite)
+
+        pen = QPen(QColor(0, 0, 0), 3)
+        loop_pen = QPen(QColor(200, 30, 30), 3)
+        for x1, y1, x2, y2, in_closed_loop in snapshot.wires:
+            painter.setPen(loop_pen if in_closed_loop else pen)
+            painter.drawLine(x1, y1, x2, y2)
+
+        if snapshot.preview is not None:
+            painter.setPen(QPen(QColor(0, 0, 255), 2, Qt.DashLine))
+            painter.drawLine(*snapshot.preview)
+
+        painter.end()
+        return frame
+
+    def _scaled_image(self, image_path, width, height):
+        key = (image_path, width, height)
+        with self._lock:
+            if key in self._images:
+                self._images.move_to_end(key)
+                return self._images[key]
+
+        data = self.bundle.data_for(image_path) if self.bundle is not None else None
+        source = QImage(image_path) if data is None else QImage.fromData(data)
+        image = None
+        if not source.isNull():
+            image = source.scaled(width, height, Qt.IgnoreAspectRatio, Qt.SmoothTransformation)
+
+        with self._lock:
+            if key not in self._images:
+                self._images[key] = image
+                self._used_bytes += self._image_bytes(image)
+            while len(self._images) > 1 and self._used_bytes > self.max_bytes:
+                _, oldest = self._images.popitem(last=False)
+                self._used_bytes -= self._image_bytes(oldest)
+        return image
+
+    @staticmethod
+    def _image_bytes(image):
+        return image.sizeInBytes() if image is not None else 0